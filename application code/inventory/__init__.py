@@ -0,0 +1,106 @@
+"""
+Retail inventory management
+
+The classes live in submodules which are only imported when one of their
+names is first used, so "import inventory" itself does no work and the
+heavy modules (asyncio, sqlite3, NumPy, ...) are only loaded by the
+features that need them:
+
+    from inventory import ProductRepository, Order   # loads the repository and orders modules
+
+Submodules:
+    exceptions  : InventoryException and its subclasses
+    models      : ProductInfo, BulkResult, ProductValidator
+    storage     : product storages, IdAllocator, BinarySearch
+    listeners   : IInventoryListener, secondary/range indexes, LowStockMonitor
+    repository  : ProductRepository, ConcurrentProductRepository
+    orders      : Order, OrderInfo, OrderLog
+    sorting     : Sort, MergeSort, ExternalSort
+    search      : NameSearchIndex
+    snapshots   : SnapshotManager, ReadSnapshot
+    metrics     : InventoryMetrics and its sinks
+    analytics   : ColumnarAnalyticsView (needs NumPy)
+    sharding    : ShardedProductRepository, ParallelAnalytics
+    sqlite      : SQLiteProductRepository
+    persistence : InventoryJournal, InventorySnapshot, InventoryPersistence
+    catalogue   : CatalogueImporter, CatalogueExporter
+    ingestion   : OrderIngestionService
+    changes     : ChangeStream, Subscription (change data capture)
+    cli         : command line interface (python -m inventory)
+"""
+
+# Public name -> submodule defining it
+_EXPORTS = {
+    "InventoryException": "exceptions",
+    "InvalidProductDataException": "exceptions",
+    "InvalidOrderDataException": "exceptions",
+    "MoreThanOneProductException": "exceptions",
+    "BulkOperationException": "exceptions",
+    "SubscriberLagException": "exceptions",
+    "ProductInfo": "models",
+    "BulkResult": "models",
+    "ProductValidator": "models",
+    "IdAllocator": "storage",
+    "IProductStorage": "storage",
+    "ListProductStorage": "storage",
+    "IndexedProductStorage": "storage",
+    "ColumnarProductStorage": "storage",
+    "ProductRow": "storage",
+    "BinarySearch": "storage",
+    "IInventoryListener": "listeners",
+    "SecondaryIndex": "listeners",
+    "SortedBuckets": "listeners",
+    "RangeIndex": "listeners",
+    "LowStockMonitor": "listeners",
+    "IProductRepository": "repository",
+    "ProductRepository": "repository",
+    "ReadWriteLock": "repository",
+    "ConcurrentProductRepository": "repository",
+    "Order": "orders",
+    "OrderInfo": "orders",
+    "OrderLog": "orders",
+    "ISort": "sorting",
+    "SortKey": "sorting",
+    "MergeSort": "sorting",
+    "Sort": "sorting",
+    "ExternalSort": "sorting",
+    "NameSearchIndex": "search",
+    "SnapshotManager": "snapshots",
+    "ReadSnapshot": "snapshots",
+    "Histogram": "metrics",
+    "InventoryMetrics": "metrics",
+    "IMetricsSink": "metrics",
+    "PrometheusTextFileSink": "metrics",
+    "ColumnarAnalyticsView": "analytics",
+    "ShardedProductRepository": "sharding",
+    "ParallelAnalytics": "sharding",
+    "SQLiteProductRepository": "sqlite",
+    "InventoryJournal": "persistence",
+    "InventorySnapshot": "persistence",
+    "InventoryPersistence": "persistence",
+    "ImportResult": "catalogue",
+    "CatalogueImporter": "catalogue",
+    "CatalogueExporter": "catalogue",
+    "OrderIngestionService": "ingestion",
+    "ChangeStream": "changes",
+    "Subscription": "changes",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Import the submodule defining name on first use (PEP 562)"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # __import__ with a fromlist returns the submodule itself (and, unlike
+    # importlib, shows up in python -X importtime)
+    value = getattr(__import__(f"{__name__}.{module}", None, None, [name]), name)
+    # Later lookups find it directly
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,6 @@
+"""python -m inventory: see inventory/cli.py"""
+
+from .cli import main
+
+
+raise SystemExit(main())
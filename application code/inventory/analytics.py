@@ -0,0 +1,257 @@
+"""NumPy columnar view of the inventory for vectorised reports (NumPy is optional)"""
+
+from contextlib import nullcontext
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy is optional, only ColumnarAnalyticsView needs it
+    np = None
+
+from .exceptions import InventoryException
+from .listeners import IInventoryListener
+
+
+class ColumnarAnalyticsView(IInventoryListener):
+    """
+    Columnar NumPy copy of the inventory for vectorised reports
+    
+    Every product is one row (row = product_id - 1, dense because deleted
+    ids are reused first) of the columns live, quantity, price, category and
+    supplier; category and supplier are dictionary-encoded into integer
+    codes. As a listener the view is updated on every change, so reports
+    never loop over ProductInfo objects.
+    
+    Filters (keyword arguments of every report):
+        category, supplier: equal to the value
+        price, quantity   : (low, high) inclusive bounds, None for an open end
+    
+    Quantities and prices are stored as int64.
+    
+    Time complexity:
+        on_add/on_update/on_delete: O(1) amortized
+        reports                   : O(rows), vectorised
+    """
+    
+    GROUPS = ("category", "supplier")
+    VALUES = ("products", "quantity", "price", "stock_value")
+    
+    def __init__(self, lock=None) -> None:
+        """
+        Args:
+            lock: Lock held while reading or updating the columns (the
+                  listener lock of a ConcurrentProductRepository)
+        """
+        if np is None:
+            raise InventoryException("The columnar analytics view needs NumPy (pip install numpy)")
+        self.lock = lock if lock is not None else nullcontext()
+        self._rows = 0
+        self._live_count = 0
+        self.live = np.zeros(0, dtype=np.bool_)
+        self.quantity = np.zeros(0, dtype=np.int64)
+        self.price = np.zeros(0, dtype=np.int64)
+        self.category = np.zeros(0, dtype=np.int32)
+        self.supplier = np.zeros(0, dtype=np.int32)
+        # Dictionary encoding: values by code and codes by value
+        self.values = {group: [] for group in self.GROUPS}
+        self.codes = {group: {} for group in self.GROUPS}
+    
+    def _encode(self, group: str, value: str) -> int:
+        codes = self.codes[group]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[group])
+            self.values[group].append(value)
+        return code
+    
+    def _reserve(self, rows: int) -> None:
+        """Grow the columns (doubling) so they have at least rows rows"""
+        capacity = len(self.live)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity, 1024)
+        for name in ("live", "quantity", "price", "category", "supplier"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+    
+    def build(self, products) -> None:
+        """Fill the view from an iterable of products"""
+        with self.lock:
+            ids, quantities, prices, categories, suppliers = [], [], [], [], []
+            self.values = {group: [] for group in self.GROUPS}
+            self.codes = {group: {} for group in self.GROUPS}
+            encode = self._encode
+            for product in products:
+                ids.append(product.product_id)
+                quantities.append(product.quantity)
+                prices.append(product.price)
+                categories.append(encode("category", product.category))
+                suppliers.append(encode("supplier", product.supplier))
+            
+            self._rows = max(ids, default=0)
+            self._live_count = len(ids)
+            self.live = np.zeros(0, dtype=np.bool_)
+            self.quantity = np.zeros(0, dtype=np.int64)
+            self.price = np.zeros(0, dtype=np.int64)
+            self.category = np.zeros(0, dtype=np.int32)
+            self.supplier = np.zeros(0, dtype=np.int32)
+            self._reserve(self._rows)
+            rows = np.asarray(ids, dtype=np.int64) - 1
+            self.live[rows] = True
+            self.quantity[rows] = quantities
+            self.price[rows] = prices
+            self.category[rows] = categories
+            self.supplier[rows] = suppliers
+    
+    def on_add(self, product) -> None:
+        row = product.product_id - 1
+        with self.lock:
+            if row >= self._rows:
+                self._reserve(row + 1)
+                self._rows = row + 1
+            if not self.live[row]:
+                self._live_count += 1
+            self.live[row] = True
+            self.quantity[row] = product.quantity
+            self.price[row] = product.price
+            self.category[row] = self._encode("category", product.category)
+            self.supplier[row] = self._encode("supplier", product.supplier)
+    
+    def on_update(self, product, old_values: dict) -> None:
+        row = product.product_id - 1
+        with self.lock:
+            if "quantity" in old_values:
+                self.quantity[row] = product.quantity
+            if "price" in old_values:
+                self.price[row] = product.price
+            if "supplier" in old_values:
+                self.supplier[row] = self._encode("supplier", product.supplier)
+            if "category" in old_values:
+                self.category[row] = self._encode("category", product.category)
+    
+    def on_delete(self, product) -> None:
+        row = product.product_id - 1
+        with self.lock:
+            if self.live[row]:
+                self._live_count -= 1
+            self.live[row] = False
+    
+    def _mask(self, category=None, supplier=None, price=None, quantity=None):
+        """
+        Boolean mask of the live rows matching the filters (a slice of every
+        row when there is no filter and no deleted row, to skip the copies)
+        """
+        rows = self._rows
+        if self._live_count == rows and category is None and supplier is None \
+                and price is None and quantity is None:
+            return slice(0, rows)
+        mask = self.live[:rows].copy()
+        for group, value in (("category", category), ("supplier", supplier)):
+            if value is not None:
+                code = self.codes[group].get(value)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= getattr(self, group)[:rows] == code
+        for column, bounds in ((self.price, price), (self.quantity, quantity)):
+            if bounds is not None:
+                low, high = bounds
+                if low is not None:
+                    mask &= column[:rows] >= low
+                if high is not None:
+                    mask &= column[:rows] <= high
+        return mask
+    
+    def _column(self, value: str, mask):
+        """The values of a report column for the rows of mask"""
+        if value not in self.VALUES or value == "products":
+            raise InventoryException(f"Unknown report value: {value!r}")
+        rows = self._rows
+        if value == "stock_value":
+            return self.quantity[:rows][mask] * self.price[:rows][mask]
+        return getattr(self, value)[:rows][mask]
+    
+    def ids(self, **filters):
+        """Product ids (ascending NumPy array) of the products matching the filters"""
+        with self.lock:
+            mask = self._mask(**filters)
+            if isinstance(mask, slice):
+                return np.arange(1, self._rows + 1)
+            return np.flatnonzero(mask) + 1
+    
+    def count(self, **filters) -> int:
+        """Number of products matching the filters"""
+        with self.lock:
+            mask = self._mask(**filters)
+            return self._rows if isinstance(mask, slice) else int(np.count_nonzero(mask))
+    
+    def total(self, value: str = "stock_value", **filters) -> int:
+        """Sum of quantity, price or stock_value (quantity * price) over the matching products"""
+        with self.lock:
+            return int(self._column(value, self._mask(**filters)).sum())
+    
+    def group_by(self, group: str, value: str = "stock_value", **filters) -> dict:
+        """
+        Return {category or supplier: total of value} over the matching products
+        
+        Args:
+            group: "category" or "supplier"
+            value: "products" (count), "quantity", "price" or "stock_value"
+        """
+        if group not in self.GROUPS:
+            raise InventoryException(f"Can not group by {group!r}")
+        with self.lock:
+            mask = self._mask(**filters)
+            codes = getattr(self, group)[:self._rows][mask]
+            names = self.values[group]
+            counts = np.bincount(codes, minlength=len(names))
+            if value == "products":
+                totals = counts
+            else:
+                data = self._column(value, mask)
+                if int(data.sum()) < 2 ** 53:
+                    # Float sums of integers are exact below 2 ** 53
+                    totals = np.rint(np.bincount(codes, weights=data, minlength=len(names))).astype(np.int64)
+                else:
+                    totals = [int(data[codes == code].sum()) if counts[code] else 0 for code in range(len(names))]
+            return {names[code]: int(totals[code]) for code in np.flatnonzero(counts)}
+    
+    def price_histogram(self, bins=10, **filters) -> tuple:
+        """Return (counts, bin edges) of the prices of the matching products"""
+        with self.lock:
+            counts, edges = np.histogram(self._column("price", self._mask(**filters)), bins)
+            return counts.tolist(), edges.tolist()
+    
+    def price_percentiles(self, percentiles=(50, 90, 99), **filters) -> dict:
+        """Return {percentile: price} over the matching products (empty if none match)"""
+        with self.lock:
+            prices = self._column("price", self._mask(**filters))
+            if not len(prices):
+                return {}
+            return dict(zip(percentiles, np.percentile(prices, percentiles).tolist()))
+    
+    def check(self, products) -> list:
+        """Compare the view with an iterable of products; return the problems found"""
+        expected = ColumnarAnalyticsView()
+        expected.build(products)
+        with self.lock:
+            rows = max(self._rows, expected._rows)
+            self._reserve(rows)
+            expected._reserve(rows)
+            live = expected.live[:rows]
+            if not np.array_equal(self.live[:rows], live):
+                return ["Analytics view: live rows differ from the inventory"]
+            problems = []
+            if self._live_count != expected._live_count:
+                problems.append("Analytics view: live row count differs from the inventory")
+            for name in ("quantity", "price"):
+                if not np.array_equal(getattr(self, name)[:rows][live], getattr(expected, name)[:rows][live]):
+                    problems.append(f"Analytics view: {name} column differs from the inventory")
+            for group in self.GROUPS:
+                decoded = np.array(self.values[group], dtype=object)[getattr(self, group)[:rows][live]]
+                wanted = np.array(expected.values[group], dtype=object)[getattr(expected, group)[:rows][live]]
+                if not np.array_equal(decoded, wanted):
+                    problems.append(f"Analytics view: {group} column differs from the inventory")
+            return problems
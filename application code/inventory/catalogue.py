@@ -0,0 +1,210 @@
+"""Streaming CSV/JSONL catalogue import and export"""
+
+import csv
+import json
+import os
+
+from .exceptions import InvalidProductDataException, InventoryException
+from .models import ProductValidator
+from .repository import ProductRepository
+
+
+class ImportResult:
+    """
+    Class for the result of a catalogue import
+    
+    Attributes:
+        rows    : Data rows read from the file       (non-negative integer)
+        added   : Products added to the repository   (non-negative integer)
+        rejected: Rows written to the rejects file   (non-negative integer)
+    """
+    
+    def __init__(self, rows: int = 0, added: int = 0, rejected: int = 0) -> None:
+        self.rows = rows
+        self.added = added
+        self.rejected = rejected
+    
+    def __repr__(self) -> str:
+        return f"ImportResult(rows={self.rows}, added={self.added}, rejected={self.rejected})"
+
+
+def _catalogue_format(path: str, fmt: str) -> str:
+    """Return "csv" or "jsonl", from fmt or else from the file extension"""
+    if fmt is None:
+        extension = os.path.splitext(path)[1].lower()
+        fmt = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+    if fmt not in ("csv", "jsonl"):
+        raise InventoryException(f"Unknown catalogue format for {path!r} (use csv or jsonl)")
+    return fmt
+
+
+class CatalogueImporter:
+    """
+    Streaming CSV/JSONL catalogue importer
+    
+    The file goes through a generator pipeline with constant memory:
+        read lines -> parse rows -> chunks of chunk_size -> ProductRepository.add_products
+    add_products validates every row with ProductValidator (the same rules as
+    add_product). Rejected rows are written to a JSONL side file together with
+    their line number and error message.
+    
+    CSV files need a header with name, category, quantity, price and supplier
+    columns (other columns, like product_id, are ignored). JSONL files hold one
+    object with those keys per line. New products always get new ids.
+    """
+    
+    def __init__(self, repo: ProductRepository, chunk_size: int = 10000, rejects_path: str = None,
+                 dry_run: bool = False) -> None:
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise InventoryException("Chunk size must be a positive integer")
+        self.repo = repo
+        self.chunk_size = chunk_size
+        self.rejects_path = rejects_path
+        # With dry_run the rows are only validated, nothing is added
+        self.dry_run = dry_run
+    
+    @staticmethod
+    def _number(value):
+        """Turn a CSV cell into an int if it holds one (otherwise validation rejects it)"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return value
+    
+    def _parse_csv(self, f):
+        """Yield (line number, row dict or None, error or None) for a CSV file"""
+        reader = csv.DictReader(f)
+        missing = set(ProductValidator.FIELDS) - set(reader.fieldnames or ())
+        if missing:
+            raise InventoryException(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+        number = self._number
+        for row in reader:
+            if None in row:
+                row["extra_cells"] = row.pop(None)
+                yield reader.line_num, row, "Row has more cells than the header"
+                continue
+            row["quantity"] = number(row["quantity"])
+            row["price"] = number(row["price"])
+            yield reader.line_num, row, None
+    
+    @staticmethod
+    def _parse_jsonl(f):
+        """Yield (line number, row dict or None, error or None) for a JSONL file"""
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, line.rstrip("\n"), f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, row, "Row must be a JSON object"
+            else:
+                yield line_number, row, None
+    
+    def _chunks(self, parsed, reject, result: ImportResult):
+        """Group parsed rows into chunks, sending parse errors straight to reject"""
+        chunk = []
+        for line_number, row, error in parsed:
+            result.rows += 1
+            if error is not None:
+                reject(line_number, row, error)
+                continue
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    
+    def import_file(self, path: str, fmt: str = None) -> ImportResult:
+        """
+        Import a catalogue file into the repository
+        
+        Args:
+            path: CSV or JSONL file
+            fmt : "csv" or "jsonl" (default: taken from the file extension)
+        
+        Returns:
+            ImportResult with the number of rows read, added and rejected
+        """
+        fmt = _catalogue_format(path, fmt)
+        result = ImportResult()
+        rejects = open(self.rejects_path, "w", encoding="utf-8") if self.rejects_path else None
+        
+        def reject(line_number: int, row, error: str) -> None:
+            result.rejected += 1
+            if rejects is not None:
+                rejects.write(json.dumps({"line": line_number, "error": error, "row": row}, default=str) + "\n")
+        
+        try:
+            with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+                parsed = self._parse_csv(f) if fmt == "csv" else self._parse_jsonl(f)
+                for chunk in self._chunks(parsed, reject, result):
+                    rows = [row for _, row in chunk]
+                    if self.dry_run:
+                        errors = []
+                        for row_number, row in enumerate(rows):
+                            try:
+                                ProductValidator.new_product_fields(row)
+                            except InvalidProductDataException as e:
+                                errors.append((row_number, str(e)))
+                        added = len(rows) - len(errors)
+                    else:
+                        bulk = self.repo.add_products(rows)
+                        errors, added = bulk.errors, len(bulk.product_ids)
+                    result.added += added
+                    for row_number, error in errors:
+                        reject(chunk[row_number][0], chunk[row_number][1], error)
+        finally:
+            if rejects is not None:
+                rejects.close()
+        return result
+
+
+class CatalogueExporter:
+    """
+    Streaming CSV/JSONL catalogue exporter
+    
+    Products are written one by one while iterating over the repository in
+    product_id order, so memory stays constant. Any repository that iterates
+    over its products works: the in-memory, sharded and SQLite ones, or a
+    ReadSnapshot.
+    """
+    
+    COLUMNS = ("product_id",) + ProductValidator.FIELDS
+    
+    def __init__(self, repo: ProductRepository) -> None:
+        self.repo = repo
+    
+    def export_file(self, path: str, fmt: str = None) -> int:
+        """
+        Write every product of the repository to a catalogue file
+        
+        Args:
+            path: CSV or JSONL file to write
+            fmt : "csv" or "jsonl" (default: taken from the file extension)
+        
+        Returns:
+            Number of products written
+        """
+        fmt = _catalogue_format(path, fmt)
+        count = 0
+        with open(path, "w", newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(self.COLUMNS)
+                write = writer.writerow
+                for product in self.repo:
+                    write((product.product_id, product.name, product.category,
+                           product.quantity, product.price, product.supplier))
+                    count += 1
+            else:
+                dumps = json.dumps
+                for product in self.repo:
+                    f.write(dumps({"product_id": product.product_id, "name": product.name,
+                                   "category": product.category, "quantity": product.quantity,
+                                   "price": product.price, "supplier": product.supplier}) + "\n")
+                    count += 1
+        return count
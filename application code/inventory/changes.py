@@ -0,0 +1,329 @@
+"""Change data capture: a stream of the changes of a repository for in-process subscribers"""
+
+import threading
+from time import monotonic
+
+from .exceptions import InventoryException, SubscriberLagException
+from .listeners import IInventoryListener
+
+
+class ChangeStream(IInventoryListener):
+    """
+    Sequenced stream of the product changes of a repository (change data capture)
+    
+    Registered as a listener (ProductRepository.enable_change_stream), it
+    turns every add, update, delete and placed order into one event tuple:
+        (sequence, op, product_id, fields)
+    sequence : 1, 2, 3, ... in the order of the changes
+    op       : "add", "update" or "delete"
+    fields   : add    -> (name, category, quantity, price, supplier)
+               update -> {field: new value} of the changed fields only (an
+                         order gives {"quantity": ...})
+               delete -> None
+    
+    The events are kept in one list shared by every subscriber, the last
+    `retention` of them at least, and a Subscription is only its position
+    in it: publishing costs the same with 0 or 10 subscribers, and a
+    subscriber can resume after any sequence number still retained.
+    
+    Every subscriber has a bounded buffer of max_pending events. When a
+    non-blocking subscriber falls further behind, it is cut off: its next
+    poll raises SubscriberLagException with the sequence to resume after.
+    A blocking subscriber applies backpressure instead: the writer waits
+    (up to block_timeout seconds, then the subscriber is cut off) until the
+    subscriber has polled again. By default the writer waits before
+    publishing. With defer_backpressure=True publishing never waits and the
+    writer calls wait_for_room() itself once it released its own locks, so
+    a stalled subscriber holds up that writer only and not every reader and
+    writer of a ConcurrentProductRepository; a blocking subscriber's buffer
+    may then run over max_pending by the events of the writes in progress.
+    
+    Time complexity:
+        publishing an event: O(1) amortized
+        poll               : O(batch size) (+ O(blocking subscribers) for a blocking one)
+    """
+    
+    ADD = "add"
+    UPDATE = "update"
+    DELETE = "delete"
+    
+    def __init__(self, retention: int = 100000, sequence: int = 0, block_timeout: float = 1.0,
+                 defer_backpressure: bool = False) -> None:
+        """
+        Args:
+            retention         : Number of past events kept for slow and resuming subscribers
+            sequence          : Sequence number of the last event already published
+                                (the next one is sequence + 1)
+            block_timeout     : Longest time in seconds a writer waits for a blocking subscriber
+            defer_backpressure: True if the writers call wait_for_room() after their
+                                changes instead of waiting before publishing
+        """
+        if not isinstance(retention, int) or retention < 1:
+            raise InventoryException("Retention must be a positive integer")
+        if not isinstance(sequence, int) or sequence < 0:
+            raise InventoryException("Sequence must be a non-negative integer")
+        self.retention = retention
+        self.block_timeout = block_timeout
+        self.defer_backpressure = defer_backpressure
+        self.sequence = sequence
+        # Retained events; events[i] has the sequence number first + i
+        self.events = []
+        self.first = sequence + 1
+        self.subscriptions = []
+        # Highest sequence number the blocking subscribers have room for
+        # (None when there is no blocking subscriber)
+        self._limit = None
+        # Subscribers waiting for events and writers waiting for subscribers
+        self._waiting_readers = 0
+        self._waiting_writers = 0
+        # Held with a plain with self._lock (Condition.__enter__ is a Python-level call)
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # Backpressure statistics
+        self.blocked = 0
+        self.blocked_seconds = 0.0
+        self.cut_off = 0
+    
+    def subscribe(self, name: str = None, after: int = None, batch_size: int = 1000,
+                  max_pending: int = None, block: bool = False) -> "Subscription":
+        """
+        Start receiving the events published after a sequence number
+        
+        Args:
+            name       : Name of the subscriber in stats() (default: subscriber-N)
+            after      : Sequence number of the last event already processed; the
+                         subscriber receives the events after it (default: only
+                         the events published from now on)
+            batch_size : Most events returned by one poll
+            max_pending: Size of the subscriber's buffer (default: retention)
+            block      : True to make writers wait for the subscriber when its
+                         buffer is full, False to cut it off
+        
+        Returns:
+            The Subscription
+        
+        Raises:
+            InventoryException    : if an argument is invalid
+            SubscriberLagException: if the events after `after` are no longer retained
+        """
+        if max_pending is None:
+            max_pending = self.retention
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise InventoryException("Batch size must be a positive integer")
+        if not isinstance(max_pending, int) or not 1 <= max_pending <= self.retention:
+            raise InventoryException("Max pending must be a positive integer, at most the retention")
+        with self._lock:
+            if after is None:
+                after = self.sequence
+            elif not isinstance(after, int) or after > self.sequence:
+                raise InventoryException(f"Sequence must be an integer not after the last one ({self.sequence})")
+            elif after + 1 < self.first or self.sequence - after > max_pending:
+                raise SubscriberLagException(f"Events after sequence {after} are no longer available "
+                                             f"(oldest retained: {self.first})", after)
+            if name is None:
+                name = f"subscriber-{len(self.subscriptions) + 1}"
+            subscription = Subscription(self, name, after, batch_size, max_pending, block)
+            self.subscriptions.append(subscription)
+            if block:
+                self._update_limit()
+            return subscription
+    
+    def stats(self) -> dict:
+        """
+        Sequence numbers, backpressure counters and the lag of every subscriber:
+            sequence, first_retained, retained, blocked, blocked_seconds, cut_off,
+            subscribers: {name: {"position", "lag", "delivered", "block"}}
+        """
+        with self._lock:
+            return {
+                "sequence": self.sequence,
+                "first_retained": self.first,
+                "retained": len(self.events),
+                "blocked": self.blocked,
+                "blocked_seconds": self.blocked_seconds,
+                "cut_off": self.cut_off,
+                "subscribers": {subscription.name: {"position": subscription.position,
+                                                    "lag": self.sequence - subscription.position,
+                                                    "delivered": subscription.delivered,
+                                                    "block": subscription.block}
+                                for subscription in self.subscriptions},
+            }
+    
+    def _update_limit(self) -> None:
+        """Recompute the room of the blocking subscribers (with the lock held)"""
+        limits = [s.position + s.max_pending for s in self.subscriptions if s.block]
+        self._limit = min(limits) if limits else None
+        if self._waiting_writers:
+            self._condition.notify_all()
+    
+    def _remove(self, subscription: "Subscription") -> None:
+        """Stop tracking a subscription (with the lock held)"""
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+            if subscription.block:
+                self._update_limit()
+    
+    def wait_for_room(self) -> None:
+        """
+        Backpressure for defer_backpressure: wait until the blocking subscribers
+        have room for every event published so far (or were cut off)
+        
+        Called by a writer after its change, while it holds no lock the
+        readers or the other writers need.
+        """
+        if self._limit is None:
+            return
+        with self._lock:
+            if self._limit is not None and self.sequence > self._limit:
+                self._wait_for_room(0)
+    
+    def _publish(self, op: str, product_id: int, fields) -> None:
+        with self._lock:
+            if self._limit is not None and self.sequence >= self._limit and not self.defer_backpressure:
+                self._wait_for_room(1)
+            self.sequence = sequence = self.sequence + 1
+            events = self.events
+            events.append((sequence, op, product_id, fields))
+            if len(events) >= 2 * self.retention:
+                # Trimmed retention events at a time, so the cost is amortized
+                drop = len(events) - self.retention
+                del events[:drop]
+                self.first += drop
+            if self._waiting_readers:
+                self._condition.notify_all()
+    
+    def _wait_for_room(self, events: int) -> None:
+        """Backpressure: wait until the blocking subscribers have room for events more events (with the lock held)"""
+        self.blocked += 1
+        start = monotonic()
+        deadline = start + self.block_timeout
+        self._waiting_writers += 1
+        try:
+            # Other writers may publish while this one waits, so the room is checked again every time
+            while self._limit is not None and self.sequence + events > self._limit:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    # Too slow: cut off the blocking subscribers without room
+                    for subscription in list(self.subscriptions):
+                        if subscription.block and subscription.position + subscription.max_pending < self.sequence + events:
+                            subscription.lost = True
+                            self.cut_off += 1
+                            self._remove(subscription)
+                    break
+                self._condition.wait(remaining)
+        finally:
+            self._waiting_writers -= 1
+            self.blocked_seconds += monotonic() - start
+    
+    def on_add(self, product) -> None:
+        self._publish(self.ADD, product.product_id,
+                      (product.name, product.category, product.quantity, product.price, product.supplier))
+    
+    def on_update(self, product, old_values: dict) -> None:
+        # Same keys as old_values (copying the dict is cheaper than a comprehension)
+        fields = old_values.copy()
+        for field in fields:
+            fields[field] = getattr(product, field)
+        self._publish(self.UPDATE, product.product_id, fields)
+    
+    def on_delete(self, product) -> None:
+        self._publish(self.DELETE, product.product_id, None)
+
+
+class Subscription:
+    """
+    Position of one subscriber in a ChangeStream
+    
+    poll() returns the next batch of events and moves the position past
+    them. A subscriber that stores the sequence number of the last event it
+    processed can resume from it with ChangeStream.subscribe(after=...).
+    """
+    
+    def __init__(self, stream: ChangeStream, name: str, position: int, batch_size: int,
+                 max_pending: int, block: bool) -> None:
+        self.stream = stream
+        self.name = name
+        # Sequence number of the last event returned by poll
+        self.position = position
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.block = block
+        self.delivered = 0
+        self.closed = False
+        # Set when a blocked writer cut the subscriber off
+        self.lost = False
+    
+    @property
+    def lag(self) -> int:
+        """Number of events published but not polled yet"""
+        return self.stream.sequence - self.position
+    
+    def poll(self, timeout: float = 0.0, max_events: int = None) -> list:
+        """
+        Return the next events, oldest first (an empty list if there is none)
+        
+        Args:
+            timeout   : Seconds to wait for an event when there is none yet (None waits forever)
+            max_events: Most events returned (default: batch_size)
+        
+        Raises:
+            InventoryException    : if the subscription is closed
+            SubscriberLagException: if the subscriber fell behind its buffer and was cut off
+        """
+        stream = self.stream
+        with stream._lock:
+            self._check()
+            if stream.sequence == self.position and timeout != 0:
+                deadline = None if timeout is None else monotonic() + timeout
+                stream._waiting_readers += 1
+                try:
+                    while stream.sequence == self.position and not self.lost and not self.closed:
+                        remaining = None if deadline is None else deadline - monotonic()
+                        if remaining is not None and remaining <= 0:
+                            break
+                        stream._condition.wait(remaining)
+                finally:
+                    stream._waiting_readers -= 1
+                if self.closed:
+                    # Closed by another thread while waiting
+                    return []
+                self._check()
+            start = self.position + 1 - stream.first
+            batch = stream.events[start:start + (max_events or self.batch_size)]
+            if batch:
+                self.position += len(batch)
+                self.delivered += len(batch)
+                if self.block:
+                    stream._update_limit()
+            return batch
+    
+    def _check(self) -> None:
+        """Raise if the subscriber can not poll any more (with the lock held)"""
+        if self.closed:
+            raise InventoryException(f"Subscription {self.name!r} is closed")
+        stream = self.stream
+        # A blocking subscriber is only cut off by a writer that waited too long
+        # (its buffer may run over with defer_backpressure)
+        behind = not self.block and stream.sequence - self.position > self.max_pending
+        if self.lost or behind or self.position + 1 < stream.first:
+            if not self.lost:
+                self.lost = True
+                stream.cut_off += 1
+            self.closed = True
+            stream._remove(self)
+            raise SubscriberLagException(f"Subscriber {self.name!r} fell more than {self.max_pending} events "
+                                         f"behind, resume after sequence {self.position}", self.position)
+    
+    def close(self) -> None:
+        """Stop receiving events"""
+        with self.stream._lock:
+            self.closed = True
+            self.stream._remove(self)
+            # Wake up a poll waiting on another thread
+            self.stream._condition.notify_all()
+    
+    def __enter__(self) -> "Subscription":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
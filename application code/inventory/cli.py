@@ -0,0 +1,340 @@
+"""
+Command line interface of the inventory (python -m inventory)
+
+    python -m inventory --data inventory-data run commands.txt
+    python -m inventory --sqlite inventory.db list --category Electronics
+    python -m inventory --data inventory-data snapshot
+
+--data keeps the inventory in a snapshot + journal directory
+(InventoryPersistence), --sqlite in a SQLite database. The last order id
+handed out is kept next to it (DIR/last-order-id or FILE.last-order-id),
+so the order ids of later runs continue from it.
+"""
+
+import argparse
+import os
+import re
+import sys
+from time import perf_counter
+
+from .exceptions import InventoryException
+from .orders import Order
+
+
+class BatchRunner:
+    """
+    Executes batch command files against a repository
+    
+    Commands (one per line; fields with spaces are quoted, a field starting
+    with "#" begins a comment):
+        add NAME CATEGORY QUANTITY PRICE SUPPLIER
+        update PRODUCT_ID [quantity=N] [price=N] [supplier=NAME]
+        delete PRODUCT_ID
+        order PRODUCT_ID:QUANTITY [PRODUCT_ID:QUANTITY ...] [customer=NAME]
+    
+    A run of consecutive add, update or delete commands is applied with one
+    bulk call (add_products, update_products, delete_products), which gives
+    the same result as applying them one by one: new products still get
+    the lowest free ids in order, and every failed command is reported with
+    its line. An order with several lines is placed all or nothing. Orders
+    are numbered from last_order_id + 1 (or after the highest id in the
+    repository's order log).
+    """
+    
+    UPDATE_FIELDS = ("quantity", "price", "supplier")
+    
+    def __init__(self, repo, chunk_size: int = 10000, err=sys.stderr, last_order_id: int = 0) -> None:
+        """
+        Args:
+            repo         : Repository the commands are applied to
+            chunk_size   : Most commands applied by one bulk call
+            err          : Stream the failed commands are reported to
+            last_order_id: Order id used last (by an earlier run)
+        """
+        self.repo = repo
+        self.chunk_size = chunk_size
+        self.err = err
+        self.commands = 0
+        self.failed = 0
+        self.orders = 0
+        order_log = getattr(repo, "order_log", None)
+        if order_log is not None and len(order_log):
+            last_order_id = max(last_order_id, max(order_log.order_ids))
+        self.last_order_id = last_order_id
+        # Bulk run being collected: command name, rows and their line numbers
+        self._kind = None
+        self._rows = []
+        self._lines = []
+        self._source = None
+        # (line number, message) of the failed commands not reported yet
+        self._errors = []
+    
+    @staticmethod
+    def _int(text: str, what: str) -> int:
+        try:
+            return int(text)
+        except ValueError:
+            raise InventoryException(f"{what} must be an integer: {text!r}")
+    
+    # Piece of a field: "double quoted", 'single quoted' or plain characters
+    _PIECE = re.compile(r'"([^"]*)"|\'([^\']*)\'|([^\s"\']+)')
+    
+    @classmethod
+    def split(cls, line: str) -> list:
+        """
+        Fields of a command line (like shlex.split, without escapes)
+        
+        Raises:
+            ValueError: if a quote is not closed
+        """
+        if '"' not in line and "'" not in line and "#" not in line:
+            return line.split()
+        fields = []
+        position, end = 0, len(line)
+        while True:
+            # Skip the blanks between the fields
+            while position < end and line[position].isspace():
+                position += 1
+            if position == end or line[position] == "#":
+                return fields
+            # A field runs up to the next blank; quoted pieces may contain blanks
+            pieces = []
+            while position < end and not line[position].isspace():
+                match = cls._PIECE.match(line, position)
+                if match is None:
+                    raise ValueError(f"No closing quotation at column {position + 1}")
+                double, single, plain = match.groups()
+                pieces.append(plain if plain is not None else double if double is not None else single)
+                position = match.end()
+            fields.append("".join(pieces))
+    
+    def _fail(self, line_number: int, message: str) -> None:
+        self.failed += 1
+        self._errors.append((line_number, message))
+    
+    def _report(self) -> None:
+        """Write the failed commands so far, in line order"""
+        self._errors.sort()
+        for line_number, message in self._errors:
+            self.err.write(f"{self._source}:{line_number}: {message}\n")
+        self._errors = []
+    
+    def run_file(self, path: str) -> None:
+        """Execute the commands of a file ("-" reads standard input)"""
+        if path == "-":
+            self.run_lines(sys.stdin, "<stdin>")
+            return
+        with open(path, encoding="utf-8") as f:
+            self.run_lines(f, path)
+    
+    def run_lines(self, lines, source: str = "<batch>") -> None:
+        """Execute the commands of an iterable of lines"""
+        self._source = source
+        for line_number, line in enumerate(lines, 1):
+            try:
+                fields = self.split(line)
+            except ValueError as e:
+                self.commands += 1
+                self._fail(line_number, f"Can not parse the line: {e}")
+                continue
+            if not fields:
+                continue
+            self.commands += 1
+            command, fields = fields[0].lower(), fields[1:]
+            try:
+                if command == "add":
+                    if len(fields) != 5:
+                        raise InventoryException("add takes NAME CATEGORY QUANTITY PRICE SUPPLIER")
+                    name, category, quantity, price, supplier = fields
+                    row = (name, category, self._int(quantity, "Quantity"), self._int(price, "Price"), supplier)
+                elif command == "update":
+                    if not fields:
+                        raise InventoryException("update takes PRODUCT_ID [quantity=N] [price=N] [supplier=NAME]")
+                    row = {"product_id": self._int(fields[0], "Product id")}
+                    for field in fields[1:]:
+                        key, _, value = field.partition("=")
+                        if key not in self.UPDATE_FIELDS or not value:
+                            raise InventoryException(f"Unknown update field: {field!r}")
+                        row[key] = value if key == "supplier" else self._int(value, key.capitalize())
+                elif command == "delete":
+                    if len(fields) != 1:
+                        raise InventoryException("delete takes PRODUCT_ID")
+                    row = self._int(fields[0], "Product id")
+                elif command == "order":
+                    self._flush()
+                    self._order(fields)
+                    continue
+                else:
+                    raise InventoryException(f"Unknown command: {command!r}")
+            except InventoryException as e:
+                self._fail(line_number, str(e))
+                continue
+            except Exception as e:
+                # A failure the repository did not expect (e.g. OverflowError) fails
+                # this command only, the rest of the batch still runs
+                self._fail(line_number, f"{type(e).__name__}: {e}")
+                continue
+            
+            if command != self._kind or len(self._rows) >= self.chunk_size:
+                self._flush()
+                self._kind = command
+            self._rows.append(row)
+            self._lines.append(line_number)
+        self._flush()
+    
+    def _flush(self) -> None:
+        """Apply the collected run of add/update/delete commands with one bulk call"""
+        if not self._rows:
+            self._report()
+            return
+        bulk = {"add": self.repo.add_products, "update": self.repo.update_products,
+                "delete": self.repo.delete_products}[self._kind]
+        lines = self._lines
+        try:
+            result = bulk(self._rows)
+            for row_number, message in result.errors:
+                self._fail(lines[row_number], message)
+        except Exception as e:
+            # The whole bulk call failed: every command of the run is reported
+            message = str(e) if isinstance(e, InventoryException) else f"{type(e).__name__}: {e}"
+            for line_number in lines:
+                self._fail(line_number, message)
+        finally:
+            self._kind = None
+            self._rows = []
+            self._lines = []
+            self._report()
+    
+    def _order(self, fields: list) -> None:
+        """Place one order (its line number is reported by the caller on errors)"""
+        customer = None
+        lines = []
+        for field in fields:
+            if field.startswith("customer="):
+                customer = field[len("customer="):] or None
+                continue
+            product_id, separator, quantity = field.partition(":")
+            if not separator:
+                raise InventoryException(f"Order lines are PRODUCT_ID:QUANTITY, not {field!r}")
+            lines.append((self._int(product_id, "Product id"), self._int(quantity, "Quantity")))
+        if not lines:
+            raise InventoryException("order takes PRODUCT_ID:QUANTITY [PRODUCT_ID:QUANTITY ...] [customer=NAME]")
+        
+        self.orders += 1
+        self.last_order_id += 1
+        order = Order(self.last_order_id, [])
+        if len(lines) == 1:
+            order.place_order(*lines[0], self.repo, customer_info=customer)
+        else:
+            order.place_multi_line_order(lines, self.repo, customer_info=customer)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m inventory", description="Retail inventory management",
+                                     epilog=BatchRunner.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--data", metavar="DIR", help="snapshot + journal directory (created if missing)")
+    where.add_argument("--sqlite", metavar="FILE", help="SQLite database file (created if missing)")
+    parser.add_argument("--storage", default="list", choices=("list", "indexed", "columnar"),
+                        help="in-memory storage for --data (default: list)")
+    parser.add_argument("--group-commit", type=int, default=1024,
+                        help="journal records per fsync for --data (default: 1024); a crash loses the "
+                             "records not fsync'ed yet, the run's summary is printed after the last fsync")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="execute batch command files")
+    run.add_argument("files", nargs="+", help='command files ("-" for standard input)')
+    run.add_argument("--chunk-size", type=int, default=10000, help="most commands per bulk call")
+    listing = commands.add_parser("list", help="print the products (tab separated)")
+    listing.add_argument("--category", help="only the products of this category")
+    commands.add_parser("snapshot", help="write a snapshot and truncate the journal (--data only)")
+    return parser
+
+
+def order_id_path(args) -> str:
+    """File keeping the last order id of the --data directory or --sqlite database"""
+    if args.sqlite:
+        return args.sqlite + ".last-order-id"
+    return os.path.join(args.data, "last-order-id")
+
+
+def read_last_order_id(path: str) -> int:
+    """The last order id stored in path (0 if there is none yet)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+    except ValueError:
+        raise InventoryException(f"Can not read the last order id from {path}")
+
+
+def write_last_order_id(path: str, order_id: int) -> None:
+    """Store the last order id (written to a temporary file and renamed over the old one)"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(f"{order_id}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def open_repository(args):
+    """(repository, closer) for the --data or --sqlite arguments"""
+    if args.sqlite:
+        from .sqlite import SQLiteProductRepository
+        
+        repo = SQLiteProductRepository(args.sqlite)
+        return repo, repo
+    from .persistence import InventoryPersistence
+    
+    persistence = InventoryPersistence(args.data, group_commit=args.group_commit)
+    return persistence.open(args.storage), persistence
+
+
+def main(argv: list = None) -> int:
+    """Run the command line; returns the exit status (1 if a command failed)"""
+    args = build_parser().parse_args(argv)
+    try:
+        repo, closer = open_repository(args)
+    except (InventoryException, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    
+    try:
+        if args.command == "run":
+            id_path = order_id_path(args)
+            last_order_id = read_last_order_id(id_path)
+            runner = BatchRunner(repo, args.chunk_size, last_order_id=last_order_id)
+            start = perf_counter()
+            try:
+                for path in args.files:
+                    runner.run_file(path)
+            finally:
+                if runner.last_order_id != last_order_id:
+                    write_last_order_id(id_path, runner.last_order_id)
+            if args.data:
+                # Nothing is reported done before the journal is on disk
+                closer.commit()
+            elapsed = perf_counter() - start
+            print(f"{runner.commands} commands, {runner.failed} failed in {elapsed:.3f} s "
+                  f"({runner.commands / elapsed if elapsed else 0:,.0f} commands/s)")
+            return 1 if runner.failed else 0
+        
+        if args.command == "list":
+            products = repo.inventory if args.category is None else repo.find_by("category", args.category)
+            write = sys.stdout.write
+            for p in products:
+                write(f"{p.product_id}\t{p.name}\t{p.category}\t{p.quantity}\t{p.price}\t{p.supplier}\n")
+            return 0
+        
+        if args.command == "snapshot":
+            if args.sqlite:
+                print("error: snapshot needs --data", file=sys.stderr)
+                return 2
+            closer.snapshot()
+            return 0
+    except (InventoryException, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        closer.close()
@@ -0,0 +1,44 @@
+"""Exceptions raised by the inventory classes"""
+
+
+class InventoryException(Exception):
+    """Base exception for inventory management system"""
+    pass
+
+
+class InvalidProductDataException(InventoryException):
+    """Raised when product data is invalid"""
+    pass
+
+
+class InvalidOrderDataException(InventoryException):
+    """"Raised when order data is invalid"""
+    pass
+
+
+class MoreThanOneProductException(InventoryException):
+    """
+    Raised when the customer orders more than one product
+    
+    Orders take any number of products now, so nothing raises it any more;
+    it is kept for the code that still catches it.
+    """
+    pass
+
+
+class BulkOperationException(InventoryException):
+    """Raised when an all-or-nothing bulk operation has invalid rows"""
+    
+    def __init__(self, message: str, errors: list) -> None:
+        super().__init__(message)
+        # List of (row number, error message) tuples
+        self.errors = errors
+
+
+class SubscriberLagException(InventoryException):
+    """Raised when a change stream subscriber fell behind and its events are no longer available"""
+    
+    def __init__(self, message: str, sequence: int) -> None:
+        super().__init__(message)
+        # Sequence number of the last event the subscriber received (resume after it)
+        self.sequence = sequence
@@ -0,0 +1,205 @@
+"""asyncio order-ingestion service"""
+
+import asyncio
+from operator import itemgetter
+
+from .exceptions import InvalidOrderDataException, InventoryException
+from .repository import ProductRepository
+
+
+class OrderIngestionService:
+    """
+    asyncio service placing a stream of single-product orders in micro-batches
+    
+    Callers await submit(). Orders wait in a bounded queue (a full queue makes
+    submit() wait, which is the backpressure). The worker takes up to
+    batch_size orders, or whatever arrived within batch_window seconds, sorts
+    them by product_id and applies the whole batch in one sweep over the
+    inventory with ProductRepository.reserve_stock_batch. Every caller gets the
+    success message of its own order, or its error raised: an unexpected
+    error fails the orders of its batch only, and the orders the worker can
+    no longer place (queued after stop(), or after the worker died) fail
+    instead of waiting forever. Orders are numbered from last_order_id + 1
+    (or after the highest id in the repository's order log), like the
+    batch CLI does.
+    
+    Usage:
+        async with OrderIngestionService(repo) as service:
+            message = await service.submit(product_id=1, quantity=2)
+    """
+    
+    def __init__(self, repo: ProductRepository, max_queue: int = 10000, batch_size: int = 256,
+                 batch_window: float = 0.002, last_order_id: int = 0) -> None:
+        if not isinstance(repo, ProductRepository):
+            raise InvalidOrderDataException("Product repository must be a ProductRepository object")
+        if not isinstance(max_queue, int) or max_queue < 1:
+            raise InventoryException("Queue size must be a positive integer")
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise InventoryException("Batch size must be a positive integer")
+        if not isinstance(batch_window, (int, float)) or batch_window < 0:
+            raise InventoryException("Batch window must be a non-negative number of seconds")
+        if not isinstance(last_order_id, int) or last_order_id < 0:
+            raise InventoryException("Last order id must be a non-negative integer")
+        
+        self.repo = repo
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._queue = None
+        self._worker = None
+        # Ids of the orders placed before must not be handed out again
+        order_log = getattr(repo, "order_log", None)
+        if order_log is not None and len(order_log):
+            last_order_id = max(last_order_id, max(order_log.order_ids))
+        self.last_order_id = last_order_id
+        # Statistics
+        self.batches = 0
+        self.orders = 0
+    
+    async def start(self) -> None:
+        """Start the batching worker on the running event loop"""
+        if self._worker is not None:
+            raise InventoryException("The ingestion service is already running")
+        self._queue = asyncio.Queue(self.max_queue)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Place every order already queued, then stop the worker (orders submitted meanwhile fail)"""
+        if self._worker is None:
+            return
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+    
+    async def submit(self, product_id: int, quantity: int, customer_info: str = None) -> str:
+        """
+        Queue an order and wait until its batch was applied
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidOrderDataException  : If any passed parameter is invalid or there is
+                                         not enough quantity
+            InvalidProductDataException: If the product does not exist
+            InventoryException         : If the service is not running
+        """
+        if not isinstance(product_id, int) or product_id < 1:
+            raise InvalidOrderDataException("Product id must be a positive integer")
+        if not isinstance(quantity, int) or quantity < 0:
+            raise InvalidOrderDataException("Product quantity must be an integer number")
+        if customer_info is not None and (not isinstance(customer_info, str) or not customer_info):
+            raise InvalidOrderDataException("Customer info must be a non-empty string")
+        if self._worker is None or self._worker.done():
+            raise InventoryException("The ingestion service is not running")
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((product_id, quantity, future, customer_info))
+        if self._worker is None or self._worker.done():
+            # The worker stopped while this order waited for room in the queue
+            self._fail_queued()
+        return await future
+    
+    def _fail_queued(self) -> None:
+        """Fail the orders left in the queue once the worker stopped"""
+        error = InventoryException("The ingestion service stopped before placing the order")
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if item is not None and not item[2].done():
+                item[2].set_exception(error)
+    
+    async def _run(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        stopping = False
+        batch = []
+        try:
+            while not stopping:
+                first = await queue.get()
+                if first is None:
+                    break
+                
+                # Collect a micro-batch: up to batch_size orders or until the window closes
+                batch = [first]
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.batch_size:
+                    try:
+                        item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                
+                # One bad batch fails its own orders, the worker keeps running
+                try:
+                    self._apply(batch)
+                except Exception as e:
+                    self._fail(batch, InventoryException(f"Order not done successfully {str(e)}"))
+                batch = []
+        finally:
+            # Nobody is left to place the orders of an interrupted batch or
+            # the ones queued after the stop sentinel
+            self._fail(batch, InventoryException("The ingestion service stopped before placing the order"))
+            self._fail_queued()
+    
+    @staticmethod
+    def _fail(batch: list, error: Exception) -> None:
+        """Fail the orders of a batch that are still waiting"""
+        for item in batch:
+            if not item[2].done():
+                item[2].set_exception(error)
+    
+    def _apply(self, batch: list) -> None:
+        """Place one batch of orders and resolve the callers' futures"""
+        # Callers that gave up are dropped before any stock is taken
+        batch = [item for item in batch if not item[2].cancelled()]
+        # The sort is stable, so orders of one product keep their arrival order
+        batch.sort(key=itemgetter(0))
+        
+        order_log = getattr(self.repo, "order_log", None)
+        if order_log is not None:
+            # Orders that do not fit the order history are rejected before any stock is taken
+            fitting = []
+            for item in batch:
+                try:
+                    order_log.check(self.last_order_id + 1, [(item[0], item[1])])
+                except InvalidOrderDataException as e:
+                    item[2].set_exception(e)
+                    continue
+                fitting.append(item)
+            batch = fitting
+        
+        try:
+            results = self.repo.reserve_stock_batch([(item[0], item[1]) for item in batch])
+        except Exception as e:
+            results = [InventoryException(f"Order not done successfully {str(e)}")] * len(batch)
+        
+        for (product_id, quantity, future, customer_info), error in zip(batch, results):
+            if error is None:
+                self.last_order_id = order_id = self.last_order_id + 1
+                if order_log is not None:
+                    order_log.append(order_id, product_id, quantity, customer_info)
+                future.set_result(f"Order placed successfully. Order ID: {order_id}")
+            else:
+                future.set_exception(error)
+        
+        self.batches += 1
+        self.orders += len(batch)
@@ -0,0 +1,551 @@
+"""Inventory listeners: secondary indexes, range indexes and the low-stock monitor"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+from heapq import heapify, heappop, heappush, nsmallest
+from math import ceil, floor, inf
+import threading
+
+from .exceptions import InventoryException
+
+
+class IInventoryListener(ABC):
+    """
+    Abstract base class for objects that follow the changes of a ProductRepository.
+    
+    Listeners are registered with ProductRepository.add_listener and are
+    called after every change, with the product as it is after the change.
+    """
+    
+    @abstractmethod
+    def on_add(self, product) -> None:
+        """Called after product was added to the inventory"""
+        pass
+    
+    @abstractmethod
+    def on_update(self, product, old_values: dict) -> None:
+        """Called after product was changed, old_values maps each changed field to its old value"""
+        pass
+    
+    @abstractmethod
+    def on_delete(self, product) -> None:
+        """Called after product was deleted from the inventory"""
+        pass
+
+
+class SecondaryIndex(IInventoryListener):
+    """
+    Hash index mapping the values of one product attribute to product ids
+    
+    Time complexity:
+        lookup                    : O(1) + size of the result
+        on_add/on_update/on_delete: O(1)
+    """
+    
+    def __init__(self, attribute: str) -> None:
+        self.attribute = attribute
+        self.entries = {}
+    
+    def build(self, products) -> None:
+        """Fill the index from an iterable of products"""
+        self.entries = {}
+        for product in products:
+            self.on_add(product)
+    
+    def lookup(self, value) -> set:
+        """Return the ids of the products whose attribute equals value"""
+        return self.entries.get(value, set())
+    
+    def on_add(self, product) -> None:
+        value = getattr(product, self.attribute)
+        ids = self.entries.get(value)
+        if ids is None:
+            self.entries[value] = ids = set()
+        ids.add(product.product_id)
+    
+    def on_update(self, product, old_values: dict) -> None:
+        if self.attribute not in old_values:
+            return
+        self._discard(old_values[self.attribute], product.product_id)
+        self.on_add(product)
+    
+    def on_delete(self, product) -> None:
+        self._discard(getattr(product, self.attribute), product.product_id)
+    
+    def _discard(self, value, product_id: int) -> None:
+        ids = self.entries.get(value)
+        if ids is not None:
+            ids.discard(product_id)
+            # Drop empty buckets so values that are gone stop showing up
+            if not ids:
+                del self.entries[value]
+
+
+class SortedBuckets:
+    """
+    Sorted list of entries split into buckets of about load entries
+    
+    The last entry of every bucket is kept in maxes, so an entry is found
+    with one bisect over maxes and one inside its bucket, and inserting or
+    removing only shifts one bucket. With a weight function, the total
+    weight of every bucket is kept in sums for range aggregates.
+    
+    Positions are (bucket, offset) tuples.
+    
+    Time complexity:
+        insert, remove, position: O(log n + load)
+        iterate                 : O(1) per entry
+        count, total            : O(load + n / load)
+    """
+    
+    def __init__(self, load: int = 512, weight=None) -> None:
+        self.load = load
+        self.weight = weight
+        self.buckets = []
+        self.maxes = []
+        self.sums = []
+        self._len = 0
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def build(self, entries: list) -> None:
+        """Replace the content by a sorted list of entries"""
+        load = self.load
+        self.buckets = [entries[i:i + load] for i in range(0, len(entries), load)]
+        self.maxes = [bucket[-1] for bucket in self.buckets]
+        self.sums = [sum(map(self.weight, bucket)) for bucket in self.buckets] if self.weight else []
+        self._len = len(entries)
+    
+    def insert(self, entry) -> None:
+        buckets, maxes, weight = self.buckets, self.maxes, self.weight
+        self._len += 1
+        if not buckets:
+            buckets.append([entry])
+            maxes.append(entry)
+            if weight:
+                self.sums.append(weight(entry))
+            return
+        i = bisect_left(maxes, entry)
+        if i == len(maxes):
+            # Bigger than every entry: goes at the end of the last bucket
+            i -= 1
+            buckets[i].append(entry)
+            maxes[i] = entry
+        else:
+            bucket = buckets[i]
+            bucket.insert(bisect_left(bucket, entry), entry)
+        if weight:
+            self.sums[i] += weight(entry)
+        
+        bucket = buckets[i]
+        if len(bucket) > 2 * self.load:
+            # Split the bucket in two halves
+            half = bucket[self.load:]
+            del bucket[self.load:]
+            buckets.insert(i + 1, half)
+            maxes[i] = bucket[-1]
+            maxes.insert(i + 1, half[-1])
+            if weight:
+                half_sum = sum(map(weight, half))
+                self.sums[i] -= half_sum
+                self.sums.insert(i + 1, half_sum)
+    
+    def remove(self, entry) -> bool:
+        """Remove entry; return False if it is not there"""
+        buckets, maxes = self.buckets, self.maxes
+        i = bisect_left(maxes, entry)
+        if i == len(maxes):
+            return False
+        bucket = buckets[i]
+        j = bisect_left(bucket, entry)
+        if j == len(bucket) or bucket[j] != entry:
+            return False
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            if self.weight:
+                self.sums[i] -= self.weight(entry)
+            maxes[i] = bucket[-1]
+        else:
+            del buckets[i], maxes[i]
+            if self.weight:
+                del self.sums[i]
+        return True
+    
+    @property
+    def end(self) -> tuple:
+        """The position after the last entry"""
+        return len(self.buckets), 0
+    
+    def position(self, entry) -> tuple:
+        """Position of the first entry not smaller than entry"""
+        i = bisect_left(self.maxes, entry)
+        if i == len(self.maxes):
+            return i, 0
+        return i, bisect_left(self.buckets[i], entry)
+    
+    def iterate(self, start: tuple = (0, 0), end: tuple = None):
+        """Yield the entries from position start up to (not including) position end"""
+        (i, j), (k, l) = start, end or self.end
+        buckets = self.buckets
+        while (i, j) < (k, l):
+            bucket = buckets[i]
+            yield from bucket[j:l] if i == k else bucket[j:]
+            i, j = i + 1, 0
+    
+    def count(self, start: tuple, end: tuple) -> int:
+        """Number of entries between two positions"""
+        (i, j), (k, l) = start, end
+        if (i, j) >= (k, l):
+            return 0
+        if i == k:
+            return l - j
+        return len(self.buckets[i]) - j + sum(map(len, self.buckets[i + 1:k])) + l
+    
+    def total(self, start: tuple, end: tuple):
+        """Total weight of the entries between two positions"""
+        (i, j), (k, l) = start, end
+        if (i, j) >= (k, l):
+            return 0
+        weight, buckets = self.weight, self.buckets
+        if i == k:
+            return sum(map(weight, buckets[i][j:l]))
+        result = sum(map(weight, buckets[i][j:])) + sum(self.sums[i + 1:k])
+        if l:
+            result += sum(map(weight, buckets[k][:l]))
+        return result
+    
+    def check(self) -> list:
+        """Check the bucket bookkeeping; return the problems found"""
+        problems = []
+        entries = list(self.iterate())
+        if any(a > b for a, b in zip(entries, entries[1:])):
+            problems.append("entries are out of order")
+        if self._len != len(entries):
+            problems.append(f"length {self._len}, {len(entries)} entries")
+        if any(not bucket or bucket[-1] != top for bucket, top in zip(self.buckets, self.maxes)):
+            problems.append("bucket maxima are out of date")
+        if self.weight and any(total != sum(map(self.weight, bucket))
+                               for total, bucket in zip(self.sums, self.buckets)):
+            problems.append("bucket sums are out of date")
+        return problems
+
+
+class RangeIndex(IInventoryListener):
+    """
+    Sorted index on a numeric product attribute (price, quantity) for range queries
+    
+    Every product is one integer entry value << ID_BITS | product_id, so entries
+    sort by value and then by id and compare as plain ints. The entries live
+    in SortedBuckets weighted by their value, so count() and sum() add up
+    whole buckets without visiting their entries.
+    
+    Ranges are inclusive: low <= value <= high, None meaning unbounded. The
+    bounds may be floats (a float bound is rounded inwards to an integer).
+    
+    Time complexity:
+        on_add/on_update/on_delete: O(log n + LOAD)
+        irange                    : O(log n) + O(1) per returned entry
+        count, sum                : O(log n + LOAD + n / LOAD)
+    """
+    
+    LOAD = 512
+    # Product ids must stay below 2 ** ID_BITS
+    ID_BITS = 40
+    
+    def __init__(self, attribute: str) -> None:
+        self.attribute = attribute
+        self._id_mask = (1 << self.ID_BITS) - 1
+        # entry >> ID_BITS as a C function, for map()
+        self.entries = SortedBuckets(self.LOAD, self.ID_BITS.__rrshift__)
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def _entry(self, value: int, product_id: int) -> int:
+        if not 0 <= product_id <= self._id_mask:
+            raise InventoryException(f"Product id {product_id} is too big for a range index")
+        if not isinstance(value, int) or value < 0:
+            raise InventoryException(f"Range index {self.attribute!r} needs non-negative integer values")
+        return value << self.ID_BITS | product_id
+    
+    def build(self, products) -> None:
+        """Fill the index from an iterable of products"""
+        attribute, entry = self.attribute, self._entry
+        self.entries.build(sorted(entry(getattr(product, attribute), product.product_id) for product in products))
+    
+    def on_add(self, product) -> None:
+        self.entries.insert(self._entry(getattr(product, self.attribute), product.product_id))
+    
+    def on_update(self, product, old_values: dict) -> None:
+        if self.attribute not in old_values:
+            return
+        self.entries.remove(self._entry(old_values[self.attribute], product.product_id))
+        self.entries.insert(self._entry(getattr(product, self.attribute), product.product_id))
+    
+    def on_delete(self, product) -> None:
+        self.entries.remove(self._entry(getattr(product, self.attribute), product.product_id))
+    
+    @staticmethod
+    def check_bounds(low, high) -> None:
+        """Raise InventoryException unless both bounds are numbers or None"""
+        for bound in (low, high):
+            if bound is not None and (not isinstance(bound, (int, float)) or isinstance(bound, bool)):
+                raise InventoryException("Range bounds must be numbers or None")
+    
+    def _bounds(self, low, high) -> tuple:
+        self.check_bounds(low, high)
+        entries = self.entries
+        # The values are integers, so [50.5, 300.9] holds the same ones as [51, 300]
+        if isinstance(low, float):
+            if low != low or low == inf:
+                return entries.end, entries.end
+            low = None if low == -inf else ceil(low)
+        if isinstance(high, float):
+            if high != high or high == -inf:
+                return entries.end, entries.end
+            high = None if high == inf else floor(high)
+        if high is not None and (high < 0 or (low is not None and low > high)):
+            return entries.end, entries.end
+        start = (0, 0) if low is None or low <= 0 else entries.position(low << self.ID_BITS)
+        # The first entry of value high + 1 comes after every entry of value high
+        end = entries.end if high is None else entries.position((high + 1) << self.ID_BITS)
+        return start, end
+    
+    def irange(self, low=None, high=None):
+        """Yield (value, product_id) for every value in [low, high], in value order"""
+        shift, mask = self.ID_BITS, self._id_mask
+        for entry in self.entries.iterate(*self._bounds(low, high)):
+            yield entry >> shift, entry & mask
+    
+    def count(self, low=None, high=None) -> int:
+        """Number of products with a value in [low, high]"""
+        return self.entries.count(*self._bounds(low, high))
+    
+    def sum(self, low=None, high=None):
+        """Sum of the values in [low, high]"""
+        return self.entries.total(*self._bounds(low, high))
+    
+    def check(self, products) -> list:
+        """Compare the index with an iterable of products; return the problems found"""
+        attribute = self.attribute
+        expected = sorted((getattr(product, attribute), product.product_id) for product in products)
+        entries = list(self.irange())
+        problems = [f"Range index {attribute!r}: {problem}" for problem in self.entries.check()]
+        if entries != expected:
+            missing = sorted(set(expected) - set(entries))
+            extra = sorted(set(entries) - set(expected))
+            problems.append(f"Range index {attribute!r}: missing entries {missing[:10]}, extra entries {extra[:10]}")
+        return problems
+
+
+class LowStockMonitor(IInventoryListener):
+    """
+    Reorder-point monitor kept up to date on every quantity change
+    
+    Every product can have its own reorder threshold (or the default one);
+    a product is low on stock when its quantity is below its threshold.
+    
+    Structures:
+        quantities: product_id -> current quantity
+        heap      : min-heap of (quantity, product_id) entries; an entry is
+                    stale once the quantity of its product changed, stale
+                    entries are skipped and the heap is rebuilt when they
+                    outnumber the live ones
+        below     : ids of the products currently below their threshold
+    
+    Callbacks registered with add_callback(function) are called as
+    function(product, threshold) when a quantity change (an order or an
+    update) takes a product from at/above its threshold to below it, and
+    when a product is added below its threshold. A deleted product's
+    threshold is dropped with it, so a product reusing its id starts with
+    the default one.
+    Exceptions raised by callbacks do not fail the change; the last ones are
+    kept in callback_errors.
+    
+    Time complexity:
+        on_add/on_update/on_delete: O(log n)
+        lowest(k)                 : O(k log k) + the stale entries met
+        below_threshold()         : O(k log k) for k products below threshold
+    """
+    
+    def __init__(self, default_threshold: int = None) -> None:
+        if default_threshold is not None:
+            self._check_threshold(default_threshold)
+        self.default_threshold = default_threshold
+        self.thresholds = {}
+        self.quantities = {}
+        self.heap = []
+        self.below = set()
+        self.callbacks = []
+        self.callback_errors = deque(maxlen=100)
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def _check_threshold(threshold) -> None:
+        if not isinstance(threshold, int) or isinstance(threshold, bool) or threshold < 0:
+            raise InventoryException("Reorder threshold must be a non-negative integer")
+    
+    def threshold(self, product_id: int) -> int:
+        """Return the reorder threshold of a product (None if it has none)"""
+        return self.thresholds.get(product_id, self.default_threshold)
+    
+    def _is_below(self, product_id: int, quantity: int) -> bool:
+        threshold = self.thresholds.get(product_id, self.default_threshold)
+        return threshold is not None and quantity < threshold
+    
+    def set_threshold(self, product_id: int, threshold: int) -> None:
+        """Set the reorder threshold of one product (None to use the default again)"""
+        if threshold is not None:
+            self._check_threshold(threshold)
+        with self._lock:
+            if threshold is None:
+                self.thresholds.pop(product_id, None)
+            else:
+                self.thresholds[product_id] = threshold
+            quantity = self.quantities.get(product_id)
+            if quantity is not None:
+                self._update_below(product_id, quantity)
+    
+    def set_default_threshold(self, threshold: int) -> None:
+        """Change the default threshold (re-checks every product, O(n))"""
+        if threshold is not None:
+            self._check_threshold(threshold)
+        with self._lock:
+            self.default_threshold = threshold
+            self.below = {product_id for product_id, quantity in self.quantities.items()
+                          if self._is_below(product_id, quantity)}
+    
+    def add_callback(self, function) -> None:
+        """Call function(product, threshold) when a product falls below its threshold"""
+        if not callable(function):
+            raise InventoryException("Callback must be callable")
+        self.callbacks.append(function)
+    
+    def _update_below(self, product_id: int, quantity: int) -> bool:
+        """Update the below set; return True if the product just fell below"""
+        if self._is_below(product_id, quantity):
+            if product_id not in self.below:
+                self.below.add(product_id)
+                return True
+        else:
+            self.below.discard(product_id)
+        return False
+    
+    def _push(self, product_id: int, quantity: int) -> None:
+        heap = self.heap
+        heappush(heap, (quantity, product_id))
+        # Rebuild once most of the entries are stale
+        if len(heap) > 2 * len(self.quantities) + 64:
+            self.heap = [(quantity, product_id) for product_id, quantity in self.quantities.items()]
+            heapify(self.heap)
+    
+    def build(self, products) -> None:
+        """Fill the monitor from an iterable of products"""
+        with self._lock:
+            self.quantities = {product.product_id: product.quantity for product in products}
+            self.heap = [(quantity, product_id) for product_id, quantity in self.quantities.items()]
+            heapify(self.heap)
+            self.below = {product_id for product_id, quantity in self.quantities.items()
+                          if self._is_below(product_id, quantity)}
+    
+    def _set_quantity(self, product) -> None:
+        """Record the new quantity of a product and alert if it just fell below its threshold (lock held)"""
+        product_id, quantity = product.product_id, product.quantity
+        self.quantities[product_id] = quantity
+        self._push(product_id, quantity)
+        threshold = self.thresholds.get(product_id, self.default_threshold)
+        if threshold is None or quantity >= threshold:
+            self.below.discard(product_id)
+            return
+        if product_id in self.below:
+            return
+        self.below.add(product_id)
+        if self.callbacks:
+            for function in self.callbacks:
+                try:
+                    function(product, threshold)
+                except Exception as e:
+                    self.callback_errors.append((product_id, e))
+    
+    def on_add(self, product) -> None:
+        with self._lock:
+            self._set_quantity(product)
+    
+    def on_update(self, product, old_values: dict) -> None:
+        if "quantity" not in old_values:
+            return
+        with self._lock:
+            self._set_quantity(product)
+    
+    def on_delete(self, product) -> None:
+        with self._lock:
+            # The heap entry becomes stale; the id may be reused by a new product
+            self.quantities.pop(product.product_id, None)
+            self.thresholds.pop(product.product_id, None)
+            self.below.discard(product.product_id)
+    
+    def lowest(self, k: int) -> list:
+        """
+        Return the k products with the lowest stock as (product_id, quantity) tuples,
+        lowest first (ties by product_id)
+        
+        The heap is walked best-first from its root, so only about k entries
+        (plus the stale ones met on the way) are looked at.
+        """
+        if not isinstance(k, int) or k < 0:
+            raise InventoryException("k must be a non-negative integer")
+        with self._lock:
+            heap, quantities = self.heap, self.quantities
+            result = []
+            seen = set()
+            candidates = [(heap[0], 0)] if heap else []
+            while candidates and len(result) < k:
+                (quantity, product_id), i = heappop(candidates)
+                # Skip stale entries, and the duplicates of a quantity that came back
+                if quantities.get(product_id) == quantity and product_id not in seen:
+                    seen.add(product_id)
+                    result.append((product_id, quantity))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(heap):
+                        heappush(candidates, (heap[child], child))
+            return result
+    
+    def below_threshold(self, limit: int = None) -> list:
+        """
+        Return the products below their threshold as (product_id, quantity, threshold)
+        tuples, the furthest below first (ties by product_id)
+        
+        Args:
+            limit: Return only the first limit products (O(k log limit))
+        """
+        with self._lock:
+            quantities, thresholds, default = self.quantities, self.thresholds, self.default_threshold
+            rows = []
+            for product_id in self.below:
+                quantity = quantities[product_id]
+                threshold = thresholds.get(product_id, default)
+                rows.append((quantity - threshold, product_id, quantity, threshold))
+        if limit is not None:
+            rows = nsmallest(limit, rows)
+        else:
+            rows.sort()
+        return [(product_id, quantity, threshold) for _, product_id, quantity, threshold in rows]
+    
+    def check(self, products) -> list:
+        """Compare the monitor with an iterable of products; return the problems found"""
+        expected = LowStockMonitor(self.default_threshold)
+        expected.thresholds = self.thresholds
+        expected.build(products)
+        problems = []
+        with self._lock:
+            if expected.quantities != self.quantities:
+                problems.append("Low-stock monitor: quantities differ from the inventory")
+            if expected.below != self.below:
+                problems.append(f"Low-stock monitor: below-threshold set: missing {sorted(expected.below - self.below)}, "
+                                f"extra {sorted(self.below - expected.below)}")
+            if len(self.quantities) and self.lowest(1) != expected.lowest(1):
+                problems.append("Low-stock monitor: lowest stock differs from the inventory")
+        return problems
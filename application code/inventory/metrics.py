@@ -0,0 +1,245 @@
+"""Opt-in repository metrics: counters, latency histograms and their sinks"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+import os
+import threading
+from time import perf_counter
+
+from .exceptions import InventoryException
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (like a Prometheus histogram)
+    
+    counts[i] is the number of observations <= bounds[i] and > bounds[i - 1];
+    the last count is for the observations above every bound (+Inf).
+    """
+    
+    __slots__ = ("bounds", "counts", "total", "count")
+    
+    def __init__(self, bounds: tuple) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.count = 0
+    
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+    
+    def snapshot(self) -> dict:
+        """Return the cumulative bucket counts, the sum and the count"""
+        buckets = []
+        running = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            running += count
+            buckets.append((bound, running))
+        return {"buckets": buckets, "sum": self.total, "count": self.count}
+
+
+class InventoryMetrics:
+    """
+    Opt-in instrumentation of repository and order operations
+    
+    Collects per operation: call counts, latency histograms (seconds) and
+    error counts by exception class, plus counts of slow paths taken (e.g.
+    a full re-sort of the id list) and histograms of other values such as
+    the depth of BinarySearch.id_search.
+    
+    Nothing is collected unless a repository was given the metrics with
+    ProductRepository.enable_metrics(); a repository without metrics runs
+    the plain methods.
+    """
+    
+    # Latency bucket bounds in seconds (1 microsecond to 1 second)
+    LATENCY_BUCKETS = (1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 5e-05, 0.0001, 0.00025,
+                       0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1, 1.0)
+    VALUE_BUCKETS = (1, 2, 4, 8, 12, 16, 20, 24, 28, 32, 48, 64)
+    
+    def __init__(self, latency_buckets: tuple = None, sinks: list = None) -> None:
+        self.latency_buckets = tuple(latency_buckets or self.LATENCY_BUCKETS)
+        self.sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Forget everything collected so far"""
+        with self._lock:
+            self.latencies = {}
+            self.errors = {}
+            self.slow_paths = {}
+            self.values = {}
+    
+    def observe(self, operation: str, seconds: float, error: Exception = None) -> None:
+        """Record one call of an operation (and the exception it raised, if any)"""
+        with self._lock:
+            histogram = self.latencies.get(operation)
+            if histogram is None:
+                histogram = self.latencies[operation] = Histogram(self.latency_buckets)
+            # Histogram.observe inlined, this runs on every instrumented call
+            histogram.counts[bisect_left(histogram.bounds, seconds)] += 1
+            histogram.total += seconds
+            histogram.count += 1
+            if error is not None:
+                key = (operation, type(error).__name__)
+                self.errors[key] = self.errors.get(key, 0) + 1
+    
+    def observe_value(self, name: str, value) -> None:
+        """Record a value such as a search depth"""
+        with self._lock:
+            histogram = self.values.get(name)
+            if histogram is None:
+                histogram = self.values[name] = Histogram(self.VALUE_BUCKETS)
+            histogram.observe(value)
+    
+    def flag(self, path: str, count: int = 1) -> None:
+        """Count that a slow path was taken"""
+        with self._lock:
+            self.slow_paths[path] = self.slow_paths.get(path, 0) + count
+    
+    def call(self, operation: str, function, *args, **kwargs):
+        """Call function, recording its latency and exception under operation"""
+        start = perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.observe(operation, perf_counter() - start, e)
+            raise
+        self.observe(operation, perf_counter() - start)
+        return result
+    
+    def wrap(self, operation: str, function):
+        """Return function instrumented as operation"""
+        observe = self.observe
+        
+        def instrumented(*args, **kwargs):
+            start = perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                observe(operation, perf_counter() - start, e)
+                raise
+            observe(operation, perf_counter() - start)
+            return result
+        instrumented.__wrapped__ = function
+        instrumented.__name__ = getattr(function, "__name__", operation)
+        instrumented.__doc__ = getattr(function, "__doc__", None)
+        return instrumented
+    
+    def snapshot(self) -> dict:
+        """
+        Return everything collected as plain data (JSON serializable except for
+        the +Inf bucket bound):
+            operations: {operation: {"count", "errors", "latency"}}
+            errors    : {operation: {exception class: count}}
+            slow_paths: {path: count}
+            values    : {name: histogram}
+        """
+        with self._lock:
+            errors = {}
+            for (operation, exception), count in self.errors.items():
+                errors.setdefault(operation, {})[exception] = count
+            operations = {}
+            for operation, histogram in self.latencies.items():
+                operations[operation] = {
+                    "count": histogram.count,
+                    "errors": sum(errors.get(operation, {}).values()),
+                    "latency": histogram.snapshot(),
+                }
+            return {
+                "operations": operations,
+                "errors": errors,
+                "slow_paths": dict(self.slow_paths),
+                "values": {name: histogram.snapshot() for name, histogram in self.values.items()},
+            }
+    
+    def add_sink(self, sink: "IMetricsSink") -> None:
+        if not isinstance(sink, IMetricsSink):
+            raise InventoryException("Sink must be an IMetricsSink object")
+        self.sinks.append(sink)
+    
+    def export(self) -> dict:
+        """Write a snapshot to every sink and return it"""
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.write(snapshot)
+        return snapshot
+
+
+class IMetricsSink(ABC):
+    """Destination of InventoryMetrics snapshots"""
+    
+    @abstractmethod
+    def write(self, snapshot: dict) -> None:
+        pass
+
+
+class PrometheusTextFileSink(IMetricsSink):
+    """
+    Writes snapshots in the Prometheus text exposition format to a file
+    (e.g. for the node_exporter textfile collector)
+    
+    The file is replaced atomically, so a scraper never reads half of it.
+    """
+    
+    def __init__(self, path: str, prefix: str = "inventory") -> None:
+        self.path = path
+        self.prefix = prefix
+    
+    @staticmethod
+    def _label(value) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    
+    @staticmethod
+    def _number(value) -> str:
+        if value == float("inf"):
+            return "+Inf"
+        return repr(float(value)) if isinstance(value, float) else str(value)
+    
+    def _histogram(self, lines: list, name: str, labels: str, histogram: dict) -> None:
+        separator = "," if labels else ""
+        for bound, count in histogram["buckets"]:
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{self._number(bound)}"}} {count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self._number(histogram['sum'])}")
+        lines.append(f"{name}_count{suffix} {histogram['count']}")
+    
+    def render(self, snapshot: dict) -> str:
+        """Return a snapshot in the Prometheus text format"""
+        prefix, label = self.prefix, self._label
+        lines = [f"# HELP {prefix}_operations_total Repository and order operations.",
+                 f"# TYPE {prefix}_operations_total counter"]
+        for operation, data in sorted(snapshot["operations"].items()):
+            lines.append(f'{prefix}_operations_total{{operation="{label(operation)}"}} {data["count"]}')
+        
+        lines += [f"# HELP {prefix}_operation_errors_total Failed operations by exception class.",
+                  f"# TYPE {prefix}_operation_errors_total counter"]
+        for operation, exceptions in sorted(snapshot["errors"].items()):
+            for exception, count in sorted(exceptions.items()):
+                lines.append(f'{prefix}_operation_errors_total{{operation="{label(operation)}",'
+                             f'exception="{label(exception)}"}} {count}')
+        
+        lines += [f"# HELP {prefix}_operation_seconds Latency of repository and order operations.",
+                  f"# TYPE {prefix}_operation_seconds histogram"]
+        for operation, data in sorted(snapshot["operations"].items()):
+            self._histogram(lines, f"{prefix}_operation_seconds", f'operation="{label(operation)}"', data["latency"])
+        
+        lines += [f"# HELP {prefix}_slow_path_total Slow paths taken.",
+                  f"# TYPE {prefix}_slow_path_total counter"]
+        for path, count in sorted(snapshot["slow_paths"].items()):
+            lines.append(f'{prefix}_slow_path_total{{path="{label(path)}"}} {count}')
+        
+        for name, histogram in sorted(snapshot["values"].items()):
+            metric = f"{prefix}_{name}"
+            lines += [f"# TYPE {metric} histogram"]
+            self._histogram(lines, metric, "", histogram)
+        return "\n".join(lines) + "\n"
+    
+    def write(self, snapshot: dict) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render(snapshot))
+        os.replace(temp_path, self.path)
@@ -0,0 +1,150 @@
+"""Product records, bulk operation results and the product validation rules"""
+
+from operator import attrgetter
+from sys import intern
+
+from .exceptions import InvalidProductDataException
+
+
+class ProductValidator:
+    """
+    Validation rules for product data, shared by the single and bulk
+    repository methods (and anything else that loads products)
+    
+    Quantities and prices are limited to signed 64-bit integers, the range
+    the columnar storage, the SQLite repository and the persistence files
+    can hold, so every backend accepts the same values.
+    """
+    
+    MAX_NUMBER = 2**63 - 1
+    
+    @staticmethod
+    def validate_new(name: str, category: str, quantity: int, price: int, supplier: str) -> None:
+        """
+        Check the fields of a new product
+        
+        Raises:
+            InvalidProductDataException: if any field is invalid
+        """
+        # It checks for type, negative numbers, and empty strings
+        if not name or not isinstance(name, str):
+            raise InvalidProductDataException("Product name must be a non-empty string")
+        if not category or not isinstance(category, str):
+            raise InvalidProductDataException("Product category must be a non-empty string")
+        if not isinstance(quantity, int) or quantity < 0:
+            raise InvalidProductDataException("Product quantity must be an integer number")
+        if not isinstance(price, int) or price < 0:
+            raise InvalidProductDataException("Product price must be an integer number")
+        if quantity > ProductValidator.MAX_NUMBER or price > ProductValidator.MAX_NUMBER:
+            raise InvalidProductDataException(f"Product quantity and price must be at most {ProductValidator.MAX_NUMBER}")
+        if not supplier or not isinstance(supplier, str):
+            raise InvalidProductDataException("Product supplier must be a non-empty string")
+    
+    @staticmethod
+    def validate_update(quantity: int = None, price: int = None, supplier: str = None) -> None:
+        """
+        Check the fields of a product update (None means "not changed")
+        
+        Raises:
+            InvalidProductDataException: if any field is invalid
+        """
+        # It checks for type, negative numbers, and empty strings
+        if quantity is not None and (not isinstance(quantity, int) or quantity < 0):
+            raise InvalidProductDataException("Product quantity must be a positive integer")
+        if price is not None and (not isinstance(price, int) or price < 0):
+            raise InvalidProductDataException("Product price must be an integer number")
+        if (quantity is not None and quantity > ProductValidator.MAX_NUMBER
+                or price is not None and price > ProductValidator.MAX_NUMBER):
+            raise InvalidProductDataException(f"Product quantity and price must be at most {ProductValidator.MAX_NUMBER}")
+        if supplier is not None and (not isinstance(supplier, str) or not supplier):
+            raise InvalidProductDataException("Product supplier must be a non-empty string")
+    
+    # Field order of a product row given as a tuple
+    FIELDS = ("name", "category", "quantity", "price", "supplier")
+    
+    @staticmethod
+    def new_product_fields(row) -> tuple:
+        """
+        Turn a row (tuple in FIELDS order, or dict) into a validated fields tuple
+        
+        Raises:
+            InvalidProductDataException: if the row or any field is invalid
+        """
+        if isinstance(row, dict):
+            fields = tuple(row.get(field) for field in ProductValidator.FIELDS)
+        elif isinstance(row, (tuple, list)) and len(row) == len(ProductValidator.FIELDS):
+            fields = tuple(row)
+        else:
+            raise InvalidProductDataException("Product row must have name, category, quantity, price and supplier")
+        ProductValidator.validate_new(*fields)
+        return fields
+
+
+# Key function used to bisect lists of products by their id
+_product_id_key = attrgetter("product_id")
+
+
+class ProductInfo:
+    """
+     Class for setting product info
+    
+    Attributes:
+        product_id: Product's id       (positive integer)
+        name      : Product name       (non-empty string)
+        category  : Product category   (non-empty string)
+        quantity  : Available quantity (non-negative integer)
+        price     : Product price      (non-negative integer)
+        supplier  : Supplier name      (non-empty string)
+    
+    __slots__ removes the per-instance __dict__, and category/supplier are
+    interned whenever they are set (in the constructor or by a plain
+    assignment) so all the products of one category share the same string.
+    """
+    
+    __slots__ = ("product_id", "name", "_category", "quantity", "price", "_supplier")
+    
+    def __init__(self, product_id: int, name: str, category: str, quantity: int, price: int, supplier: str) -> None:
+        self.product_id = product_id
+        self.name = name
+        self._category = intern(category)
+        self.quantity = quantity
+        self.price = price
+        self._supplier = intern(supplier)
+    
+    @property
+    def category(self) -> str:
+        return self._category
+    
+    @category.setter
+    def category(self, value: str) -> None:
+        self._category = intern(value)
+    
+    @property
+    def supplier(self) -> str:
+        return self._supplier
+    
+    @supplier.setter
+    def supplier(self, value: str) -> None:
+        self._supplier = intern(value)
+
+
+class BulkResult:
+    """
+    Class for the result of a bulk repository operation
+    
+    Attributes:
+        product_ids: Ids of the products that were changed    (list)
+        errors     : (row number, error message) of bad rows  (list)
+    """
+    
+    def __init__(self, product_ids: list, errors: list) -> None:
+        self.product_ids = product_ids
+        self.errors = errors
+    
+    @property
+    def ok(self) -> bool:
+        """True if every row succeeded"""
+        return not self.errors
+    
+    def __repr__(self) -> str:
+        return f"BulkResult({len(self.product_ids)} done, {len(self.errors)} errors)"
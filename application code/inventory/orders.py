@@ -0,0 +1,394 @@
+"""Order placement and the order history log"""
+
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections import deque
+from heapq import nlargest
+import threading
+from time import time
+
+from .exceptions import InvalidOrderDataException, InvalidProductDataException, InventoryException
+from .repository import IProductRepository, ProductRepository
+
+
+class OrderLog:
+    """
+    Append-only, array-backed history of the placed order lines
+    
+    Columns (one row per order line, 28 bytes):
+        timestamps : microseconds since the epoch, never decreasing (array "q")
+        order_ids  : array "q"
+        product_ids: array "I"
+        quantities : array "I"
+        customers  : dictionary-encoded customer references (array "I", 0 = none)
+    product_rows keeps the rows of every product (array "I", 4 more bytes
+    per line), so the history of one product is found without a scan.
+    
+    Because the timestamps never decrease, a time range is found with two
+    binary searches. Rolling per-product aggregates are kept in time
+    buckets of bucket_seconds (the last `buckets` of them) together with
+    their running totals, so "units sold in the last hour" does not touch
+    the log at all.
+    
+    Time complexity:
+        append                : O(1) amortized
+        rows                  : O(log n)
+        sales_between         : O(log n + rows in the range), O(log n + k) for one product
+        units_sold/top_products: O(1) / O(p log k) for the whole window, O(buckets) otherwise
+    """
+    
+    def __init__(self, bucket_seconds: int = 60, buckets: int = 60, clock=time) -> None:
+        """
+        Args:
+            bucket_seconds: Width of the rolling aggregate buckets
+            buckets       : Number of buckets kept (60 x 60 s = the last hour)
+            clock         : Function returning the current time in seconds
+        """
+        if not isinstance(bucket_seconds, int) or bucket_seconds < 1:
+            raise InventoryException("Bucket width must be a positive number of seconds")
+        if not isinstance(buckets, int) or buckets < 1:
+            raise InventoryException("Number of buckets must be a positive integer")
+        self.bucket_us = bucket_seconds * 1_000_000
+        self.max_buckets = buckets
+        self.clock = clock
+        self.timestamps = array("q")
+        self.order_ids = array("q")
+        self.product_ids = array("I")
+        self.quantities = array("I")
+        self.customers = array("I")
+        self.product_rows = {}
+        # Customer references by code (code 0 is "no customer")
+        self.customer_values = [None]
+        self.customer_codes = {None: 0}
+        # (bucket number, {product_id: units}) for the latest buckets, oldest
+        # first, and {product_id: units} summed over all of them
+        self.rolling = deque()
+        self.totals = {}
+        self._bucket = None
+        self._units = None
+        self.lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    # Largest values the typed columns hold
+    MAX_ORDER_ID = 2**63 - 1
+    MAX_UNSIGNED = 2**32 - 1
+    
+    def check(self, order_id: int, lines) -> None:
+        """
+        Make sure the (product_id, quantity) lines of an order fit the log
+        columns, so an order can be rejected before its stock is taken
+        
+        Raises:
+            InvalidOrderDataException: if an id or a quantity is too large for the log
+        """
+        if order_id > self.MAX_ORDER_ID:
+            raise InvalidOrderDataException(f"Order id must be at most {self.MAX_ORDER_ID} to be logged")
+        for product_id, quantity in lines:
+            if product_id > self.MAX_UNSIGNED:
+                raise InvalidOrderDataException(f"Product id must be at most {self.MAX_UNSIGNED} to be logged")
+            if quantity > self.MAX_UNSIGNED:
+                raise InvalidOrderDataException(f"Product quantity must be at most {self.MAX_UNSIGNED} to be logged")
+    
+    def append(self, order_id: int, product_id: int, quantity: int, customer: str = None,
+               timestamp: float = None) -> None:
+        """Log one order line (timestamp in seconds, now by default)"""
+        now = int((self.clock() if timestamp is None else timestamp) * 1_000_000)
+        with self.lock:
+            timestamps = self.timestamps
+            # Keep the column sorted even if the clock goes back
+            if timestamps and now < timestamps[-1]:
+                now = timestamps[-1]
+            code = self.customer_codes.get(customer)
+            if code is None:
+                code = self.customer_codes[customer] = len(self.customer_values)
+                self.customer_values.append(customer)
+            rows = self.product_rows.get(product_id)
+            if rows is None:
+                rows = self.product_rows[product_id] = array("I")
+            rows.append(len(timestamps))
+            timestamps.append(now)
+            self.order_ids.append(order_id)
+            self.product_ids.append(product_id)
+            self.quantities.append(quantity)
+            self.customers.append(code)
+            
+            bucket = now // self.bucket_us
+            if bucket != self._bucket:
+                self._units = {}
+                self._bucket = bucket
+                self.rolling.append((bucket, self._units))
+                self._expire(bucket)
+            units = self._units
+            units[product_id] = units.get(product_id, 0) + quantity
+            totals = self.totals
+            totals[product_id] = totals.get(product_id, 0) + quantity
+    
+    def _expire(self, bucket: int) -> None:
+        """Drop the buckets that fell out of the window ending at bucket (lock held)"""
+        rolling = self.rolling
+        totals = self.totals
+        while rolling and rolling[0][0] <= bucket - self.max_buckets:
+            _, units = rolling.popleft()
+            for product_id, quantity in units.items():
+                left = totals[product_id] - quantity
+                if left:
+                    totals[product_id] = left
+                else:
+                    del totals[product_id]
+    
+    def rows(self, start: float = None, end: float = None) -> tuple:
+        """(first, last + 1) positions of the rows with start <= timestamp < end"""
+        timestamps = self.timestamps
+        first = 0 if start is None else bisect_left(timestamps, int(start * 1_000_000))
+        last = len(timestamps) if end is None else bisect_left(timestamps, int(end * 1_000_000))
+        return first, max(first, last)
+    
+    def _row(self, i: int) -> tuple:
+        return (self.timestamps[i] / 1_000_000, self.order_ids[i], self.product_ids[i],
+                self.quantities[i], self.customer_values[self.customers[i]])
+    
+    def orders(self, start: float = None, end: float = None, product_id: int = None):
+        """
+        Yield the (timestamp, order_id, product_id, quantity, customer) rows
+        of a time range (of one product if product_id is given)
+        """
+        first, last = self.rows(start, end)
+        if product_id is None:
+            positions = range(first, last)
+        else:
+            rows = self.product_rows.get(product_id, ())
+            positions = rows[bisect_left(rows, first):bisect_left(rows, last)]
+        for i in positions:
+            yield self._row(i)
+    
+    def sales_between(self, start: float = None, end: float = None, product_id: int = None):
+        """
+        Return {product_id: units sold} for start <= timestamp < end, or the
+        units of one product if product_id is given
+        """
+        first, last = self.rows(start, end)
+        quantities = self.quantities
+        if product_id is not None:
+            rows = self.product_rows.get(product_id, ())
+            return sum(quantities[i] for i in rows[bisect_left(rows, first):bisect_left(rows, last)])
+        totals = {}
+        for pid, quantity in zip(self.product_ids[first:last], quantities[first:last]):
+            totals[pid] = totals.get(pid, 0) + quantity
+        return totals
+    
+    def _buckets(self, seconds: int):
+        """
+        Rolling buckets of the last `seconds` (whole buckets, the current one
+        included), or None if that is all of them (lock held)
+        """
+        now = int(self.clock() * 1_000_000) // self.bucket_us
+        self._expire(now)
+        if seconds is None or seconds * 1_000_000 >= self.max_buckets * self.bucket_us:
+            return None
+        # Whole buckets, rounded up
+        count = -(-seconds * 1_000_000 // self.bucket_us)
+        return [units for bucket, units in self.rolling if now - count < bucket <= now]
+    
+    def units_sold(self, product_id: int, seconds: int = None) -> int:
+        """
+        Units of a product sold in the last `seconds` (default: all the kept
+        buckets), counted in whole buckets
+        """
+        with self.lock:
+            buckets = self._buckets(seconds)
+            if buckets is None:
+                return self.totals.get(product_id, 0)
+            return sum(units.get(product_id, 0) for units in buckets)
+    
+    def top_products(self, k: int = 10, seconds: int = None) -> list:
+        """The k best selling (product_id, units) of the last `seconds`, most units first"""
+        if not isinstance(k, int) or k < 1:
+            raise InventoryException("Number of products must be a positive integer")
+        with self.lock:
+            buckets = self._buckets(seconds)
+            if buckets is None:
+                totals = self.totals.copy()
+            else:
+                totals = {}
+                for units in buckets:
+                    for product_id, quantity in units.items():
+                        totals[product_id] = totals.get(product_id, 0) + quantity
+        if len(totals) <= k:
+            return sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        # Only the products selling at least the k-th best are sorted
+        least = nlargest(k, totals.values())[-1]
+        best = [item for item in totals.items() if item[1] >= least]
+        best.sort(key=lambda item: (-item[1], item[0]))
+        return best[:k]
+    
+    def memory_bytes(self) -> int:
+        """Bytes used by the log columns and the per-product rows"""
+        columns = (self.timestamps, self.order_ids, self.product_ids, self.quantities, self.customers)
+        return (sum(column.buffer_info()[1] * column.itemsize for column in columns)
+                + sum(rows.buffer_info()[1] * rows.itemsize for rows in self.product_rows.values()))
+
+
+class Order(ABC):
+    @abstractmethod
+    def place_order(self):
+        pass
+    
+    @abstractmethod
+    def place_multi_line_order(self):
+        pass
+
+
+class Order(Order):
+    """
+    A class the order products from the inventory
+    
+    Attributes:
+        order_id     : The order id          (positive integer)
+        products     : Order's products list (list)
+        customer_info: Customer info         (non-empty string)
+    
+    Behaviors:
+        place_order           : places a new order for one product
+        place_multi_line_order: places a new order for many products at once
+    """
+    
+    def __init__(self, order_id: int, products: list, customer_info: str = None) -> str: # I recomment to make it tuple only
+        # Validation check and error handling
+        # It checks for type, negative numbers, and empty strings
+        if not isinstance(order_id, int) or order_id < 1:
+            raise InvalidOrderDataException("Order id must be a positive integer")
+        if not isinstance(products, list):
+            raise InvalidOrderDataException("Products must be in a list")
+        if customer_info is not None and (not isinstance(customer_info, str) or not customer_info):
+            raise InvalidOrderDataException("Customer info must be a non-empty string")
+        
+        # Make a new order
+        self.order = OrderInfo(order_id, products, customer_info)
+        
+        
+    def place_order(self, product_id: int, quantity: int, repo: ProductRepository, customer_info: str = None) -> str:
+        """
+        Place a new order
+        
+        Args:
+            product_id   : Ordered product's id                          (positive integer)
+            quantity     : Quantity of the ordered product               (positive integer)
+            repo         : The repository which the product ordered from (ProductRepository object)
+            customer_info: Customer info                                 (non-empty string)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidOrderDataException  : If any passed parameter is invalid, the order was
+                                         already placed, or the product does not have
+                                         enough quantity
+            InvalidProductDataException: If the product does not exist
+            InventoryException         : If any other error occured
+            
+        """
+        # Time the order if the repository collects metrics
+        metrics = getattr(repo, "metrics", None)
+        if metrics is None:
+            return self._place_order(product_id, quantity, repo, customer_info)
+        return metrics.call("place_order", self._place_order, product_id, quantity, repo, customer_info)
+    
+    def _place_order(self, product_id: int, quantity: int, repo: ProductRepository, customer_info: str = None) -> str:
+        # One product is a basket of one line: same checks, same all-or-nothing reservation
+        return self._place_multi_line_order([(product_id, quantity)], repo, customer_info)
+    
+    def place_multi_line_order(self, lines: list, repo: ProductRepository, customer_info: str = None) -> str:
+        """
+        Place a new order with many products at once (all lines or none)
+        
+        Args:
+            lines        : Ordered (product_id, quantity) tuples             (non-empty list)
+            repo         : The repository which the products ordered from    (ProductRepository object)
+            customer_info: Customer info                                     (non-empty string)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidOrderDataException  : If any passed parameter is invalid, or a
+                                         product does not have enough quantity
+            InvalidProductDataException: If an ordered product does not exist
+            InventoryException         : If any other error occured
+        """
+        # Time the order if the repository collects metrics
+        metrics = getattr(repo, "metrics", None)
+        if metrics is None:
+            return self._place_multi_line_order(lines, repo, customer_info)
+        return metrics.call("place_multi_line_order", self._place_multi_line_order, lines, repo, customer_info)
+    
+    def _place_multi_line_order(self, lines: list, repo: ProductRepository, customer_info: str = None) -> str:
+        try:
+            # An easy-to-read reference to the order info
+            order = self.order
+            
+            # An order is placed only once
+            if order.products:
+                raise InvalidOrderDataException("This order was already placed")
+            
+            # Validation check and error handling
+            # It checks for type, negative numbers, and empty strings
+            if not isinstance(lines, (list, tuple)) or not lines:
+                raise InvalidOrderDataException("Order lines must be a non-empty list")
+            for line in lines:
+                if not isinstance(line, tuple) or len(line) != 2:
+                    raise InvalidOrderDataException("Each order line must be a (product_id, quantity) tuple")
+                product_id, quantity = line
+                if not isinstance(product_id, int) or product_id < 1:
+                    raise InvalidOrderDataException("Product id must be a positive integer")
+                if not isinstance(quantity, int) or quantity < 0:
+                    raise InvalidOrderDataException("Product quantity must be an integer number")
+            if not isinstance(repo, IProductRepository):
+                raise InvalidOrderDataException("Product repository must be a ProductRepository object")
+            if customer_info is not None and (not isinstance(customer_info, str) or not customer_info):
+                raise InvalidOrderDataException("Customer info must be a non-empty string")
+            
+            # The lines must fit the order history before any stock is taken
+            order_log = getattr(repo, "order_log", None)
+            if order_log is not None:
+                order_log.check(order.order_id, lines)
+            
+            # Check and decrement every line at once, nothing changes if one line fails
+            repo.reserve_stock(lines)
+            
+            # Add customer info (if it is provided)
+            if customer_info:
+                order.customer_info = customer_info
+            
+            # Add the lines to the products list (products which the customer oredered)
+            order.products.extend(lines)
+            
+            # Keep the order in the history if the repository has one
+            if order_log is not None:
+                for product_id, quantity in lines:
+                    order_log.append(order.order_id, product_id, quantity, order.customer_info)
+            
+            return f"Order placed successfully. Order ID: {order.order_id}"
+        
+        except (InvalidOrderDataException, InvalidProductDataException):
+            raise
+        except Exception as e:
+            raise InventoryException(f"Order not done successfully {str(e)}")
+
+
+class OrderInfo:
+    """
+    A class for setting order info
+    
+    Attributes:
+        order_id: Order's id (positive integer)
+        products: List of products ordered (list)
+        customer_info: Customer info (non-empty string)
+    """
+    
+    def __init__(self, order_id: str, products: list or tuple, customer_info: str = None):
+        self.order_id = order_id
+        self.products = products
+        self.customer_info = customer_info
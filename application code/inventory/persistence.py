@@ -0,0 +1,453 @@
+"""Redo journal, binary snapshots and the recovery of a repository from them"""
+
+from array import array
+import mmap
+import os
+import struct
+from sys import intern
+import threading
+from zlib import crc32
+
+from .exceptions import InventoryException
+from .listeners import IInventoryListener
+from .models import ProductInfo
+from .repository import ConcurrentProductRepository, ProductRepository
+
+
+class InventoryJournal(IInventoryListener):
+    """
+    Append-only redo journal of the changes of a ProductRepository
+    
+    Every change is written as one framed binary record:
+        payload length (u32) | op (u8), seq (u64), product_id (u64), fields | crc32 (u32)
+    
+    Orders are journaled as quantity updates holding the new quantity, so
+    replaying a record twice gives the same result.
+    
+    A record is made by the repository's listener call, after the change
+    was applied in memory but before the repository method returns. With
+    group_commit=1 (the default) it is written and fsync'ed right there, so
+    every change a caller saw succeed survives a crash. A bigger group_commit
+    buffers the records and writes + fsyncs them together every group_commit
+    records (group commit), or when commit() is called: much faster, but a
+    crash loses the up to group_commit - 1 buffered changes even though
+    their calls had returned.
+    
+    The buffer has its own lock, so commit() can run on any thread while
+    writers keep appending.
+    """
+    
+    ADD, UPDATE, DELETE = 1, 2, 3
+    # Bits of the update mask
+    QUANTITY, PRICE, SUPPLIER = 1, 2, 4
+    
+    _FRAME = struct.Struct("<I")
+    _HEADER = struct.Struct("<BQQ")
+    _NUMBERS = struct.Struct("<qq")
+    _NUMBER = struct.Struct("<q")
+    
+    def __init__(self, path: str, seq: int = 0, group_commit: int = 1) -> None:
+        if not isinstance(group_commit, int) or group_commit < 1:
+            raise InventoryException("Group commit size must be a positive integer")
+        self.path = path
+        self.seq = seq
+        self.group_commit = group_commit
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._file = open(path, "ab")
+        # _lock guards the buffer; _write_lock keeps the buffers written in
+        # the order they were filled (taken first, then _lock)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Records since the journal was last truncated
+        self.records = 0
+    
+    @staticmethod
+    def _pack_str(value: str) -> bytes:
+        data = value.encode("utf-8")
+        return struct.pack("<I", len(data)) + data
+    
+    def _append(self, op: int, product_id: int, body: bytes = b"") -> None:
+        with self._lock:
+            self.seq += 1
+            payload = self._HEADER.pack(op, self.seq, product_id) + body
+            self._pending += self._FRAME.pack(len(payload))
+            self._pending += payload
+            self._pending += self._FRAME.pack(crc32(payload))
+            self._pending_records += 1
+            self.records += 1
+            full = self._pending_records >= self.group_commit
+        if full:
+            self.commit()
+    
+    def commit(self) -> None:
+        """Write the buffered records and fsync the journal"""
+        with self._write_lock:
+            # Swap the buffer, so records appended during the fsync go to the next one
+            with self._lock:
+                pending = self._pending
+                if not pending:
+                    return
+                self._pending = bytearray()
+                self._pending_records = 0
+            self._file.write(pending)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def truncate(self) -> None:
+        """Drop every record (after a snapshot holding them was written)"""
+        with self._write_lock:
+            with self._lock:
+                # The snapshot holds the buffered records too
+                self._pending = bytearray()
+                self._pending_records = 0
+                self.records = 0
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def close(self) -> None:
+        self.commit()
+        self._file.close()
+    
+    def on_add(self, product) -> None:
+        body = (self._NUMBERS.pack(product.quantity, product.price) + self._pack_str(product.name)
+                + self._pack_str(product.category) + self._pack_str(product.supplier))
+        self._append(self.ADD, product.product_id, body)
+    
+    def on_update(self, product, old_values: dict) -> None:
+        mask = 0
+        body = b""
+        if "quantity" in old_values:
+            mask |= self.QUANTITY
+            body += self._NUMBER.pack(product.quantity)
+        if "price" in old_values:
+            mask |= self.PRICE
+            body += self._NUMBER.pack(product.price)
+        if "supplier" in old_values:
+            mask |= self.SUPPLIER
+            body += self._pack_str(product.supplier)
+        self._append(self.UPDATE, product.product_id, bytes((mask,)) + body)
+    
+    def on_delete(self, product) -> None:
+        self._append(self.DELETE, product.product_id)
+    
+    @staticmethod
+    def read(path: str) -> tuple:
+        """
+        Read the records of a journal file
+        
+        Reading stops at the first torn or corrupt record (an interrupted write).
+        
+        Returns:
+            (records, valid_size): list of (op, seq, product_id, fields) tuples and
+            the byte offset just after the last good record
+        """
+        if not os.path.exists(path):
+            return [], 0
+        with open(path, "rb") as f:
+            data = f.read()
+        frame, header, numbers, number = (InventoryJournal._FRAME, InventoryJournal._HEADER,
+                                          InventoryJournal._NUMBERS, InventoryJournal._NUMBER)
+        records = []
+        offset = 0
+        end = len(data)
+        while offset + 4 <= end:
+            (length,) = frame.unpack_from(data, offset)
+            start = offset + 4
+            if start + length + 4 > end:
+                break
+            payload = data[start:start + length]
+            if frame.unpack_from(data, start + length)[0] != crc32(payload):
+                break
+            
+            op, seq, product_id = header.unpack_from(payload, 0)
+            pos = header.size
+            fields = {}
+            if op == InventoryJournal.ADD:
+                fields["quantity"], fields["price"] = numbers.unpack_from(payload, pos)
+                pos += numbers.size
+                for name in ("name", "category", "supplier"):
+                    (size,) = frame.unpack_from(payload, pos)
+                    fields[name] = payload[pos + 4:pos + 4 + size].decode("utf-8")
+                    pos += 4 + size
+            elif op == InventoryJournal.UPDATE:
+                mask = payload[pos]
+                pos += 1
+                if mask & InventoryJournal.QUANTITY:
+                    fields["quantity"] = number.unpack_from(payload, pos)[0]
+                    pos += number.size
+                if mask & InventoryJournal.PRICE:
+                    fields["price"] = number.unpack_from(payload, pos)[0]
+                    pos += number.size
+                if mask & InventoryJournal.SUPPLIER:
+                    (size,) = frame.unpack_from(payload, pos)
+                    fields["supplier"] = payload[pos + 4:pos + 4 + size].decode("utf-8")
+            records.append((op, seq, product_id, fields))
+            offset = start + length + 4
+        return records, offset
+
+
+class InventorySnapshot:
+    """
+    Compact binary snapshot of an inventory that can be memory-mapped
+    
+    Layout (little-endian, every column 8-byte aligned):
+        header : magic, version, number of strings, journal seq, next id, count
+        columns: ids (i64), quantities (i64), prices (i64),
+                 category codes (u32), supplier codes (u32),
+                 name offsets (u64, count + 1), names (utf-8),
+                 string offsets (u64), strings (utf-8, the category/supplier values)
+    """
+    
+    MAGIC = b"INVSNAP1"
+    VERSION = 1
+    _HEADER = struct.Struct("<8sIIQQQ")
+    
+    @staticmethod
+    def _pad(data: bytes) -> bytes:
+        return data + bytes(-len(data) % 8)
+    
+    @staticmethod
+    def write(path: str, products, seq: int, next_id: int) -> None:
+        """Write the products (sorted by id) to path atomically (temp file + rename)"""
+        ids, quantities, prices = array("q"), array("q"), array("q")
+        category_codes, supplier_codes = array("I"), array("I")
+        name_offsets = array("Q", [0])
+        names = bytearray()
+        codes = {}
+        for product in products:
+            ids.append(product.product_id)
+            quantities.append(product.quantity)
+            prices.append(product.price)
+            for value, column in ((product.category, category_codes), (product.supplier, supplier_codes)):
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(codes)
+                column.append(code)
+            names += product.name.encode("utf-8")
+            name_offsets.append(len(names))
+        
+        string_offsets = array("Q", [0])
+        strings = bytearray()
+        for value in codes:
+            strings += value.encode("utf-8")
+            string_offsets.append(len(strings))
+        
+        header = InventorySnapshot._HEADER.pack(InventorySnapshot.MAGIC, InventorySnapshot.VERSION,
+                                                len(codes), seq, next_id, len(ids))
+        pad = InventorySnapshot._pad
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(header)
+            for column in (ids, quantities, prices, category_codes, supplier_codes, name_offsets):
+                f.write(pad(column.tobytes()))
+            f.write(pad(bytes(names)))
+            f.write(string_offsets.tobytes())
+            f.write(bytes(strings))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    def __init__(self, path: str) -> None:
+        """Memory-map a snapshot file (the numeric columns are read without copying)"""
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, version, n_strings, self.seq, self.next_id, self.count = self._HEADER.unpack_from(view, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise InventoryException(f"{path} is not an inventory snapshot")
+        
+        n = self.count
+        offset = self._HEADER.size
+        
+        def column(fmt: str, length: int, size: int):
+            nonlocal offset
+            data = view[offset:offset + length * size].cast(fmt)
+            offset += length * size + (-(length * size) % 8)
+            return data
+        
+        self.ids = column("q", n, 8)
+        self.quantities = column("q", n, 8)
+        self.prices = column("q", n, 8)
+        self.category_codes = column("I", n, 4)
+        self.supplier_codes = column("I", n, 4)
+        self.name_offsets = column("Q", n + 1, 8)
+        self._names = view[offset:offset + self.name_offsets[n]]
+        offset += self.name_offsets[n] + (-self.name_offsets[n] % 8)
+        string_offsets = column("Q", n_strings + 1, 8)
+        strings = bytes(view[offset:offset + string_offsets[n_strings]])
+        self.strings = [intern(strings[string_offsets[i]:string_offsets[i + 1]].decode("utf-8"))
+                        for i in range(n_strings)]
+        self._views = [self.ids, self.quantities, self.prices, self.category_codes,
+                       self.supplier_codes, self.name_offsets, self._names, string_offsets, view]
+    
+    def products(self):
+        """Yield the stored products as ProductInfo objects, sorted by id"""
+        names, offsets, strings = self._names, self.name_offsets, self.strings
+        for i in range(self.count):
+            yield ProductInfo(self.ids[i], str(names[offsets[i]:offsets[i + 1]], "utf-8"),
+                              strings[self.category_codes[i]], self.quantities[i], self.prices[i],
+                              strings[self.supplier_codes[i]])
+    
+    def close(self) -> None:
+        for view in getattr(self, "_views", ()):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+
+class InventoryPersistence:
+    """
+    Durable ProductRepository: snapshot + redo journal in one directory
+    
+    open() recovers the repository by loading the latest snapshot and replaying
+    only the journal records written after it, then journals every new change.
+    snapshot() writes a new snapshot and truncates the journal.
+    
+    Files:
+        snapshot.bin: latest InventorySnapshot
+        journal.log : InventoryJournal records after the snapshot
+    
+    Quantities and prices are stored as 64-bit integers. group_commit is
+    passed to the InventoryJournal: with more than 1, a crash loses the
+    changes not committed yet.
+    """
+    
+    SNAPSHOT_FILE = "snapshot.bin"
+    JOURNAL_FILE = "journal.log"
+    
+    def __init__(self, directory: str, group_commit: int = 1, snapshot_every: int = None) -> None:
+        if snapshot_every is not None and (not isinstance(snapshot_every, int) or snapshot_every < 1):
+            raise InventoryException("snapshot_every must be a positive integer")
+        self.directory = directory
+        self.group_commit = group_commit
+        self.snapshot_every = snapshot_every
+        self.repo = None
+        self.journal = None
+        os.makedirs(directory, exist_ok=True)
+    
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, self.SNAPSHOT_FILE)
+    
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, self.JOURNAL_FILE)
+    
+    def open(self, storage: str = "list", repository_class=None) -> ProductRepository:
+        """
+        Recover the repository from disk and start journaling its changes
+        
+        Args:
+            storage         : Storage backend of the recovered repository
+            repository_class: ProductRepository or a subclass (default ProductRepository)
+        
+        Returns:
+            The recovered repository
+        """
+        if self.repo is not None:
+            raise InventoryException("The inventory is already open")
+        repo = (repository_class or ProductRepository)(storage)
+        storage_obj = repo.storage
+        seq = 0
+        next_id = 1
+        
+        # 1. Load the latest snapshot (sorted by id, so no sort is needed)
+        if os.path.exists(self.snapshot_path):
+            snapshot = InventorySnapshot(self.snapshot_path)
+            try:
+                storage_obj.insert_many(list(snapshot.products()))
+                seq, next_id = snapshot.seq, snapshot.next_id
+            finally:
+                snapshot.close()
+        
+        # 2. Replay the journal records written after the snapshot. Every
+        # record is applied as an upsert/removal, so replaying is idempotent
+        records, valid_size = InventoryJournal.read(self.journal_path)
+        for op, record_seq, product_id, fields in records:
+            if record_seq <= seq:
+                continue
+            seq = record_seq
+            if op == InventoryJournal.ADD:
+                storage_obj.remove(product_id)
+                storage_obj.insert(ProductInfo(product_id, fields["name"], fields["category"],
+                                               fields["quantity"], fields["price"], fields["supplier"]))
+                next_id = max(next_id, product_id + 1)
+            elif op == InventoryJournal.UPDATE:
+                product = storage_obj.get(product_id)
+                if product is not None:
+                    for name, value in fields.items():
+                        setattr(product, name, value)
+            elif op == InventoryJournal.DELETE:
+                storage_obj.remove(product_id)
+        
+        # Cut off a torn tail so new records follow the last good one
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > valid_size:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_size)
+        
+        repo.id_allocator.restore(next_id, (product.product_id for product in storage_obj))
+        
+        # 3. Journal every change from now on
+        self.journal = InventoryJournal(self.journal_path, seq, self.group_commit)
+        self.repo = repo
+        repo.add_listener(self.journal)
+        if self.snapshot_every is not None:
+            repo.add_listener(_AutoSnapshot(self))
+        return repo
+    
+    def commit(self) -> None:
+        """Make every change so far durable"""
+        if self.journal is not None:
+            self.journal.commit()
+    
+    def snapshot(self) -> None:
+        """Write a snapshot of the repository and truncate the journal"""
+        if self.repo is None:
+            raise InventoryException("The inventory is not open")
+        if isinstance(self.repo, ConcurrentProductRepository):
+            # Writers have to wait while the inventory is being copied
+            with self.repo.structure_lock.write():
+                self._write_snapshot()
+        else:
+            self._write_snapshot()
+    
+    def _write_snapshot(self) -> None:
+        self.journal.commit()
+        InventorySnapshot.write(self.snapshot_path, self.repo.storage, self.journal.seq,
+                                self.repo.id_allocator.next_id)
+        self.journal.truncate()
+    
+    def close(self) -> None:
+        """Commit the journal and stop journaling"""
+        if self.repo is None:
+            return
+        self.journal.close()
+        for listener in list(self.repo.listeners):
+            if listener is self.journal or isinstance(listener, _AutoSnapshot):
+                self.repo.remove_listener(listener)
+        self.repo = None
+        self.journal = None
+
+
+class _AutoSnapshot(IInventoryListener):
+    """Takes a snapshot every snapshot_every journal records (single-threaded use)"""
+    
+    def __init__(self, persistence: InventoryPersistence) -> None:
+        self.persistence = persistence
+    
+    def _check(self) -> None:
+        if self.persistence.journal.records >= self.persistence.snapshot_every:
+            self.persistence._write_snapshot()
+    
+    def on_add(self, product) -> None:
+        self._check()
+    
+    def on_update(self, product, old_values: dict) -> None:
+        self._check()
+    
+    def on_delete(self, product) -> None:
+        self._check()
@@ -0,0 +1,1172 @@
+"""Product repositories: the in-memory ProductRepository and its thread-safe version"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import threading
+from typing import TYPE_CHECKING
+
+from .exceptions import BulkOperationException, InvalidOrderDataException, InvalidProductDataException, InventoryException
+from .listeners import IInventoryListener, LowStockMonitor, RangeIndex, SecondaryIndex
+from .metrics import InventoryMetrics
+from .models import BulkResult, ProductInfo, ProductValidator
+from .snapshots import ReadSnapshot, SnapshotManager
+from .storage import ColumnarProductStorage, IProductStorage, IdAllocator, IndexedProductStorage, ListProductStorage
+
+if TYPE_CHECKING:
+    # Only imported by the methods enabling these features (create_name_index, ...)
+    from .analytics import ColumnarAnalyticsView
+    from .changes import ChangeStream
+    from .orders import OrderLog
+    from .search import NameSearchIndex
+
+
+class IProductRepository(ABC):
+    """
+    Abstract base class defining methods for ProductRepository class.
+    """
+    @abstractmethod
+    def get_product(self):
+        pass
+    
+    @abstractmethod
+    def add_product(self):
+        pass
+    
+    @abstractmethod
+    def update_product(self):
+        pass
+    
+    @abstractmethod
+    def delete_product(self):
+        pass
+
+
+class ProductRepository(IProductRepository):
+    """
+     class for products repository
+    
+    Behaviors:
+        get_product   : returns a product by its id
+        add_product   : adds a product to the inventory
+        update_product: update product's information
+        delete_product: delete product from the inventory
+        add_products, update_products, delete_products: bulk versions
+        create_index  : adds a secondary index on a product attribute
+        find_by       : returns the products with a given attribute value
+    
+    Storage backends:
+        "list"   : one list sorted by product_id (default)
+        "indexed": dict keyed by product_id, O(1) lookups and deletes
+        "columnar": struct-of-arrays columns, smallest memory per product
+    """
+    
+    STORAGES = {
+        "list": ListProductStorage,
+        "indexed": IndexedProductStorage,
+        "columnar": ColumnarProductStorage,
+    }
+    
+    def __init__(self, storage: str = "list") -> None:
+        # The storage is being put in the costructor be able to change its type anytime
+        if isinstance(storage, IProductStorage):
+            self.storage = storage
+        elif storage in self.STORAGES:
+            self.storage = self.STORAGES[storage]()
+        else:
+            raise InventoryException(f"Unknown storage backend: {storage!r}")
+        self.id_allocator = IdAllocator()
+        if len(self.storage):
+            # A pre-filled storage: new ids go after its biggest one and fill its gaps
+            live_ids = [product.product_id for product in self.storage]
+            self.id_allocator.restore(max(live_ids) + 1, live_ids)
+        # Objects notified about every change (secondary indexes and so on)
+        self.listeners = []
+        self.indexes = {}
+        self.range_indexes = {}
+        # NameSearchIndex (None until create_name_index is called)
+        self.name_index = None
+        # ColumnarAnalyticsView (None until create_analytics_view is called)
+        self.analytics_view = None
+        # LowStockMonitor (None until create_low_stock_monitor is called)
+        self.low_stock = None
+        # InventoryMetrics collecting latencies and errors (None when disabled)
+        self.metrics = None
+        # SnapshotManager (None until the first snapshot is taken)
+        self.snapshots = None
+        # OrderLog written by Order.place_order (None until enable_order_log is called)
+        self.order_log = None
+        # ChangeStream of the changes (None until enable_change_stream is called)
+        self.change_stream = None
+    
+    @property
+    def inventory(self) -> list:
+        """Products sorted by product_id (the live list for the "list" storage)"""
+        return self.storage.as_list()
+    
+    def __iter__(self):
+        """Every product in product_id order, straight from the storage (no list is built)"""
+        return iter(self.storage)
+    
+    # True if the writers apply the change stream's backpressure themselves,
+    # after releasing their locks (see ChangeStream.wait_for_room)
+    DEFER_BACKPRESSURE = False
+    
+    # Attributes a secondary index can be created on
+    INDEXABLE_ATTRIBUTES = ("name", "category", "quantity", "price", "supplier")
+    
+    # Operations timed when metrics are enabled
+    INSTRUMENTED_OPERATIONS = ("get_product", "add_product", "update_product", "delete_product",
+                               "reserve_stock", "reserve_stock_batch", "add_products",
+                               "update_products", "delete_products", "find_by", "find_range",
+                               "count_range", "sum_range", "search_names")
+    
+    def enable_metrics(self, metrics: InventoryMetrics = None) -> InventoryMetrics:
+        """
+        Start collecting latencies, errors and slow paths into metrics
+        
+        The operations are replaced by instrumented versions on this object
+        only, so a repository without metrics pays nothing for them. Orders
+        placed against the repository are recorded too.
+        
+        Args:
+            metrics: InventoryMetrics to fill (a new one if None); it can be shared
+                     between repositories
+        
+        Returns:
+            The InventoryMetrics object
+        """
+        if metrics is None:
+            metrics = InventoryMetrics()
+        elif not isinstance(metrics, InventoryMetrics):
+            raise InventoryException("Metrics must be an InventoryMetrics object")
+        self.disable_metrics()
+        for operation in self.INSTRUMENTED_OPERATIONS:
+            method = getattr(type(self), operation).__get__(self)
+            setattr(self, operation, metrics.wrap(operation, method))
+        self.metrics = metrics
+        self.storage.metrics = metrics
+        return metrics
+    
+    def disable_metrics(self) -> None:
+        """Stop collecting metrics and restore the plain operations"""
+        for operation in self.INSTRUMENTED_OPERATIONS:
+            self.__dict__.pop(operation, None)
+        self.metrics = None
+        self.storage.metrics = None
+    
+    def add_listener(self, listener: IInventoryListener) -> None:
+        """Register a listener to be notified about every change of the inventory"""
+        if not isinstance(listener, IInventoryListener):
+            raise InventoryException("Listener must be an IInventoryListener object")
+        self.listeners.append(listener)
+    
+    def remove_listener(self, listener: IInventoryListener) -> None:
+        """Stop notifying a listener"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
+    def create_index(self, attribute: str) -> SecondaryIndex:
+        """
+        Create a secondary index on a product attribute (e.g. "category", "supplier")
+        
+        The index is built from the current inventory and then kept up to date
+        by add_product, update_product, delete_product and placed orders.
+        
+        Raises:
+            InventoryException: if the attribute can not be indexed
+        """
+        if attribute not in self.INDEXABLE_ATTRIBUTES:
+            raise InventoryException(f"Can not index attribute {attribute!r}")
+        if attribute in self.indexes:
+            return self.indexes[attribute]
+        
+        index = SecondaryIndex(attribute)
+        index.build(self.storage)
+        self.indexes[attribute] = index
+        self.add_listener(index)
+        return index
+    
+    def drop_index(self, attribute: str) -> None:
+        """Remove the secondary index on attribute (if there is one)"""
+        index = self.indexes.pop(attribute, None)
+        if index is not None:
+            self.remove_listener(index)
+    
+    def find_by(self, attribute: str, value) -> list:
+        """
+        Return the products whose attribute equals value, sorted by product_id
+        
+        An index is used if the attribute has one, otherwise the inventory is scanned.
+        
+        Raises:
+            InventoryException: if products have no such attribute
+        """
+        if attribute not in self.INDEXABLE_ATTRIBUTES:
+            raise InventoryException(f"Can not search by attribute {attribute!r}")
+        index = self.indexes.get(attribute)
+        if index is None:
+            return [p for p in self.storage if getattr(p, attribute) == value]
+        return self.storage.get_many(sorted(index.lookup(value)))
+    
+    def find_by_category(self, category: str) -> list:
+        """Return the products of a category, sorted by product_id"""
+        return self.find_by("category", category)
+    
+    def find_by_supplier(self, supplier: str) -> list:
+        """Return the products of a supplier, sorted by product_id"""
+        return self.find_by("supplier", supplier)
+    
+    # Attributes a range index can be created on
+    RANGE_ATTRIBUTES = ("quantity", "price")
+    
+    def create_range_index(self, attribute: str) -> RangeIndex:
+        """
+        Create a sorted range index on "price" or "quantity"
+        
+        The index is built from the current inventory and then kept up to date
+        by every change, including placed orders.
+        
+        Raises:
+            InventoryException: if the attribute can not be range-indexed
+        """
+        if attribute not in self.RANGE_ATTRIBUTES:
+            raise InventoryException(f"Can not range-index attribute {attribute!r}")
+        if attribute in self.range_indexes:
+            return self.range_indexes[attribute]
+        
+        index = RangeIndex(attribute)
+        index.build(self.storage)
+        self.range_indexes[attribute] = index
+        self.add_listener(index)
+        return index
+    
+    def drop_range_index(self, attribute: str) -> None:
+        """Remove the range index on attribute (if there is one)"""
+        index = self.range_indexes.pop(attribute, None)
+        if index is not None:
+            self.remove_listener(index)
+    
+    def _range_entries(self, attribute: str, low, high):
+        """(value, product_id) of the products with attribute in [low, high], in value order"""
+        if attribute not in self.RANGE_ATTRIBUTES:
+            raise InventoryException(f"Can not search by range of attribute {attribute!r}")
+        index = self.range_indexes.get(attribute)
+        if index is not None:
+            return index.irange(low, high)
+        # No index: scan the inventory
+        RangeIndex.check_bounds(low, high)
+        return sorted((getattr(p, attribute), p.product_id) for p in self.storage
+                      if (low is None or getattr(p, attribute) >= low)
+                      and (high is None or getattr(p, attribute) <= high))
+    
+    def find_range(self, attribute: str, low=None, high=None, **equals) -> list:
+        """
+        Return the products with low <= attribute <= high, sorted by that attribute
+        (then by product_id); None means unbounded
+        
+        Keyword arguments filter on other attributes, e.g.
+        find_range("quantity", high=9, category="Toys"); filters on indexed
+        attributes use their secondary index.
+        
+        Raises:
+            InventoryException: if an attribute can not be searched or a bound is not a number
+        """
+        for name in equals:
+            if name not in self.INDEXABLE_ATTRIBUTES:
+                raise InventoryException(f"Can not search by attribute {name!r}")
+        entries = self._range_entries(attribute, low, high)
+        # Filters with a secondary index are checked on ids, the others on products
+        id_sets, filters = [], []
+        for name, value in equals.items():
+            index = self.indexes.get(name)
+            if index is not None:
+                id_sets.append(index.lookup(value))
+            else:
+                filters.append((name, value))
+        
+        get = self.storage.get
+        result = []
+        for _, product_id in entries:
+            if all(product_id in ids for ids in id_sets):
+                product = get(product_id)
+                if all(getattr(product, name) == value for name, value in filters):
+                    result.append(product)
+        return result
+    
+    def count_range(self, attribute: str, low=None, high=None) -> int:
+        """Number of products with low <= attribute <= high"""
+        index = self.range_indexes.get(attribute)
+        if index is not None:
+            return index.count(low, high)
+        return len(self._range_entries(attribute, low, high))
+    
+    def sum_range(self, attribute: str, low=None, high=None):
+        """Sum of attribute over the products with low <= attribute <= high"""
+        index = self.range_indexes.get(attribute)
+        if index is not None:
+            return index.sum(low, high)
+        return sum(value for value, _ in self._range_entries(attribute, low, high))
+    
+    def create_name_index(self, fuzzy: bool = False) -> "NameSearchIndex":
+        """
+        Create the name search index (see NameSearchIndex)
+        
+        Args:
+            fuzzy: Also keep the trigram index used for typo-tolerant search
+        """
+        # Imported here so that "re" is only loaded when names are searched
+        from .search import NameSearchIndex
+        
+        if self.name_index is not None:
+            self.remove_listener(self.name_index)
+        index = NameSearchIndex(self.storage.get, fuzzy)
+        index.build(self.storage)
+        self.name_index = index
+        self.add_listener(index)
+        return index
+    
+    def drop_name_index(self) -> None:
+        """Remove the name search index (if there is one)"""
+        if self.name_index is not None:
+            self.remove_listener(self.name_index)
+            self.name_index = None
+    
+    def search_names(self, query: str, limit: int = 10, fuzzy: bool = False) -> list:
+        """
+        Return up to limit products whose name has a word starting with every
+        word of query (autocomplete); with fuzzy=True, products whose names
+        look like the query fill the remaining places
+        
+        Without a name index the inventory is scanned (no fuzzy matching).
+        
+        Raises:
+            InventoryException: if the query is not a string, or fuzzy is asked
+                                from an index created without it
+        """
+        if not isinstance(query, str):
+            raise InventoryException("Search query must be a string")
+        index = self.name_index
+        if index is None:
+            from .search import NameSearchIndex
+            
+            words = NameSearchIndex.words_of(query)
+            result = []
+            for product in self.storage:
+                if len(result) >= limit or not words:
+                    break
+                name_words = NameSearchIndex.words_of(product.name)
+                if all(any(word.startswith(q) for word in name_words) for q in words):
+                    result.append(product)
+            return result
+        
+        ids = index.search(query, limit)
+        if fuzzy and len(ids) < limit:
+            found = set(ids)
+            ids += [product_id for product_id in index.fuzzy_search(query, limit)
+                    if product_id not in found][:limit - len(ids)]
+        get = self.storage.get
+        return [get(product_id) for product_id in ids]
+    
+    def snapshot(self) -> ReadSnapshot:
+        """
+        Return a point-in-time, read-only view of the inventory in O(1)
+        
+        Reports can iterate the snapshot while orders and updates go on: the
+        snapshot keeps seeing the products as they were when it was taken.
+        Close it when done (or use it in a with block).
+        """
+        if self.snapshots is None:
+            self.snapshots = SnapshotManager()
+        return ReadSnapshot(self, self.snapshots)
+    
+    def enable_order_log(self, bucket_seconds: int = 60, buckets: int = 60) -> "OrderLog":
+        """
+        Keep a history of the placed order lines (see OrderLog)
+        
+        Args:
+            bucket_seconds: Width of the rolling per-product aggregate buckets
+            buckets       : Number of buckets kept (default: the last hour)
+        """
+        # The orders module imports this one, so it is imported when needed
+        from .orders import OrderLog
+        
+        self.order_log = OrderLog(bucket_seconds, buckets)
+        return self.order_log
+    
+    def enable_change_stream(self, retention: int = 100000, block_timeout: float = 1.0) -> "ChangeStream":
+        """
+        Publish every change of the inventory as a sequenced event (see ChangeStream)
+        
+        Subscribers call change_stream.subscribe() and then poll it for batches
+        of events. A subscriber that needs the whole state first subscribes
+        and then reads the inventory: applying the events received after that
+        (add or replace, set fields, delete if present) gives the same state.
+        
+        Args:
+            retention    : Number of past events kept for slow and resuming subscribers
+            block_timeout: Longest time in seconds a writer waits for a blocking subscriber
+        """
+        # Imported here, the repository does not need it otherwise
+        from .changes import ChangeStream
+        
+        self.disable_change_stream()
+        self.change_stream = ChangeStream(retention, block_timeout=block_timeout,
+                                          defer_backpressure=self.DEFER_BACKPRESSURE)
+        self.add_listener(self.change_stream)
+        return self.change_stream
+    
+    def disable_change_stream(self) -> None:
+        """Stop publishing changes (the subscribers receive the events already published)"""
+        if self.change_stream is not None:
+            self.remove_listener(self.change_stream)
+            self.change_stream = None
+    
+    def create_analytics_view(self) -> "ColumnarAnalyticsView":
+        """
+        Create the NumPy columnar view of the inventory used for vectorised
+        reports (see ColumnarAnalyticsView)
+        
+        Raises:
+            InventoryException: if NumPy is not installed
+        """
+        # Imported here so that NumPy is only loaded when a view is created
+        from .analytics import ColumnarAnalyticsView
+        
+        if self.analytics_view is not None:
+            self.remove_listener(self.analytics_view)
+        view = ColumnarAnalyticsView()
+        view.build(self.storage)
+        self.analytics_view = view
+        self.add_listener(view)
+        return view
+    
+    def drop_analytics_view(self) -> None:
+        """Remove the columnar analytics view (if there is one)"""
+        if self.analytics_view is not None:
+            self.remove_listener(self.analytics_view)
+            self.analytics_view = None
+    
+    def check_indexes(self) -> list:
+        """
+        Compare every secondary, range, name and analytics index and the
+        low-stock monitor with a full scan of the inventory
+        
+        Returns:
+            List of problem descriptions (empty if all indexes are consistent)
+        """
+        problems = []
+        for index in self.range_indexes.values():
+            problems.extend(index.check(self.storage))
+        if self.name_index is not None:
+            problems.extend(self.name_index.check(self.storage))
+        if self.analytics_view is not None:
+            problems.extend(self.analytics_view.check(self.storage))
+        if self.low_stock is not None:
+            problems.extend(self.low_stock.check(self.storage))
+        for attribute, index in self.indexes.items():
+            expected = SecondaryIndex(attribute)
+            expected.build(self.storage)
+            for value in expected.entries.keys() | index.entries.keys():
+                want = expected.entries.get(value, set())
+                got = index.entries.get(value, set())
+                if want != got:
+                    problems.append(f"Index {attribute!r} value {value!r}: "
+                                    f"missing ids {sorted(want - got)}, extra ids {sorted(got - want)}")
+        return problems
+    
+    def create_low_stock_monitor(self, default_threshold: int = None) -> LowStockMonitor:
+        """
+        Create the reorder-point monitor of the repository (see LowStockMonitor)
+        
+        It is built from the current inventory and then kept up to date by
+        every quantity change, including placed orders.
+        
+        Args:
+            default_threshold: Threshold of the products without their own (None: no default)
+        """
+        if self.low_stock is not None:
+            self.remove_listener(self.low_stock)
+        monitor = LowStockMonitor(default_threshold)
+        monitor.build(self.storage)
+        self.low_stock = monitor
+        self.add_listener(monitor)
+        return monitor
+    
+    def lowest_stock(self, k: int) -> list:
+        """
+        Return the k products with the lowest quantity, lowest first
+        
+        Raises:
+            InventoryException: if there is no low-stock monitor
+        """
+        if self.low_stock is None:
+            raise InventoryException("Create a low-stock monitor first")
+        get = self.storage.get
+        return [get(product_id) for product_id, _ in self.low_stock.lowest(k)]
+    
+    def reserve_stock(self, lines: list) -> None:
+        """
+        Take the quantities of (product_id, quantity) lines out of the stock, all or nothing
+        
+        The lines are resolved in one pass over the sorted ids and every line is
+        checked before any quantity is decremented. Repeated products are checked
+        against their total quantity.
+        
+        Args:
+            lines: List of (product_id, quantity) tuples (quantities already validated)
+        
+        Raises:
+            InvalidProductDataException: if a product does not exist
+            InvalidOrderDataException  : if a product does not have enough quantity
+        """
+        # Merge repeated products so each one is checked against its total
+        totals = {}
+        for product_id, quantity in lines:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        ids = sorted(totals)
+        products = self.storage.get_many(ids)
+        
+        # Check every line before touching the stock
+        for product_id, product in zip(ids, products):
+            prefix = "" if len(ids) == 1 else f"Product {product_id}: "
+            if product is None:
+                raise InvalidProductDataException(f"{prefix}Product not found.")
+            if product.quantity < totals[product_id]:
+                raise InvalidOrderDataException(f"{prefix}There is no enough quantity of this product to order.\nYou can order up to {product.quantity} copies.")
+        
+        for product_id, product in zip(ids, products):
+            self.decrement_stock(product, totals[product_id])
+    
+    def reserve_stock_batch(self, lines: list) -> list:
+        """
+        Take many independent (product_id, quantity) lines out of the stock in one sweep
+        
+        Unlike reserve_stock, every line succeeds or fails on its own. Lines of
+        the same product are served in the given order.
+        
+        Args:
+            lines: List of (product_id, quantity) tuples sorted by product_id
+                   (quantities already validated)
+        
+        Returns:
+            List with None for every reserved line and the exception of every failed line
+        """
+        ids = sorted({product_id for product_id, _ in lines if isinstance(product_id, int)})
+        found = dict(zip(ids, self.storage.get_many(ids)))
+        
+        results = []
+        for product_id, quantity in lines:
+            product = found.get(product_id)
+            if product is None:
+                results.append(InvalidProductDataException("Product not found."))
+            elif product.quantity < quantity:
+                results.append(InvalidOrderDataException(f"There is no enough quantity of this product to order.\nYou can order up to {product.quantity} copies."))
+            else:
+                self.decrement_stock(product, quantity)
+                results.append(None)
+        return results
+    
+    def decrement_stock(self, product, quantity: int) -> None:
+        """
+        Take quantity copies of product out of the stock (used by reserve_stock)
+        
+        The caller has to check that there is enough quantity.
+        """
+        snapshots = self.snapshots
+        if snapshots is not None and snapshots.oldest is not None:
+            snapshots.record(product.product_id, snapshots.copy(product))
+        old_quantity = product.quantity
+        product.quantity = old_quantity - quantity
+        if self.listeners:
+            self._notify_update(product, {"quantity": old_quantity})
+    
+    def _notify_add(self, product) -> None:
+        for listener in self.listeners:
+            listener.on_add(product)
+    
+    def _notify_update(self, product, old_values: dict) -> None:
+        for listener in self.listeners:
+            listener.on_update(product, old_values)
+    
+    def _notify_delete(self, product) -> None:
+        for listener in self.listeners:
+            listener.on_delete(product)
+    
+    @property
+    def deleted_ids(self) -> frozenset:
+        """Ids of deleted products that are waiting to be reused"""
+        return self.id_allocator.free_ids()
+    
+    def get_product(self, product_id: int):
+        """
+        Return the product with product_id
+        
+        Args:
+            product_id: Product id (positive integer)
+        
+        Returns:
+            ProductInfo object, or None if the product does not exist
+        """
+        return self.storage.get(product_id)
+    
+    def add_product(self, name: str, category: str, quantity: int, price: int, supplier: str) -> str:
+        """
+        Add a new product to the inventory
+        
+        Args:
+            name    : Product name       (non-empty string)
+            category: Product category   (non-empty string)
+            quantity: Available quantity (non-negative integer)
+            price   : Product price      (non-negative integer)
+            supplier: Supplier name      (non-empty string)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if any parameter is invalid
+            InventoryException         : it any other error happened
+        """
+        
+        try:
+            # Validation check and error handling
+            ProductValidator.validate_new(name, category, quantity, price, supplier)
+            
+            # Give the new product its proper id (the lowest deleted id is reused first)
+            product_id = self.id_allocator.acquire()
+            
+            # Make the product and add it to the inventory. The storage keeps the
+            # products ordered by id, so no re-sort is needed for a reused id
+            new_product = ProductInfo(product_id, name, category, quantity, price, supplier)
+            snapshots = self.snapshots
+            if snapshots is not None and snapshots.oldest is not None:
+                # Open snapshots must not see the new product
+                snapshots.record(product_id, None)
+                with snapshots.structure_change():
+                    self.storage.insert(new_product)
+            else:
+                self.storage.insert(new_product)
+            
+            if self.listeners:
+                self._notify_add(self.storage.get(product_id))
+            
+            return "Product added successfully"
+        
+        except InvalidProductDataException:
+            raise
+        except InventoryException as e:
+            raise InventoryException(f"Failed to add product: {str(e)}")
+        
+    
+    def update_product(self, product_id: int, quantity: int = None, price: int = None, supplier: str = None) -> str:
+        """
+        Update product information in the inventory
+        
+        Args:
+            product_id    : New Product id    (non-negative integer)
+            quantity      : New quantity      (non-negative number)
+            price         : New price         (non-negative number)
+            supplier      : New supplier name (non-empty string)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if any passed parameter is invalid
+            InventoryException         : if any other error happened
+        """
+        
+        try:
+            # Look the product up through the storage (O(log n) or O(1))
+            product_in_inventory = self.storage.get(product_id)
+            # Check if the product is not exist
+            if product_in_inventory is None:
+                raise InvalidProductDataException("Product not found.")
+            
+            # Validation check and error handling
+            ProductValidator.validate_update(quantity, price, supplier)
+            
+            self._apply_update(product_in_inventory, quantity, price, supplier)
+                
+            return "Product information updated successfully"
+        
+        except InvalidProductDataException:
+            raise
+        except InventoryException:
+            raise
+    
+    def _apply_update(self, product_in_inventory, quantity: int, price: int, supplier: str) -> None:
+        """Set the provided (already validated) fields of a product and notify the listeners"""
+        snapshots = self.snapshots
+        if snapshots is not None and snapshots.oldest is not None:
+            snapshots.record(product_in_inventory.product_id, snapshots.copy(product_in_inventory))
+        
+        # Remember the old values for the listeners (indexes and so on)
+        old_values = {}
+        
+        # Update the quantity of the product if the user provided it
+        if quantity is not None:
+            old_values["quantity"] = product_in_inventory.quantity
+            product_in_inventory.quantity = quantity
+        
+        # Update the price of the product if the user provided it
+        if price is not None:
+            old_values["price"] = product_in_inventory.price
+            product_in_inventory.price = price
+        
+        # Update the supplier of the product if the user provided it
+        if supplier is not None:
+            old_values["supplier"] = product_in_inventory.supplier
+            product_in_inventory.supplier = supplier
+        
+        if self.listeners and old_values:
+            self._notify_update(product_in_inventory, old_values)
+            
+    
+    def delete_product(self, product_id: int) -> str:
+        """
+        Delete a p3oduct from the inventory
+        
+        Args:
+            product_id: Product id (non-negative integer)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if any parameter is invalid
+            InventoryException         : if any other error occured
+        """
+        
+        try:
+            # Remove the product from the inventory
+            snapshots = self.snapshots
+            if snapshots is not None and snapshots.oldest is not None:
+                product = self.storage.get(product_id)
+                if product is not None:
+                    snapshots.record(product_id, snapshots.copy(product))
+                with snapshots.structure_change():
+                    deleted_product = self.storage.remove(product_id)
+            else:
+                deleted_product = self.storage.remove(product_id)
+            # Check if the product is not exist
+            if deleted_product is None:
+                raise InvalidProductDataException("Product not found.")
+                
+            # Add the id to deleted id's
+            self.id_allocator.release(deleted_product.product_id)
+            
+            if self.listeners:
+                self._notify_delete(deleted_product)
+            
+            return "Product deleted successfully"
+        
+        except InvalidProductDataException:
+            raise
+        except InventoryException:
+            raise
+    
+    def add_products(self, rows, atomic: bool = False):
+        """
+        Add many products in one pass
+        
+        All rows are validated first, the ids are allocated in one go and the
+        new products are merged into the inventory in one linear merge.
+        
+        Args:
+            rows  : Iterable of (name, category, quantity, price, supplier) tuples
+                    or dicts with those keys
+            atomic: If True, nothing is added when any row is invalid
+        
+        Returns:
+            BulkResult with the ids of the added products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        valid = []
+        errors = []
+        for row_number, row in enumerate(rows):
+            try:
+                valid.append(ProductValidator.new_product_fields(row))
+            except InvalidProductDataException as e:
+                errors.append((row_number, str(e)))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid product rows, nothing was added", errors)
+        
+        # The ids come back ascending, so the new products are one sorted run
+        product_ids = self.id_allocator.acquire_many(len(valid))
+        new_products = [ProductInfo(product_id, *fields) for product_id, fields in zip(product_ids, valid)]
+        snapshots = self.snapshots
+        if snapshots is not None and snapshots.oldest is not None:
+            for product_id in product_ids:
+                snapshots.record(product_id, None)
+            with snapshots.structure_change():
+                self.storage.insert_many(new_products)
+        else:
+            self.storage.insert_many(new_products)
+        
+        if self.listeners:
+            for product in self.storage.get_many(product_ids):
+                self._notify_add(product)
+        
+        return BulkResult(product_ids, errors)
+    
+    def update_products(self, rows, atomic: bool = False):
+        """
+        Update many products in one pass
+        
+        Args:
+            rows  : Iterable of dicts with a "product_id" key and any of
+                    "quantity", "price" and "supplier"
+            atomic: If True, nothing is updated when any row is invalid
+        
+        Returns:
+            BulkResult with the ids of the updated products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        rows = list(rows)
+        
+        # Look all the products up in one pass over the sorted ids
+        ids = sorted({row.get("product_id") for row in rows
+                      if isinstance(row, dict) and isinstance(row.get("product_id"), int)})
+        found = dict(zip(ids, self.storage.get_many(ids)))
+        
+        # Without atomic the rows are applied as soon as they are validated,
+        # otherwise they are kept until every row is known to be valid
+        validate = ProductValidator.validate_update
+        apply_update = self._apply_update
+        updated_ids = []
+        pending = []
+        errors = []
+        for row_number, row in enumerate(rows):
+            try:
+                if not isinstance(row, dict) or not isinstance(row.get("product_id"), int):
+                    raise InvalidProductDataException("Update row must be a dict with an integer product_id")
+                product = found.get(row["product_id"])
+                if product is None:
+                    raise InvalidProductDataException("Product not found.")
+                quantity, price, supplier = row.get("quantity"), row.get("price"), row.get("supplier")
+                validate(quantity, price, supplier)
+            except InvalidProductDataException as e:
+                errors.append((row_number, str(e)))
+                continue
+            
+            if atomic:
+                pending.append((product, quantity, price, supplier))
+            else:
+                apply_update(product, quantity, price, supplier)
+            updated_ids.append(product.product_id)
+        
+        if errors and atomic:
+            raise BulkOperationException(f"{len(errors)} invalid update rows, nothing was updated", errors)
+        
+        for update in pending:
+            apply_update(*update)
+        
+        return BulkResult(updated_ids, errors)
+    
+    def delete_products(self, product_ids, atomic: bool = False):
+        """
+        Delete many products, compacting the inventory in one sweep
+        
+        Args:
+            product_ids: Iterable of product ids
+            atomic     : If True, nothing is deleted when any id is not found
+        
+        Returns:
+            BulkResult with the ids of the deleted products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any id is not found
+        """
+        product_ids = list(product_ids)
+        ids = sorted({product_id for product_id in product_ids if isinstance(product_id, int)})
+        existing = {product.product_id for product in self.storage.get_many(ids) if product is not None}
+        
+        doomed = []
+        errors = []
+        for row_number, product_id in enumerate(product_ids):
+            if isinstance(product_id, int) and product_id in existing:
+                # A repeated id is only deleted once
+                existing.discard(product_id)
+                doomed.append(product_id)
+            else:
+                errors.append((row_number, "Product not found."))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid product ids, nothing was deleted", errors)
+        
+        snapshots = self.snapshots
+        if snapshots is not None and snapshots.oldest is not None:
+            for product in self.storage.get_many(sorted(doomed)):
+                snapshots.record(product.product_id, snapshots.copy(product))
+            with snapshots.structure_change():
+                deleted_products = self.storage.remove_many(doomed)
+        else:
+            deleted_products = self.storage.remove_many(doomed)
+        self.id_allocator.release_many(doomed)
+        
+        if self.listeners:
+            for product in deleted_products:
+                self._notify_delete(product)
+        
+        return BulkResult(doomed, errors)
+
+
+class ReadWriteLock:
+    """
+    Lock that lets many readers in at once, or one writer alone
+    
+    Waiting writers block new readers, so a steady stream of readers can
+    not starve a writer. The lock is not reentrant.
+    """
+    
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+    
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+    
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+    
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+    
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+    
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+    
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class ConcurrentProductRepository(ProductRepository):
+    """
+    Thread-safe products repository for concurrent order placement
+    
+    Locking:
+        structure_lock: read-write lock. Structural changes (add, delete, bulk
+                        methods, indexes) take it exclusively, everything else shares it
+        stripes       : per-product locks picked by product_id % number of stripes.
+                        Stock checks and decrements run under the product's stripe,
+                        so two orders can not both pass the quantity check and oversell
+        listener_lock : serialises the listener notifications
+    
+    Multi-product operations take their stripes in ascending stripe order,
+    so two of them can never wait on each other (no deadlock).
+    
+    A writer waits for the blocking change stream subscribers only after
+    releasing its locks, so a stalled subscriber does not hold up the
+    readers and the other writers.
+    """
+    
+    DEFER_BACKPRESSURE = True
+    
+    def __init__(self, storage: str = "list", stripes: int = 64) -> None:
+        super().__init__(storage)
+        if not isinstance(stripes, int) or stripes < 1:
+            raise InventoryException("Number of lock stripes must be a positive integer")
+        self.structure_lock = ReadWriteLock()
+        self.stripes = [threading.Lock() for _ in range(stripes)]
+        self.listener_lock = threading.Lock()
+    
+    def _stripe_index(self, product_id) -> int:
+        return product_id % len(self.stripes) if isinstance(product_id, int) else 0
+    
+    @contextmanager
+    def _locked_products(self, product_ids):
+        """Hold the shared structure lock and the stripes of product_ids (in ascending order)"""
+        stripes = [self.stripes[i] for i in sorted({self._stripe_index(pid) for pid in product_ids})]
+        with self.structure_lock.read():
+            for lock in stripes:
+                lock.acquire()
+            try:
+                yield
+            finally:
+                for lock in reversed(stripes):
+                    lock.release()
+    
+    def add_listener(self, listener: IInventoryListener) -> None:
+        with self.listener_lock:
+            super().add_listener(listener)
+    
+    def remove_listener(self, listener: IInventoryListener) -> None:
+        with self.listener_lock:
+            super().remove_listener(listener)
+    
+    def get_product(self, product_id: int):
+        with self.structure_lock.read():
+            return super().get_product(product_id)
+    
+    def _wait_for_subscribers(self) -> None:
+        """Backpressure of the blocking change stream subscribers, once this writer holds no lock"""
+        change_stream = self.change_stream
+        if change_stream is not None:
+            change_stream.wait_for_room()
+    
+    def add_product(self, name: str, category: str, quantity: int, price: int, supplier: str) -> str:
+        with self.structure_lock.write():
+            message = super().add_product(name, category, quantity, price, supplier)
+        self._wait_for_subscribers()
+        return message
+    
+    def update_product(self, product_id: int, quantity: int = None, price: int = None, supplier: str = None) -> str:
+        with self._locked_products((product_id,)):
+            message = super().update_product(product_id, quantity, price, supplier)
+        self._wait_for_subscribers()
+        return message
+    
+    def delete_product(self, product_id: int) -> str:
+        with self.structure_lock.write():
+            message = super().delete_product(product_id)
+        self._wait_for_subscribers()
+        return message
+    
+    def reserve_stock(self, lines: list) -> None:
+        with self._locked_products([product_id for product_id, _ in lines]):
+            super().reserve_stock(lines)
+        self._wait_for_subscribers()
+    
+    def reserve_stock_batch(self, lines: list) -> list:
+        with self._locked_products([product_id for product_id, _ in lines]):
+            results = super().reserve_stock_batch(lines)
+        self._wait_for_subscribers()
+        return results
+    
+    def add_products(self, rows, atomic: bool = False):
+        with self.structure_lock.write():
+            result = super().add_products(rows, atomic)
+        self._wait_for_subscribers()
+        return result
+    
+    def update_products(self, rows, atomic: bool = False):
+        with self.structure_lock.write():
+            result = super().update_products(rows, atomic)
+        self._wait_for_subscribers()
+        return result
+    
+    def delete_products(self, product_ids, atomic: bool = False):
+        with self.structure_lock.write():
+            result = super().delete_products(product_ids, atomic)
+        self._wait_for_subscribers()
+        return result
+    
+    def create_index(self, attribute: str) -> SecondaryIndex:
+        with self.structure_lock.write():
+            return super().create_index(attribute)
+    
+    def drop_index(self, attribute: str) -> None:
+        with self.structure_lock.write():
+            super().drop_index(attribute)
+    
+    def create_low_stock_monitor(self, default_threshold: int = None) -> LowStockMonitor:
+        with self.structure_lock.write():
+            return super().create_low_stock_monitor(default_threshold)
+    
+    def find_by(self, attribute: str, value) -> list:
+        with self.structure_lock.read(), self.listener_lock:
+            return super().find_by(attribute, value)
+    
+    def lowest_stock(self, k: int) -> list:
+        # Writers change the monitor under listener_lock; the products it names are
+        # looked up before a delete can remove them
+        with self.structure_lock.read(), self.listener_lock:
+            return super().lowest_stock(k)
+    
+    def create_range_index(self, attribute: str) -> RangeIndex:
+        with self.structure_lock.write():
+            return super().create_range_index(attribute)
+    
+    def drop_range_index(self, attribute: str) -> None:
+        with self.structure_lock.write():
+            super().drop_range_index(attribute)
+    
+    def find_range(self, attribute: str, low=None, high=None, **equals) -> list:
+        with self.structure_lock.read(), self.listener_lock:
+            return super().find_range(attribute, low, high, **equals)
+    
+    def count_range(self, attribute: str, low=None, high=None) -> int:
+        with self.structure_lock.read(), self.listener_lock:
+            return super().count_range(attribute, low, high)
+    
+    def sum_range(self, attribute: str, low=None, high=None):
+        with self.structure_lock.read(), self.listener_lock:
+            return super().sum_range(attribute, low, high)
+    
+    def create_name_index(self, fuzzy: bool = False) -> "NameSearchIndex":
+        with self.structure_lock.write():
+            return super().create_name_index(fuzzy)
+    
+    def drop_name_index(self) -> None:
+        with self.structure_lock.write():
+            super().drop_name_index()
+    
+    def search_names(self, query: str, limit: int = 10, fuzzy: bool = False) -> list:
+        with self.structure_lock.read(), self.listener_lock:
+            return super().search_names(query, limit, fuzzy)
+    
+    def snapshot(self) -> ReadSnapshot:
+        # No writer is half way through a change while the version is taken
+        with self.structure_lock.write():
+            return super().snapshot()
+    
+    def create_analytics_view(self) -> "ColumnarAnalyticsView":
+        with self.structure_lock.write():
+            view = super().create_analytics_view()
+            # Reports lock the view itself; the listener lock is already held
+            # while the view is being notified
+            view.lock = threading.Lock()
+            return view
+    
+    def drop_analytics_view(self) -> None:
+        with self.structure_lock.write():
+            super().drop_analytics_view()
+    
+    def check_indexes(self) -> list:
+        with self.structure_lock.write():
+            return super().check_indexes()
+    
+    def _notify_add(self, product) -> None:
+        with self.listener_lock:
+            super()._notify_add(product)
+    
+    def _notify_update(self, product, old_values: dict) -> None:
+        with self.listener_lock:
+            super()._notify_update(product, old_values)
+    
+    def _notify_delete(self, product) -> None:
+        with self.listener_lock:
+            super()._notify_delete(product)
@@ -0,0 +1,230 @@
+"""Product name search index (prefix and typo-tolerant search)"""
+
+from heapq import nsmallest
+import re
+
+from .exceptions import InventoryException
+from .listeners import IInventoryListener, SortedBuckets
+
+
+class NameSearchIndex(IInventoryListener):
+    """
+    Autocomplete and typo-tolerant search over product names
+    
+    Names are split into lower-case words. Every (word, product) pair is one
+    "word\\0<product_id>" string in SortedBuckets, so all the words starting
+    with a prefix are one contiguous run found with a bisect. With fuzzy=True
+    a trigram index over the distinct words is kept as well, to find words
+    that look like a misspelled query word.
+    
+    search() returns ids ordered by the matched word, then by product_id;
+    fuzzy_search() orders them by trigram similarity.
+    
+    Time complexity:
+        on_add/on_delete: O(w (log n + LOAD)) for a name of w words
+        search          : O(log n + N) for the top N of a one-word query
+        fuzzy_search    : O(size of the trigram lists of the query words + N)
+    """
+    
+    ID_DIGITS = 12
+    # Most candidates a multi-word search looks at before giving up
+    MAX_CANDIDATES = 10000
+    # Most products a multi-word fuzzy search scores
+    FUZZY_CANDIDATES = 250
+    _WORD = re.compile(r"\w+")
+    
+    def __init__(self, lookup, fuzzy: bool = False, load: int = 512) -> None:
+        """
+        Args:
+            lookup: Function returning the product of an id (used to check
+                    the other words of multi-word queries)
+            fuzzy : Keep the trigram index for fuzzy_search()
+        """
+        self.lookup = lookup
+        self.fuzzy = fuzzy
+        self.entries = SortedBuckets(load)
+        # word -> number of products using it, trigram -> words (fuzzy only)
+        self.word_counts = {}
+        self.trigrams = {}
+    
+    @staticmethod
+    def words_of(text: str) -> list:
+        """The distinct lower-case words of a text, in order"""
+        return list(dict.fromkeys(NameSearchIndex._WORD.findall(text.casefold())))
+    
+    @staticmethod
+    def trigrams_of(word: str) -> set:
+        padded = f" {word} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def _entry(self, word: str, product_id: int) -> str:
+        if product_id >= 10 ** self.ID_DIGITS:
+            raise InventoryException(f"Product id {product_id} is too big for the name index")
+        return f"{word}\0{product_id:0{self.ID_DIGITS}d}"
+    
+    def build(self, products) -> None:
+        """Fill the index from an iterable of products"""
+        entries = []
+        self.word_counts, self.trigrams = {}, {}
+        for product in products:
+            for word in self.words_of(product.name):
+                entries.append(self._entry(word, product.product_id))
+                if self.fuzzy:
+                    self._add_word(word)
+        entries.sort()
+        self.entries.build(entries)
+    
+    def _add_word(self, word: str) -> None:
+        count = self.word_counts.get(word, 0)
+        self.word_counts[word] = count + 1
+        if not count:
+            for trigram in self.trigrams_of(word):
+                words = self.trigrams.get(trigram)
+                if words is None:
+                    self.trigrams[trigram] = words = set()
+                words.add(word)
+    
+    def _remove_word(self, word: str) -> None:
+        count = self.word_counts.get(word, 0) - 1
+        if count > 0:
+            self.word_counts[word] = count
+            return
+        self.word_counts.pop(word, None)
+        for trigram in self.trigrams_of(word):
+            words = self.trigrams.get(trigram)
+            if words is not None:
+                words.discard(word)
+                if not words:
+                    del self.trigrams[trigram]
+    
+    def _add(self, name: str, product_id: int) -> None:
+        for word in self.words_of(name):
+            self.entries.insert(self._entry(word, product_id))
+            if self.fuzzy:
+                self._add_word(word)
+    
+    def _remove(self, name: str, product_id: int) -> None:
+        for word in self.words_of(name):
+            if self.entries.remove(self._entry(word, product_id)) and self.fuzzy:
+                self._remove_word(word)
+    
+    def on_add(self, product) -> None:
+        self._add(product.name, product.product_id)
+    
+    def on_update(self, product, old_values: dict) -> None:
+        if "name" in old_values:
+            self._remove(old_values["name"], product.product_id)
+            self._add(product.name, product.product_id)
+    
+    def on_delete(self, product) -> None:
+        self._remove(product.name, product.product_id)
+    
+    def _ids_with_prefix(self, prefix: str):
+        """Yield the ids of the products having a word that starts with prefix"""
+        digits = self.ID_DIGITS
+        for entry in self.entries.iterate(self.entries.position(prefix)):
+            if not entry.startswith(prefix):
+                return
+            yield int(entry[-digits:])
+    
+    def search(self, query: str, limit: int = 10) -> list:
+        """
+        Return the ids of up to limit products having, for every word of the
+        query, a word starting with it ("lap del" finds "Dell Laptop")
+        """
+        words = self.words_of(query)
+        if not words or limit <= 0:
+            return []
+        # The longest query word drives the search, the others are checked
+        words.sort(key=len, reverse=True)
+        driver, others = words[0], words[1:]
+        result = []
+        seen = set()
+        for candidates, product_id in enumerate(self._ids_with_prefix(driver)):
+            if candidates >= self.MAX_CANDIDATES or len(result) >= limit:
+                break
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            if others:
+                product = self.lookup(product_id)
+                if product is None:
+                    continue
+                name_words = self.words_of(product.name)
+                if not all(any(word.startswith(other) for word in name_words) for other in others):
+                    continue
+            result.append(product_id)
+        return result
+    
+    def similar_words(self, word: str, min_similarity: float = 0.2, limit: int = 20) -> list:
+        """
+        Return up to limit (similarity, word) tuples for the indexed words that
+        share trigrams with word, most similar first (similarity = Jaccard
+        index of the trigram sets)
+        """
+        if not self.fuzzy:
+            raise InventoryException("The name index was created without fuzzy search")
+        query = self.trigrams_of(word)
+        shared = {}
+        for trigram in query:
+            for candidate in self.trigrams.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        scored = []
+        for candidate, count in shared.items():
+            # A word of n characters has at most n distinct padded trigrams
+            similarity = count / (len(query) + len(candidate) - count)
+            if similarity >= min_similarity:
+                scored.append((-similarity, candidate))
+        return [(-score, candidate) for score, candidate in nsmallest(limit, scored)]
+    
+    def fuzzy_search(self, query: str, limit: int = 10, min_similarity: float = 0.2) -> list:
+        """
+        Return the ids of up to limit products whose words look like the query
+        words, best first (score: sum over the query words of the similarity
+        of the best matching word of the name)
+        
+        The products of the words most similar to the longest query word are
+        visited first; a one-word query stops after limit products, a longer
+        one scores at most FUZZY_CANDIDATES products.
+        """
+        words = self.words_of(query)
+        if not words or limit <= 0:
+            return []
+        words.sort(key=len, reverse=True)
+        driver, others = words[0], words[1:]
+        # other query word -> {similar indexed word: similarity}
+        similar = {other: {match: similarity for similarity, match in self.similar_words(other, min_similarity)}
+                   for other in others}
+        budget = self.FUZZY_CANDIDATES if others else limit
+        scored = []
+        seen = set()
+        for similarity, match in self.similar_words(driver, min_similarity):
+            for product_id in self._ids_with_prefix(match + "\0"):
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                score = similarity
+                if others:
+                    product = self.lookup(product_id)
+                    if product is None:
+                        continue
+                    name_words = self.words_of(product.name)
+                    for other in others:
+                        score += max((similar[other].get(word, 0) for word in name_words), default=0)
+                scored.append((-score, product_id))
+                if len(seen) >= budget:
+                    break
+            if len(seen) >= budget:
+                break
+        return [product_id for _, product_id in nsmallest(limit, scored)]
+    
+    def check(self, products) -> list:
+        """Compare the index with an iterable of products; return the problems found"""
+        expected = NameSearchIndex(self.lookup, self.fuzzy)
+        expected.build(products)
+        problems = [f"Name index: {problem}" for problem in self.entries.check()]
+        if list(self.entries.iterate()) != list(expected.entries.iterate()):
+            problems.append("Name index: entries differ from the inventory")
+        if self.fuzzy and (self.word_counts != expected.word_counts or self.trigrams != expected.trigrams):
+            problems.append("Name index: trigram index differs from the inventory")
+        return problems
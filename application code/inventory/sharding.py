@@ -0,0 +1,508 @@
+"""Sharded product repository and the process-pool analytics over its shards"""
+
+from heapq import merge
+from operator import attrgetter
+import os
+
+from .exceptions import BulkOperationException, InvalidOrderDataException, InvalidProductDataException, InventoryException
+from .listeners import IInventoryListener
+from .models import BulkResult, ProductInfo, ProductValidator
+from .orders import OrderLog
+from .repository import IProductRepository, ProductRepository
+from .storage import IdAllocator
+
+
+class ShardedProductRepository(IProductRepository):
+    """
+    Products repository partitioned over several ProductRepository shards
+    
+    Every product lives in exactly one shard, picked from its product_id:
+        "hash" : product_id % number of shards (spreads the ids evenly)
+        "range": consecutive blocks of shard_size ids (ids 1..shard_size in
+                 the first shard and so on; the last shard takes the rest).
+                 shard_size is given, or sized from expected_products so
+                 that the expected ids fill every shard
+    The ids are handed out by one IdAllocator for all the shards, so the
+    lowest deleted id is still reused first. The shards only store the
+    products; their own id allocators are not used.
+    
+    It has the same get/add/update/delete, bulk and reserve_stock methods
+    as ProductRepository, so Order works with it unchanged. Aggregations
+    over all the shards run in parallel with ParallelAnalytics. version
+    counts the changes made through the repository, so the analytics can
+    tell when their copy of the shards is out of date.
+    
+    Like ProductRepository it is not thread-safe.
+    """
+    
+    PARTITIONS = ("hash", "range")
+    
+    def __init__(self, shards: int = 4, partition: str = "hash", shard_size: int = None,
+                 storage: str = "list", expected_products: int = None) -> None:
+        """
+        Args:
+            shards           : Number of shards
+            partition        : "hash" or "range"
+            shard_size       : Ids per shard for "range" partitioning
+            storage          : Storage backend of every shard (see ProductRepository)
+            expected_products: Number of ids the "range" shards are sized for
+                               when shard_size is not given
+        """
+        if not isinstance(shards, int) or shards < 1:
+            raise InventoryException("Number of shards must be a positive integer")
+        if partition not in self.PARTITIONS:
+            raise InventoryException(f"Unknown partitioning: {partition!r}")
+        if partition == "range" and shard_size is None:
+            if not isinstance(expected_products, int) or expected_products < 1:
+                raise InventoryException("Range partitioning needs a shard_size or the expected number of products")
+            # Rounded up, so the expected ids spread over all the shards
+            shard_size = -(-expected_products // shards)
+        if shard_size is not None and (not isinstance(shard_size, int) or shard_size < 1):
+            raise InventoryException("Shard size must be a positive integer")
+        self.shards = [ProductRepository(storage) for _ in range(shards)]
+        self.partition = partition
+        self.shard_size = shard_size
+        self.id_allocator = IdAllocator()
+        # Changes made through the repository (see ParallelAnalytics)
+        self.version = 0
+        # OrderLog written by Order.place_order (see ProductRepository.enable_order_log)
+        self.order_log = None
+    
+    def shard_index(self, product_id: int) -> int:
+        """Index of the shard product_id belongs to"""
+        if self.partition == "hash":
+            return product_id % len(self.shards)
+        return min((product_id - 1) // self.shard_size, len(self.shards) - 1)
+    
+    def shard_for(self, product_id):
+        """The shard product_id belongs to (None for an invalid id)"""
+        if not isinstance(product_id, int) or product_id < 1:
+            return None
+        return self.shards[self.shard_index(product_id)]
+    
+    def _group(self, items, product_id=lambda item: item) -> dict:
+        """Split items into {shard index: [items]} by their product_id"""
+        groups = {}
+        for item in items:
+            groups.setdefault(self.shard_index(product_id(item)), []).append(item)
+        return groups
+    
+    def _get_many(self, product_ids) -> dict:
+        """{product_id: product} of the existing products, one get_many per shard"""
+        valid = sorted(product_id for product_id in product_ids
+                       if isinstance(product_id, int) and product_id > 0)
+        found = {}
+        for index, ids in self._group(valid).items():
+            for product_id, product in zip(ids, self.shards[index].storage.get_many(ids)):
+                if product is not None:
+                    found[product_id] = product
+        return found
+    
+    def __len__(self) -> int:
+        return sum(len(shard.storage) for shard in self.shards)
+    
+    def __iter__(self):
+        """Every product in product_id order"""
+        return merge(*(shard.storage for shard in self.shards), key=attrgetter("product_id"))
+    
+    @property
+    def inventory(self) -> list:
+        """Products of every shard sorted by product_id (a new list)"""
+        return list(self)
+    
+    @property
+    def deleted_ids(self) -> frozenset:
+        """Ids of deleted products that are waiting to be reused"""
+        return self.id_allocator.free_ids()
+    
+    def add_listener(self, listener: IInventoryListener) -> None:
+        """Notify listener about the changes of every shard"""
+        for shard in self.shards:
+            shard.add_listener(listener)
+    
+    def remove_listener(self, listener: IInventoryListener) -> None:
+        for shard in self.shards:
+            shard.remove_listener(listener)
+    
+    def create_index(self, attribute: str) -> None:
+        """Create a secondary index on attribute in every shard"""
+        for shard in self.shards:
+            shard.create_index(attribute)
+    
+    def find_by(self, attribute: str, value) -> list:
+        """Return the products with attribute == value from every shard, by product_id"""
+        return list(merge(*(shard.find_by(attribute, value) for shard in self.shards),
+                          key=attrgetter("product_id")))
+    
+    def get_product(self, product_id: int):
+        """
+        Return the product with product_id
+        
+        Returns:
+            ProductInfo object, or None if the product does not exist
+        """
+        shard = self.shard_for(product_id)
+        return None if shard is None else shard.storage.get(product_id)
+    
+    def add_product(self, name: str, category: str, quantity: int, price: int, supplier: str) -> str:
+        """
+        Add a new product to the shard of its (lowest free) id
+        
+        Raises:
+            InvalidProductDataException: if any parameter is invalid
+        """
+        ProductValidator.validate_new(name, category, quantity, price, supplier)
+        product_id = self.id_allocator.acquire()
+        shard = self.shards[self.shard_index(product_id)]
+        shard.storage.insert(ProductInfo(product_id, name, category, quantity, price, supplier))
+        self.version += 1
+        if shard.listeners:
+            shard._notify_add(shard.storage.get(product_id))
+        return "Product added successfully"
+    
+    def update_product(self, product_id: int, quantity: int = None, price: int = None, supplier: str = None) -> str:
+        """
+        Update product information in its shard
+        
+        Raises:
+            InvalidProductDataException: if the product does not exist or a parameter is invalid
+        """
+        shard = self.shard_for(product_id)
+        if shard is None:
+            raise InvalidProductDataException("Product not found.")
+        message = shard.update_product(product_id, quantity, price, supplier)
+        self.version += 1
+        return message
+    
+    def delete_product(self, product_id: int) -> str:
+        """
+        Delete a product from its shard
+        
+        Raises:
+            InvalidProductDataException: if the product does not exist
+        """
+        shard = self.shard_for(product_id)
+        deleted_product = None if shard is None else shard.storage.remove(product_id)
+        if deleted_product is None:
+            raise InvalidProductDataException("Product not found.")
+        self.id_allocator.release(product_id)
+        self.version += 1
+        if shard.listeners:
+            shard._notify_delete(deleted_product)
+        return "Product deleted successfully"
+    
+    def add_products(self, rows, atomic: bool = False):
+        """
+        Add many products, one sorted insert_many per shard
+        
+        Returns:
+            BulkResult with the ids of the added products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        valid = []
+        errors = []
+        for row_number, row in enumerate(rows):
+            try:
+                valid.append(ProductValidator.new_product_fields(row))
+            except InvalidProductDataException as e:
+                errors.append((row_number, str(e)))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid product rows, nothing was added", errors)
+        
+        # The ids come back ascending, so every shard gets one sorted run
+        product_ids = self.id_allocator.acquire_many(len(valid))
+        new_products = [ProductInfo(product_id, *fields) for product_id, fields in zip(product_ids, valid)]
+        self.version += 1
+        for index, products in self._group(new_products, attrgetter("product_id")).items():
+            shard = self.shards[index]
+            shard.storage.insert_many(products)
+            if shard.listeners:
+                for product in shard.storage.get_many([product.product_id for product in products]):
+                    shard._notify_add(product)
+        
+        return BulkResult(product_ids, errors)
+    
+    def update_products(self, rows, atomic: bool = False):
+        """
+        Update many products, one update_products call per shard
+        
+        Returns:
+            BulkResult with the ids of the updated products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        rows = list(rows)
+        errors = []
+        groups = {}
+        for row_number, row in enumerate(rows):
+            if not isinstance(row, dict) or not isinstance(row.get("product_id"), int):
+                errors.append((row_number, "Update row must be a dict with an integer product_id"))
+                continue
+            if self.get_product(row["product_id"]) is None:
+                errors.append((row_number, "Product not found."))
+                continue
+            if atomic:
+                # Every row is checked before any shard is touched
+                try:
+                    ProductValidator.validate_update(row.get("quantity"), row.get("price"), row.get("supplier"))
+                except InvalidProductDataException as e:
+                    errors.append((row_number, str(e)))
+                    continue
+            groups.setdefault(self.shard_index(row["product_id"]), []).append((row_number, row))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid update rows, nothing was updated", errors)
+        
+        updated = []
+        self.version += 1
+        for index, numbered in groups.items():
+            result = self.shards[index].update_products([row for _, row in numbered])
+            # Map the shard's row numbers back to the caller's
+            errors.extend((numbered[row_number][0], message) for row_number, message in result.errors)
+            failed = {numbered[row_number][0] for row_number, _ in result.errors}
+            updated.extend((row_number, row["product_id"]) for row_number, row in numbered if row_number not in failed)
+        updated.sort()
+        errors.sort()
+        return BulkResult([product_id for _, product_id in updated], errors)
+    
+    def delete_products(self, product_ids, atomic: bool = False):
+        """
+        Delete many products, one remove_many per shard
+        
+        Returns:
+            BulkResult with the ids of the deleted products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any id is not found
+        """
+        product_ids = list(product_ids)
+        doomed = []
+        errors = []
+        seen = set()
+        for row_number, product_id in enumerate(product_ids):
+            # A repeated id is only deleted once
+            if product_id not in seen and self.get_product(product_id) is not None:
+                seen.add(product_id)
+                doomed.append(product_id)
+            else:
+                errors.append((row_number, "Product not found."))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid product ids, nothing was deleted", errors)
+        
+        self.version += 1
+        for index, ids in self._group(doomed).items():
+            shard = self.shards[index]
+            deleted_products = shard.storage.remove_many(ids)
+            if shard.listeners:
+                for product in deleted_products:
+                    shard._notify_delete(product)
+        self.id_allocator.release_many(doomed)
+        
+        return BulkResult(doomed, errors)
+    
+    def reserve_stock(self, lines: list) -> None:
+        """
+        Take the quantities of (product_id, quantity) lines out of the stock,
+        all or nothing across the shards (see ProductRepository.reserve_stock)
+        
+        Raises:
+            InvalidProductDataException: if a product does not exist
+            InvalidOrderDataException  : if a product does not have enough quantity
+        """
+        totals = {}
+        for product_id, quantity in lines:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        ids = sorted(totals)
+        found = self._get_many(ids)
+        products = [found.get(product_id) for product_id in ids]
+        
+        # Check every line in every shard before touching the stock
+        for product_id, product in zip(ids, products):
+            prefix = "" if len(ids) == 1 else f"Product {product_id}: "
+            if product is None:
+                raise InvalidProductDataException(f"{prefix}Product not found.")
+            if product.quantity < totals[product_id]:
+                raise InvalidOrderDataException(f"{prefix}There is no enough quantity of this product to order.\nYou can order up to {product.quantity} copies.")
+        
+        self.version += 1
+        for product_id, product in zip(ids, products):
+            self.shards[self.shard_index(product_id)].decrement_stock(product, totals[product_id])
+    
+    def reserve_stock_batch(self, lines: list) -> list:
+        """
+        Take many independent (product_id, quantity) lines out of the stock
+        
+        Returns:
+            List with None for every reserved line and the exception of every failed line
+        """
+        found = self._get_many({product_id for product_id, _ in lines})
+        self.version += 1
+        results = []
+        for product_id, quantity in lines:
+            product = found.get(product_id)
+            if product is None:
+                results.append(InvalidProductDataException("Product not found."))
+            elif product.quantity < quantity:
+                results.append(InvalidOrderDataException(f"There is no enough quantity of this product to order.\nYou can order up to {product.quantity} copies."))
+            else:
+                self.shards[self.shard_index(product_id)].decrement_stock(product, quantity)
+                results.append(None)
+        return results
+    
+    def enable_order_log(self, bucket_seconds: int = 60, buckets: int = 60) -> OrderLog:
+        """Keep a history of the placed order lines (see OrderLog)"""
+        self.order_log = OrderLog(bucket_seconds, buckets)
+        return self.order_log
+    
+    def analytics(self, processes: int = None):
+        """Return a ParallelAnalytics over the current contents of the shards"""
+        return ParallelAnalytics(self, processes)
+
+
+def _shard_group_totals(products, group_by: str) -> dict:
+    """{group: [products, quantity, stock value]} of one shard"""
+    totals = {}
+    key = attrgetter(group_by)
+    for product in products:
+        group = key(product)
+        entry = totals.get(group)
+        if entry is None:
+            totals[group] = entry = [0, 0, 0]
+        quantity = product.quantity
+        entry[0] += 1
+        entry[1] += quantity
+        entry[2] += quantity * product.price
+    return totals
+
+
+# Shards inherited by a forked ParallelAnalytics worker (set by its pool initializer)
+_FORKED_SHARDS = None
+
+
+def _set_forked_shards(shards: list) -> None:
+    global _FORKED_SHARDS
+    _FORKED_SHARDS = shards
+
+
+def _forked_group_totals(shard_index: int, group_by: str) -> dict:
+    return _shard_group_totals(_FORKED_SHARDS[shard_index].storage, group_by)
+
+
+def _copied_group_totals(rows: list, group_by: str) -> dict:
+    return _shard_group_totals((ProductInfo(*row) for row in rows), group_by)
+
+
+class ParallelAnalytics:
+    """
+    Aggregations over a ShardedProductRepository computed by a process pool
+    
+    Every shard is aggregated by one worker process and the partial results
+    are merged. Where the "fork" start method exists the workers are forked
+    and read the shards they inherited, so nothing is copied per query.
+    They hold the inventory as it was when they were forked: once the
+    repository's version changed, queries are aggregated in the calling
+    process (the serial cost, never a fork per query) until refresh() forks
+    the workers again, e.g. after a batch of changes. Elsewhere the rows of
+    every shard are sent to the workers with each query.
+    
+    processes=1 aggregates in the calling process, without a pool.
+    
+    Use as a context manager, or call close() to stop the workers.
+    """
+    
+    GROUPS = ("category", "supplier")
+    
+    def __init__(self, repo: ShardedProductRepository, processes: int = None) -> None:
+        if not isinstance(repo, ShardedProductRepository):
+            raise InventoryException("ParallelAnalytics needs a ShardedProductRepository")
+        if processes is None:
+            processes = min(len(repo.shards), os.cpu_count() or 1)
+        if not isinstance(processes, int) or processes < 1:
+            raise InventoryException("Number of processes must be a positive integer")
+        self.repo = repo
+        self.processes = processes
+        self.pool = None
+        self.forked = False
+        # Repository version the forked workers hold
+        self.version = None
+        self.refresh()
+    
+    def refresh(self) -> None:
+        """Restart the workers so they see the current contents of the shards"""
+        self.close()
+        if self.processes == 1:
+            return
+        import multiprocessing
+        self.forked = "fork" in multiprocessing.get_all_start_methods()
+        if self.forked:
+            # The initializer runs in every worker the pool forks, including
+            # the ones it starts later to replace a worker that exited
+            self.version = self.repo.version
+            self.pool = multiprocessing.get_context("fork").Pool(
+                self.processes, initializer=_set_forked_shards, initargs=(self.repo.shards,))
+        else:
+            self.pool = multiprocessing.Pool(self.processes)
+    
+    @property
+    def stale(self) -> bool:
+        """True when the forked workers hold an older version of the shards (see refresh)"""
+        return self.forked and self.pool is not None and self.version != self.repo.version
+    
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+    
+    def group_totals(self, group_by: str) -> dict:
+        """
+        Return {group: {"products", "quantity", "stock_value"}} over every shard
+        
+        Args:
+            group_by: "category" or "supplier"
+        """
+        if group_by not in self.GROUPS:
+            raise InventoryException(f"Can not group by {group_by!r}")
+        shards = self.repo.shards
+        if self.pool is None or self.stale:
+            # No pool, or forked workers holding an older copy of the shards: aggregate here
+            partials = [_shard_group_totals(shard.storage, group_by) for shard in shards]
+        elif self.forked:
+            partials = self.pool.starmap(_forked_group_totals, [(i, group_by) for i in range(len(shards))])
+        else:
+            fields = attrgetter("product_id", "name", "category", "quantity", "price", "supplier")
+            partials = self.pool.starmap(_copied_group_totals,
+                                         [([fields(p) for p in shard.storage], group_by) for shard in shards])
+        
+        # Merge the partial results of the shards
+        totals = {}
+        for partial in partials:
+            for group, (products, quantity, value) in partial.items():
+                entry = totals.get(group)
+                if entry is None:
+                    totals[group] = entry = [0, 0, 0]
+                entry[0] += products
+                entry[1] += quantity
+                entry[2] += value
+        return {group: {"products": products, "quantity": quantity, "stock_value": value}
+                for group, (products, quantity, value) in totals.items()}
+    
+    def stock_value_by_category(self) -> dict:
+        """{category: sum of quantity * price}"""
+        return {group: totals["stock_value"] for group, totals in self.group_totals("category").items()}
+    
+    def supplier_totals(self) -> dict:
+        """{supplier: {"products", "quantity", "stock_value"}}"""
+        return self.group_totals("supplier")
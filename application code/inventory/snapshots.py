@@ -0,0 +1,198 @@
+"""Copy-on-write point-in-time read snapshots"""
+
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import count
+from operator import itemgetter
+import threading
+from time import sleep
+
+from .exceptions import InventoryException
+from .models import ProductInfo
+
+
+class SnapshotManager:
+    """
+    Versions and before-images behind the point-in-time ReadSnapshots of a repository
+    
+    Taking a snapshot only reserves the next version number. While at least
+    one snapshot is open, every writer records the product's before-image
+    (a ProductInfo copy, or None for a product that did not exist yet)
+    under a new version *before* it changes the product. A snapshot taken
+    at version v reads a product by copying its current fields and then
+    looking for the first before-image recorded after v: if there is one,
+    that is the product as it was at v, otherwise the copy is.
+    
+    Inserts and removals also bump structure_seq before and after touching
+    the storage (a sequence lock), so readers redo a batch that raced with a
+    shift of the list. Readers never take a lock and writers never wait for
+    readers; the memory used is one before-image per change made while a
+    snapshot is open, dropped when the snapshots that need it are closed.
+    """
+    
+    def __init__(self) -> None:
+        # Version numbers (next() of itertools.count is atomic)
+        self._versions = count(1)
+        # Odd while a product is being inserted into or removed from the storage
+        self.structure_seq = 0
+        # product_id -> [(version, before-image or None), ...] in version order
+        self.history = {}
+        # Versions of the open snapshots -> how many are open at that version
+        self.open_versions = {}
+        # Version of the oldest open snapshot (None when no snapshot is open)
+        self.oldest = None
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def copy(product):
+        """A detached ProductInfo copy of a product (or of a ProductRow view)"""
+        return ProductInfo(product.product_id, product.name, product.category,
+                           product.quantity, product.price, product.supplier)
+    
+    def record(self, product_id: int, before) -> None:
+        """Keep the state of a product before a change (call before changing it)"""
+        entries = self.history.get(product_id)
+        if entries is None:
+            entries = self.history.setdefault(product_id, [])
+        entries.append((next(self._versions), before))
+    
+    def open(self) -> int:
+        """Register a new snapshot and return its version"""
+        with self.lock:
+            version = next(self._versions)
+            self.open_versions[version] = self.open_versions.get(version, 0) + 1
+            if self.oldest is None:
+                self.oldest = version
+            return version
+    
+    def release(self, version: int) -> None:
+        """Forget a closed snapshot and the before-images nobody needs any more"""
+        with self.lock:
+            left = self.open_versions.get(version, 0) - 1
+            if left < 0:
+                return
+            if left:
+                self.open_versions[version] = left
+                return
+            del self.open_versions[version]
+            if not self.open_versions:
+                self.oldest = None
+                self.history = {}
+                return
+            oldest = min(self.open_versions)
+            if oldest == self.oldest:
+                return
+            self.oldest = oldest
+            # Only the before-images recorded after the oldest snapshot are needed
+            for entries in list(self.history.values()):
+                del entries[:bisect_right(entries, oldest, key=itemgetter(0))]
+    
+    def before_image(self, product_id: int, version: int):
+        """
+        Return (True, product as of version) if the product changed after
+        version, or (False, None) if its current state is the one of version
+        """
+        entries = self.history.get(product_id)
+        if entries:
+            i = bisect_right(entries, version, key=itemgetter(0))
+            if i < len(entries):
+                return True, entries[i][1]
+        return False, None
+    
+    @contextmanager
+    def structure_change(self):
+        """Wrap an insert into or a removal from the storage (sequence lock for the readers)"""
+        self.structure_seq += 1
+        try:
+            yield
+        finally:
+            self.structure_seq += 1
+    
+    def history_size(self) -> int:
+        """Number of before-images kept"""
+        return sum(len(entries) for entries in list(self.history.values()))
+
+
+class ReadSnapshot:
+    """
+    Read-only, point-in-time view of a ProductRepository (see SnapshotManager)
+    
+    Products are handed out as detached ProductInfo copies, so changing them
+    does not change the inventory. Close the snapshot (or use it as a
+    context manager) so the before-images it needs can be dropped.
+    
+    Time complexity:
+        making it  : O(1)
+        get_product: O(log n + log c) for c changes of the product
+        iteration  : O(n), in batches of BATCH ids
+    """
+    
+    BATCH = 512
+    
+    def __init__(self, repo, manager: SnapshotManager) -> None:
+        self.closed = True
+        self.repo = repo
+        self.manager = manager
+        self.version = manager.open()
+        # Every product of the snapshot has an id below this one
+        self.next_id = repo.id_allocator.next_id
+        self.closed = False
+    
+    def _read(self, product_ids: list) -> list:
+        """The products of sorted product_ids as of the snapshot (None where missing)"""
+        if self.closed:
+            raise InventoryException("The snapshot is closed")
+        manager = self.manager
+        storage = self.repo.storage
+        copy = manager.copy
+        while True:
+            seq = manager.structure_seq
+            if seq & 1:
+                # A product is being inserted or removed right now
+                sleep(0)
+                continue
+            products = [None if product is None else copy(product) for product in storage.get_many(product_ids)]
+            if manager.structure_seq == seq:
+                break
+        
+        before_image = manager.before_image
+        version = self.version
+        for i, product_id in enumerate(product_ids):
+            changed, before = before_image(product_id, version)
+            if changed:
+                products[i] = before
+        return products
+    
+    def get_product(self, product_id: int):
+        """Return a copy of the product as of the snapshot, or None if it did not exist"""
+        if not isinstance(product_id, int) or not 0 < product_id < self.next_id:
+            return None
+        return self._read([product_id])[0]
+    
+    def __iter__(self):
+        """Copies of the products of the snapshot, in product_id order"""
+        batch = self.BATCH
+        for start in range(1, self.next_id, batch):
+            for product in self._read(list(range(start, min(start + batch, self.next_id)))):
+                if product is not None:
+                    yield product
+    
+    @property
+    def inventory(self) -> list:
+        """Products of the snapshot sorted by product_id (a new list)"""
+        return list(self)
+    
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.manager.release(self.version)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+    
+    def __del__(self) -> None:
+        self.close()
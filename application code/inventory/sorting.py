@@ -0,0 +1,784 @@
+"""Sorting of products: merge sort, the Sort engine and the memory-bounded external merge sort"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from heapq import heapify, heappop, heapreplace
+from operator import attrgetter
+import os
+import struct
+import tempfile
+
+from .exceptions import InventoryException
+from .models import ProductInfo, _product_id_key
+
+
+class ISort(ABC):
+    """
+    Abstract base class defining the interface for sorting algorithms.
+    
+    This interface requires implementations of insertion sort, merge sort and
+    natural (run-detecting) merge sort for sorting collections of objects.
+    Every algorithm takes a key function (product_id by default) and a
+    reverse flag, and is stable.
+    """
+    
+    @staticmethod
+    @abstractmethod
+    def insertion_sort(A, key=None, reverse=False):
+        """
+        Sort an array in-place using the insertion sort algorithm.
+        
+        Args:
+            A      : Array-like collection to be sorted.
+            key    : Function returning the comparison key of an element
+                     (default: the 'product_id' attribute).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def merge_sort(arr, l, r, key=None, reverse=False):
+        """
+        Sort an array in-place using the merge sort algorithm.
+        
+        Args:
+            arr    : Array-like collection to be sorted.
+            l (int): Left index (starting position) of the subarray to sort.
+            r (int): Right index (ending position) of the subarray to sort.
+            key    : Function returning the comparison key of an element
+                     (default: the 'product_id' attribute).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        """
+        
+        pass
+    
+    @staticmethod
+    @abstractmethod
+    def natural_merge_sort(A, key=None, reverse=False):
+        """
+        Sort an array in-place by detecting the runs that are already sorted
+        and merging them.
+        
+        Args:
+            A      : Array-like collection to be sorted.
+            key    : Function returning the comparison key of an element
+                     (default: the 'product_id' attribute).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        """
+        pass
+
+
+class SortKey:
+    """
+    Turns sort key specifications into key functions
+    
+    A specification can be:
+        None                : product_id (ascending)
+        "price"             : an attribute name, "-price" for descending
+        a callable          : a key function
+        a list of the above : multi-key ordering, e.g. ["category", "-price"],
+                              where tuples (attribute or callable, descending)
+                              are allowed too
+    """
+    
+    @staticmethod
+    def parse(spec) -> list:
+        """
+        Return the specification as a list of (key function, descending) passes
+        
+        Neighbouring keys with the same direction are combined into one key
+        function returning a tuple, so mixed directions need one pass per group.
+        
+        Raises:
+            InventoryException: if the specification is invalid
+        """
+        if spec is None:
+            return [(_product_id_key, False)]
+        items = spec if isinstance(spec, list) else [spec]
+        if not items:
+            raise InventoryException("Sort key list must not be empty")
+        
+        parts = []
+        for item in items:
+            descending = False
+            if isinstance(item, tuple):
+                if len(item) != 2:
+                    raise InventoryException("Sort key tuples must be (key, descending)")
+                item, descending = item
+            if isinstance(item, str):
+                if item.startswith("-"):
+                    item, descending = item[1:], not descending
+                if not item:
+                    raise InventoryException("Sort key attribute must be a non-empty string")
+                parts.append((item, bool(descending)))
+            elif callable(item):
+                parts.append((item, bool(descending)))
+            else:
+                raise InventoryException(f"Invalid sort key: {item!r}")
+        
+        # Group neighbouring keys with the same direction
+        passes = []
+        i = 0
+        while i < len(parts):
+            j = i
+            while j + 1 < len(parts) and parts[j + 1][1] == parts[i][1]:
+                j += 1
+            group = [part for part, _ in parts[i:j + 1]]
+            passes.append((SortKey._combine(group), parts[i][1]))
+            i = j + 1
+        return passes
+    
+    @staticmethod
+    def _combine(group: list):
+        if all(isinstance(part, str) for part in group):
+            # attrgetter with several names returns a tuple
+            return attrgetter(*group)
+        functions = [attrgetter(part) if isinstance(part, str) else part for part in group]
+        if len(functions) == 1:
+            return functions[0]
+        return lambda item: tuple(function(item) for function in functions)
+
+
+class MergeSort:
+    """
+    Implementation of the merge sort algorithm for arrays of objects,
+    ordered by a key function (product_id by default).
+    
+    Merges go through one scratch buffer that is allocated once per sort and
+    only holds the smaller of the two runs, instead of fresh temporary lists
+    on every recursion level.
+    
+    Merge sort is a divide-and-conquer algorithm with O(n log n) time complexity
+    and is particularly efficient for linked lists due to its sequential access pattern.
+    """
+    
+    # Subarrays up to this size are sorted with insertion sort
+    SMALL = 16
+    
+    @staticmethod
+    def merge(arr, l, m, r, key=None, buffer=None, reverse=False):
+        """
+        Merge two sorted subarrays into a single sorted subarray,
+        based on key (product_id by default)
+        
+        Args:
+            arr           : The array containing the subarrays to merge.
+            l (int)       : Starting index of the left subarray.
+            m (int)       : Ending index of the left subarray (middle point).
+            r (int)       : Ending index of the right subarray.
+            key           : Key function (default: product_id).
+            buffer (list) : Scratch list reused between merges (allocated if None).
+            reverse (bool): Merge into descending order.
+        
+        Returns:
+            None. Merges the subarrays in-place within arr.
+        
+        Algorithm:
+            1. Returns at once if the two runs are already in order
+            2. Copies the smaller run into the scratch buffer
+            3. Merges the buffer and the other run back into arr
+               (from the front for a buffered left run, from the back otherwise)
+            4. Copies any remaining buffered elements
+        """
+        if m < l or m >= r:
+            return
+        key = key or _product_id_key
+        
+        # Already in order (e.g. a sorted input): nothing to move
+        last_left, first_right = key(arr[m]), key(arr[m + 1])
+        if (first_right <= last_left) if reverse else (last_left <= first_right):
+            return
+        
+        n1 = m - l + 1  # Size of left subarray
+        n2 = r - m      # Size of right subarray
+        if buffer is None:
+            buffer = [None] * min(n1, n2)
+        
+        if n1 <= n2:
+            # Buffer the left run and merge from the front
+            buffer[:n1] = arr[l:m + 1]
+            i, j, k = 0, m + 1, l
+            left_key, right_key = key(buffer[0]), first_right
+            while True:
+                # Taking the right element only when it strictly wins keeps the sort stable
+                if (right_key > left_key) if reverse else (right_key < left_key):
+                    arr[k] = arr[j]
+                    k += 1
+                    j += 1
+                    if j > r:
+                        break
+                    right_key = key(arr[j])
+                else:
+                    arr[k] = buffer[i]
+                    k += 1
+                    i += 1
+                    if i == n1:
+                        break
+                    left_key = key(buffer[i])
+            # Remaining right elements are already in place
+            if i < n1:
+                arr[k:k + n1 - i] = buffer[i:n1]
+        else:
+            # Buffer the right run and merge from the back
+            buffer[:n2] = arr[m + 1:r + 1]
+            i, j, k = n2 - 1, m, r
+            right_key, left_key = key(buffer[i]), last_left
+            while True:
+                # Taking the left element only when it strictly wins keeps the sort stable
+                if (left_key < right_key) if reverse else (left_key > right_key):
+                    arr[k] = arr[j]
+                    k -= 1
+                    j -= 1
+                    if j < l:
+                        break
+                    left_key = key(arr[j])
+                else:
+                    arr[k] = buffer[i]
+                    k -= 1
+                    i -= 1
+                    if i < 0:
+                        break
+                    right_key = key(buffer[i])
+            # Remaining left elements are already in place
+            if i >= 0:
+                arr[l:l + i + 1] = buffer[:i + 1]
+
+    @staticmethod
+    def merge_keyed(arr, keys, l, m, r, buffer, key_buffer, reverse=False):
+        """
+        Merge arr[l..m] and arr[m+1..r] like merge(), comparing precomputed keys
+        
+        keys is a list parallel to arr holding the key of every element; it is
+        merged along with arr, so no key function is called while merging.
+        buffer and key_buffer are scratch lists of at least half the size.
+        """
+        if m < l or m >= r:
+            return
+        if (keys[m + 1] <= keys[m]) if reverse else (keys[m] <= keys[m + 1]):
+            return
+        
+        n1 = m - l + 1
+        n2 = r - m
+        if n1 <= n2:
+            # Buffer the left run and merge from the front
+            buffer[:n1] = arr[l:m + 1]
+            key_buffer[:n1] = keys[l:m + 1]
+            i, j, k = 0, m + 1, l
+            left_key, right_key = key_buffer[0], keys[j]
+            while True:
+                if (right_key > left_key) if reverse else (right_key < left_key):
+                    arr[k] = arr[j]
+                    keys[k] = right_key
+                    k += 1
+                    j += 1
+                    if j > r:
+                        break
+                    right_key = keys[j]
+                else:
+                    arr[k] = buffer[i]
+                    keys[k] = left_key
+                    k += 1
+                    i += 1
+                    if i == n1:
+                        break
+                    left_key = key_buffer[i]
+            if i < n1:
+                arr[k:k + n1 - i] = buffer[i:n1]
+                keys[k:k + n1 - i] = key_buffer[i:n1]
+        else:
+            # Buffer the right run and merge from the back
+            buffer[:n2] = arr[m + 1:r + 1]
+            key_buffer[:n2] = keys[m + 1:r + 1]
+            i, j, k = n2 - 1, m, r
+            right_key, left_key = key_buffer[i], keys[j]
+            while True:
+                if (left_key < right_key) if reverse else (left_key > right_key):
+                    arr[k] = arr[j]
+                    keys[k] = left_key
+                    k -= 1
+                    j -= 1
+                    if j < l:
+                        break
+                    left_key = keys[j]
+                else:
+                    arr[k] = buffer[i]
+                    keys[k] = right_key
+                    k -= 1
+                    i -= 1
+                    if i < 0:
+                        break
+                    right_key = key_buffer[i]
+            if i >= 0:
+                arr[l:l + i + 1] = buffer[:i + 1]
+                keys[l:l + i + 1] = key_buffer[:i + 1]
+
+    @staticmethod
+    def merge_sort(arr, l, r, key=None, reverse=False):
+        """
+        Recursively sort an array using the merge sort algorithm.
+        
+        Args:
+            arr           : Array to be sorted.
+            l (int)       : Left index (starting position) of the portion to sort.
+            r (int)       : Right index (ending position) of the portion to sort.
+            key           : Key function (default: product_id).
+            reverse (bool): Sort in descending order.
+        
+        Returns:
+            None. Sorts the array in-place.
+        
+        Time Complexity: O(n log n), O(n) for already sorted input
+        Space Complexity: O(n) for the keys and the scratch buffers
+        
+        Algorithm:
+            1. Computes the key of every element once
+            2. Sorts small portions with insertion sort
+            3. Divides array into two halves and recursively sorts each half
+            4. Merges the sorted halves through the scratch buffers
+        """
+        if l >= r:
+            return
+        key = key or _product_id_key
+        keys = [key(item) for item in arr[l:r + 1]]
+        items = arr[l:r + 1]
+        size = (r - l + 1) // 2 + 1
+        MergeSort._merge_sort_keyed(items, keys, 0, r - l, reverse, [None] * size, [None] * size)
+        arr[l:r + 1] = items
+    
+    @staticmethod
+    def _merge_sort_keyed(arr, keys, l, r, reverse, buffer, key_buffer):
+        if r - l < MergeSort.SMALL:
+            Sort._insert_keyed(arr, keys, l, r + 1, l + 1, reverse)
+            return
+        m = l + (r - l) // 2  # Find middle point, avoiding overflow
+        MergeSort._merge_sort_keyed(arr, keys, l, m, reverse, buffer, key_buffer)      # Sort first half
+        MergeSort._merge_sort_keyed(arr, keys, m + 1, r, reverse, buffer, key_buffer)  # Sort second half
+        MergeSort.merge_keyed(arr, keys, l, m, r, buffer, key_buffer, reverse)         # Merge the sorted halves
+
+
+class Sort(ISort):
+    """
+    Concrete implementation of the ISort interface: a stable, key-aware sort engine.
+    
+    Strategies:
+        "natural"  : run-detecting merge sort (default), O(n) on sorted or reversed
+                     data and O(n log n) in general
+        "merge"    : top-down merge sort with one scratch buffer
+        "insertion": binary insertion sort, for small or nearly sorted arrays
+    
+    Keys are given as SortKey specifications, so sort(A, ["category", "-price"])
+    orders by category and then by price descending.
+    """
+    
+    # Runs shorter than this are extended with insertion sort before merging
+    MIN_RUN = 32
+    
+    @staticmethod
+    def insertion_sort_range(A, lo, hi, key=None, reverse=False, start=None):
+        """
+        Sort A[lo:hi] in-place with binary insertion sort, A[lo:start] being sorted already.
+        
+        The insert position is found by binary search and the elements are
+        shifted with one slice assignment.
+        """
+        key = key or _product_id_key
+        if start is None or start <= lo:
+            start = lo + 1
+        if start >= hi:
+            return
+        # Keys are computed once and shifted together with the elements
+        keys = [key(item) for item in A[lo:hi]]
+        Sort._insert_keyed(A, keys, lo, hi, start, reverse, offset=lo)
+    
+    @staticmethod
+    def _insert_keyed(A, keys, lo, hi, start, reverse=False, offset=0):
+        """Binary insertion sort of A[lo:hi] with keys[i - offset] holding the key of A[i]"""
+        for i in range(start, hi):
+            hand_key = keys[i - offset]
+            # Find the position after every element that does not come after Hand (stable)
+            if not reverse:
+                left = bisect_right(keys, hand_key, lo - offset, i - offset) + offset
+            else:
+                left, right = lo, i
+                while left < right:
+                    mid = (left + right) // 2
+                    if keys[mid - offset] < hand_key:
+                        right = mid
+                    else:
+                        left = mid + 1
+            if left < i:
+                Hand = A[i]  # Element to be inserted into sorted portion
+                A[left + 1:i + 1] = A[left:i]
+                A[left] = Hand  # Insert Hand at correct position
+                keys[left - offset + 1:i - offset + 1] = keys[left - offset:i - offset]
+                keys[left - offset] = hand_key
+    
+    @staticmethod
+    def insertion_sort(A, key=None, reverse=False):
+        """
+        Sort an array in-place using insertion sort algorithm.
+        
+        Insertion sort is efficient for small datasets and nearly sorted data.
+        
+        Args:
+            A      : Array of objects to sort.
+            key    : Key function (default: product_id).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        
+        Time Complexity: 
+            - Best case: O(n) when array is already sorted
+            - Average/Worst case: O(n log n) comparisons, O(n²) moves
+        Space Complexity: O(1)
+        """
+        Sort.insertion_sort_range(A, 0, len(A), key, reverse)
+
+    @staticmethod
+    def merge_sort(arr, l, r, key=None, reverse=False):
+        """
+        Sort an array using merge sort (delegates to MergeSort class).
+        
+        Args:
+            arr    : Array to be sorted.
+            l (int): Left index of the portion to sort.
+            r (int): Right index of the portion to sort.
+            key    : Key function (default: product_id).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        """
+        MergeSort.merge_sort(arr, l, r, key, reverse)
+    
+    @staticmethod
+    def natural_merge_sort(A, key=None, reverse=False):
+        """
+        Sort an array in-place with a natural (run-detecting) merge sort.
+        
+        The array is split into the runs that are already in order; strictly
+        descending runs are reversed in place, short runs are extended to
+        MIN_RUN elements with insertion sort, and neighbouring runs of similar
+        size are merged as soon as they are found. Keys are computed once and
+        merged along with the elements through one pair of scratch buffers.
+        
+        Args:
+            A      : Array of objects to sort.
+            key    : Key function (default: product_id).
+            reverse: Sort in descending order if True.
+        
+        Returns:
+            None. Sorts the array in-place.
+        
+        Time Complexity: O(n) for sorted or reversed input, O(n log r) for r runs
+        Space Complexity: O(n) for the keys and the scratch buffers
+        """
+        key = key or _product_id_key
+        n = len(A)
+        if n < 2:
+            return
+        
+        # Every key is computed once and kept in a list parallel to A
+        keys = [key(item) for item in A]
+        
+        buffer = [None] * (n // 2 + 1)
+        key_buffer = [None] * (n // 2 + 1)
+        
+        # 1. Split the array into runs
+        runs = []
+        lo = 0
+        while lo < n:
+            hi = lo + 1
+            if hi < n:
+                if (keys[lo] < keys[hi]) if reverse else (keys[hi] < keys[lo]):
+                    # Strictly against the order: reversing keeps the sort stable
+                    hi += 1
+                    while hi < n and ((keys[hi - 1] < keys[hi]) if reverse else (keys[hi] < keys[hi - 1])):
+                        hi += 1
+                    A[lo:hi] = A[lo:hi][::-1]
+                    keys[lo:hi] = keys[lo:hi][::-1]
+                else:
+                    hi += 1
+                    while hi < n and not ((keys[hi - 1] < keys[hi]) if reverse else (keys[hi] < keys[hi - 1])):
+                        hi += 1
+            # 2. Extend short runs with insertion sort
+            end = min(lo + Sort.MIN_RUN, n)
+            if hi < end:
+                Sort._insert_keyed(A, keys, lo, end, hi, reverse)
+                hi = end
+            runs.append((lo, hi))
+            lo = hi
+            # 3. Merge the newest runs while the older one is not larger, which keeps
+            #    the merges balanced and works on recently touched memory
+            while len(runs) > 1 and runs[-2][1] - runs[-2][0] <= hi - runs[-1][0]:
+                (start, middle), (_, end) = runs[-2], runs.pop()
+                MergeSort.merge_keyed(A, keys, start, middle - 1, end - 1, buffer, key_buffer, reverse)
+                runs[-1] = (start, end)
+        
+        # 4. Merge what is left, newest runs first
+        while len(runs) > 1:
+            (start, middle), (_, end) = runs[-2], runs.pop()
+            MergeSort.merge_keyed(A, keys, start, middle - 1, end - 1, buffer, key_buffer, reverse)
+            runs[-1] = (start, end)
+    
+    STRATEGIES = ("natural", "merge", "insertion")
+
+    @staticmethod 
+    def sort(A, key=None, reverse=False, strategy="natural"):
+        """
+        Stably sort an array in-place by one or more keys.
+        
+        Args:
+            A       : Array of objects to sort.
+            key     : SortKey specification (default: product_id), e.g. "price",
+                      "-price", a key function or ["category", "-price"].
+            reverse : Reverse the whole order if True.
+            strategy: "natural" (default), "merge" or "insertion".
+        
+        Returns:
+            None. Sorts the array in-place.
+        
+        Raises:
+            InventoryException: if the key or the strategy is invalid
+        
+        Time Complexity:
+            - natural: O(n) for sorted/reversed input, O(n log n) otherwise
+            - merge  : O(n log n)
+            - insertion: O(n²) moves
+            Multi-key orders with mixed directions take one pass per direction group.
+        """
+        if strategy not in Sort.STRATEGIES:
+            raise InventoryException(f"Unknown sort strategy: {strategy!r}")
+        
+        # Stable passes from the least to the most significant key group
+        for key_function, descending in reversed(SortKey.parse(key)):
+            descending = descending != bool(reverse)
+            if strategy == "natural":
+                Sort.natural_merge_sort(A, key_function, descending)
+            elif strategy == "merge":
+                if len(A) > 1:
+                    Sort.merge_sort(A, 0, len(A) - 1, key_function, descending)
+            else:
+                Sort.insertion_sort(A, key_function, descending)
+    
+    @staticmethod
+    def external_sort(products, key=None, reverse=False, memory_budget=64 * 1024 * 1024, temp_dir=None):
+        """
+        Sort products that do not fit in memory (see ExternalSort).
+        
+        Args:
+            products     : Iterable of product records (e.g. a generator reading a catalogue).
+            key          : SortKey specification (default: product_id).
+            reverse      : Reverse the whole order if True.
+            memory_budget: Approximate bytes held in memory while sorting.
+            temp_dir     : Directory of the temporary run files.
+        
+        Returns:
+            Iterator yielding the products in order as ProductInfo objects.
+        """
+        return ExternalSort(key, reverse, memory_budget, temp_dir).sort(products)
+
+
+class _DescendingKey:
+    """Wraps a key so that it compares in the opposite order (for mixed-direction merges)"""
+    
+    __slots__ = ("value",)
+    
+    def __init__(self, value) -> None:
+        self.value = value
+    
+    def __lt__(self, other) -> bool:
+        return other.value < self.value
+    
+    def __eq__(self, other) -> bool:
+        return self.value == other.value
+
+
+class ExternalSort:
+    """
+    External merge sort of product records that do not fit in memory
+    
+    Products are read in runs that fit the memory budget; each run is sorted
+    with Sort.sort and spilled to a temporary file in a compact binary format:
+        product_id, quantity, price (i64) | name, category, supplier lengths (u32) | utf-8 strings
+    The runs are then merged with a heap (k-way merge) and streamed back as
+    ProductInfo objects. When there are more runs than the budget has read
+    buffers for, groups of runs are merged into longer runs first (multi-pass).
+    
+    Equal keys keep their input order (the sort is stable).
+    
+    Attributes:
+        runs   : Number of runs spilled by the last sort
+        passes : Number of intermediate merge passes of the last sort
+        spilled: Bytes written to run files by the last sort
+    """
+    
+    _RECORD = struct.Struct("<qqqIII")
+    # Estimated bytes of one ProductInfo in memory, besides its name
+    RECORD_OVERHEAD = 200
+    # Size of the buffered reader/writer of one run file
+    IO_BUFFER = 64 * 1024
+    MIN_BUDGET = 4 * IO_BUFFER
+    
+    def __init__(self, key=None, reverse: bool = False, memory_budget: int = 64 * 1024 * 1024,
+                 temp_dir: str = None, strategy: str = "natural") -> None:
+        """
+        Args:
+            key          : SortKey specification (default: product_id)
+            reverse      : Reverse the whole order if True
+            memory_budget: Approximate bytes of records and buffers held in memory
+            temp_dir     : Directory of the run files (default: the system temp directory)
+            strategy     : Sort strategy of the in-memory runs
+        
+        Raises:
+            InventoryException: if the key, the strategy or the budget is invalid
+        """
+        if not isinstance(memory_budget, int) or memory_budget < self.MIN_BUDGET:
+            raise InventoryException(f"Memory budget must be an integer of at least {self.MIN_BUDGET} bytes")
+        if strategy not in Sort.STRATEGIES:
+            raise InventoryException(f"Unknown sort strategy: {strategy!r}")
+        self.key = key
+        self.reverse = reverse
+        self.memory_budget = memory_budget
+        self.temp_dir = temp_dir
+        self.strategy = strategy
+        self._merge_key = self._build_merge_key(SortKey.parse(key), reverse)
+        self.runs = 0
+        self.passes = 0
+        self.spilled = 0
+    
+    @staticmethod
+    def _build_merge_key(passes: list, reverse: bool):
+        """One key function giving the same order as the passes of SortKey.parse"""
+        parts = [(function, descending != bool(reverse)) for function, descending in passes]
+        if len(parts) == 1 and not parts[0][1]:
+            return parts[0][0]
+        return lambda product: tuple(_DescendingKey(function(product)) if descending else function(product)
+                                     for function, descending in parts)
+    
+    @property
+    def fan_in(self) -> int:
+        """Number of runs merged at once (one read buffer per run fits the budget)"""
+        return max(2, self.memory_budget // self.IO_BUFFER - 1)
+    
+    def sort(self, products):
+        """
+        Sort an iterable of products, yielding them as ProductInfo objects in order
+        
+        The run files are deleted when the iterator is exhausted or closed.
+        """
+        self.runs = self.passes = self.spilled = 0
+        run = []
+        used = 0
+        # Room for the writer buffer while spilling
+        limit = self.memory_budget - self.IO_BUFFER
+        directory = tempfile.mkdtemp(prefix="inventory-sort-", dir=self.temp_dir)
+        paths = []
+        try:
+            for product in products:
+                run.append(product)
+                used += self.RECORD_OVERHEAD + len(product.name)
+                if used >= limit:
+                    paths.append(self._spill(run, directory))
+                    run = []
+                    used = 0
+            
+            if not paths:
+                # Everything fitted in memory: no run files
+                Sort.sort(run, self.key, self.reverse, self.strategy)
+                for product in run:
+                    yield product if isinstance(product, ProductInfo) else self._copy(product)
+                return
+            if run:
+                paths.append(self._spill(run, directory))
+                run = []
+            
+            # Merge groups of runs until one merge can read them all
+            while len(paths) > self.fan_in:
+                self.passes += 1
+                fan_in = self.fan_in
+                paths = [self._write_run(self._merge(paths[i:i + fan_in]), directory)
+                         if len(paths[i:i + fan_in]) > 1 else paths[i]
+                         for i in range(0, len(paths), fan_in)]
+            yield from self._merge(paths)
+        finally:
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+    
+    @staticmethod
+    def _copy(product) -> "ProductInfo":
+        return ProductInfo(product.product_id, product.name, product.category,
+                           product.quantity, product.price, product.supplier)
+    
+    def _spill(self, run: list, directory: str) -> str:
+        """Sort one run in memory and write it to a run file"""
+        Sort.sort(run, self.key, self.reverse, self.strategy)
+        self.runs += 1
+        return self._write_run(run, directory)
+    
+    def _write_run(self, products, directory: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+        pack = self._RECORD.pack
+        # Categories and suppliers repeat, so their encodings are cached
+        encoded = {}
+        with open(fd, "wb", buffering=self.IO_BUFFER) as f:
+            write = f.write
+            for product in products:
+                name = product.name.encode("utf-8")
+                category = encoded.get(product.category)
+                if category is None:
+                    category = encoded[product.category] = product.category.encode("utf-8")
+                supplier = encoded.get(product.supplier)
+                if supplier is None:
+                    supplier = encoded[product.supplier] = product.supplier.encode("utf-8")
+                write(pack(product.product_id, product.quantity, product.price,
+                           len(name), len(category), len(supplier)) + name + category + supplier)
+            self.spilled += f.tell()
+        return path
+    
+    def _read_run(self, path: str, buffer_size: int):
+        """Yield the products of a run file"""
+        record = self._RECORD
+        size = record.size
+        with open(path, "rb", buffering=buffer_size) as f:
+            while True:
+                header = f.read(size)
+                if len(header) < size:
+                    return
+                product_id, quantity, price, name_size, category_size, supplier_size = record.unpack(header)
+                data = f.read(name_size + category_size + supplier_size)
+                yield ProductInfo(product_id, str(data[:name_size], "utf-8"),
+                                  str(data[name_size:name_size + category_size], "utf-8"),
+                                  quantity, price, str(data[name_size + category_size:], "utf-8"))
+    
+    def _merge(self, paths: list):
+        """k-way merge of sorted run files with a heap (ties go to the earlier run)"""
+        merge_key = self._merge_key
+        buffer_size = max(4096, self.memory_budget // (len(paths) + 1))
+        heap = []
+        for index, path in enumerate(paths):
+            reader = self._read_run(path, buffer_size)
+            for product in reader:
+                heap.append((merge_key(product), index, product, reader))
+                break
+        heapify(heap)
+        while heap:
+            _, index, product, reader = heap[0]
+            yield product
+            for following in reader:
+                heapreplace(heap, (merge_key(following), index, following, reader))
+                break
+            else:
+                heappop(heap)
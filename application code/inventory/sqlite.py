@@ -0,0 +1,491 @@
+"""Product repository stored in a SQLite database"""
+
+from contextlib import contextmanager
+import queue
+import sqlite3
+import threading
+
+from .exceptions import BulkOperationException, InvalidOrderDataException, InvalidProductDataException, InventoryException
+from .models import BulkResult, ProductInfo, ProductValidator
+from .orders import OrderLog
+from .repository import IProductRepository
+
+
+class SQLiteProductRepository(IProductRepository):
+    """
+    Products repository stored in a SQLite database (standard library sqlite3)
+    
+    It has the same get/add/update/delete, bulk and reserve_stock methods
+    as ProductRepository, so Order works with it unchanged. Products are
+    returned as ProductInfo copies; changing them does not change the
+    database.
+    
+    Database layout:
+        products: product_id INTEGER PRIMARY KEY (the rowid b-tree), name,
+                  category, quantity, price, supplier, with indexes on
+                  category and supplier for find_by
+        free_ids: ids of deleted products; the lowest one is reused first,
+                  so the id reuse survives a restart like the rest of the data
+    
+    Writes go through one connection, serialized by a lock, in WAL mode so
+    they never block the readers. Reads use a small pool of read-only
+    connections. Every statement is a constant string, so sqlite3 prepares
+    it once per connection and reuses it from its statement cache. The bulk
+    methods run in one transaction each.
+    
+    reserve_stock decrements with a conditional UPDATE (quantity >= ordered),
+    so the check and the decrement are one atomic step, even with other
+    processes writing the same database.
+    
+    An in-memory database (":memory:") only has the writer connection, which
+    the reads share.
+    """
+    
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS products ("
+        " product_id INTEGER PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " category TEXT NOT NULL,"
+        " quantity INTEGER NOT NULL CHECK (quantity >= 0),"
+        " price INTEGER NOT NULL CHECK (price >= 0),"
+        " supplier TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS products_category ON products (category)",
+        "CREATE INDEX IF NOT EXISTS products_supplier ON products (supplier)",
+        "CREATE TABLE IF NOT EXISTS free_ids (product_id INTEGER PRIMARY KEY)",
+    )
+    
+    COLUMNS = "product_id, name, category, quantity, price, supplier"
+    SELECT_PRODUCT = f"SELECT {COLUMNS} FROM products WHERE product_id = ?"
+    SELECT_PAGE = f"SELECT {COLUMNS} FROM products WHERE product_id > ? ORDER BY product_id LIMIT ?"
+    INSERT_PRODUCT = "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?)"
+    UPDATE_PRODUCT = ("UPDATE products SET quantity = coalesce(?, quantity), price = coalesce(?, price),"
+                      " supplier = coalesce(?, supplier) WHERE product_id = ?")
+    DELETE_PRODUCT = "DELETE FROM products WHERE product_id = ?"
+    RESERVE = "UPDATE products SET quantity = quantity - ? WHERE product_id = ? AND quantity >= ?"
+    SELECT_QUANTITY = "SELECT quantity FROM products WHERE product_id = ?"
+    LOWEST_FREE_IDS = "SELECT product_id FROM free_ids ORDER BY product_id LIMIT ?"
+    DELETE_FREE_ID = "DELETE FROM free_ids WHERE product_id = ?"
+    INSERT_FREE_ID = "INSERT INTO free_ids VALUES (?)"
+    NEXT_ID = "SELECT coalesce(max(product_id), 0) + 1 FROM products"
+    
+    # Attributes find_by accepts (category and supplier are indexed)
+    INDEXABLE_ATTRIBUTES = ("name", "category", "quantity", "price", "supplier")
+    # Ids per "IN (...)" lookup, below SQLite's limit on query parameters
+    CHUNK = 500
+    # Products read per query when iterating
+    PAGE = 1024
+    
+    def __init__(self, path: str = ":memory:", readers: int = 4, synchronous: str = "NORMAL",
+                 timeout: float = 5.0) -> None:
+        """
+        Args:
+            path       : Database file (created if missing), or ":memory:"
+            readers    : Number of pooled read-only connections
+            synchronous: SQLite synchronous setting; "NORMAL" is durable except
+                         for the last transactions on a power loss in WAL mode,
+                         "FULL" syncs every commit
+            timeout    : Seconds to wait for a lock held by another process
+        """
+        if not isinstance(readers, int) or readers < 1:
+            raise InventoryException("Number of reader connections must be a positive integer")
+        if synchronous not in ("OFF", "NORMAL", "FULL"):
+            raise InventoryException(f"Unknown synchronous setting: {synchronous!r}")
+        self.path = path
+        self.timeout = timeout
+        # Autocommit mode: single statements commit on their own and the
+        # multi-statement changes use explicit transactions
+        self.connection = self._connect()
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute(f"PRAGMA synchronous = {synchronous}")
+        for statement in self.SCHEMA:
+            self.connection.execute(statement)
+        self.write_lock = threading.Lock()
+        
+        self.readers = None
+        if path != ":memory:":
+            self.readers = queue.SimpleQueue()
+            for _ in range(readers):
+                reader = self._connect()
+                reader.execute("PRAGMA query_only = ON")
+                self.readers.put(reader)
+        # Readers checked out when close() is called are closed when they come back
+        self._pool_lock = threading.Lock()
+        self.closed = False
+        # OrderLog written by Order.place_order (see ProductRepository.enable_order_log)
+        self.order_log = None
+    
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                               check_same_thread=False, cached_statements=64)
+    
+    @contextmanager
+    def _reader(self):
+        """A pooled read connection (the writer connection for ":memory:")"""
+        if self.closed:
+            raise InventoryException("The repository is closed")
+        if self.readers is None:
+            with self.write_lock:
+                yield self.connection
+            return
+        readers = self.readers
+        connection = readers.get()
+        try:
+            yield connection
+        finally:
+            with self._pool_lock:
+                if self.closed:
+                    connection.close()
+                else:
+                    readers.put(connection)
+    
+    @contextmanager
+    def _transaction(self):
+        """The writer connection inside BEGIN IMMEDIATE ... COMMIT (rolled back on errors)"""
+        with self.write_lock:
+            connection = self.connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+    
+    def close(self) -> None:
+        """Close every connection (the readers in use are closed when they are returned)"""
+        with self._pool_lock:
+            self.closed = True
+            if self.readers is not None:
+                while not self.readers.empty():
+                    self.readers.get_nowait().close()
+                self.readers = None
+        self.connection.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @staticmethod
+    def _product(row):
+        return None if row is None else ProductInfo(*row)
+    
+    def _allocate_ids(self, connection, count: int) -> list:
+        """The count lowest free ids, ascending (inside a transaction)"""
+        product_ids = [row[0] for row in connection.execute(self.LOWEST_FREE_IDS, (count,))]
+        if product_ids:
+            connection.executemany(self.DELETE_FREE_ID, [(product_id,) for product_id in product_ids])
+        if len(product_ids) < count:
+            # Every free id was taken, so the rest follow the highest product
+            # or the highest reused id (the last product may have been deleted)
+            next_id = connection.execute(self.NEXT_ID).fetchone()[0]
+            if product_ids:
+                next_id = max(next_id, product_ids[-1] + 1)
+            product_ids.extend(range(next_id, next_id + count - len(product_ids)))
+        return product_ids
+    
+    def _existing(self, connection, product_ids) -> dict:
+        """{product_id: quantity} of the existing products among product_ids"""
+        product_ids = sorted({product_id for product_id in product_ids if isinstance(product_id, int)})
+        found = {}
+        for start in range(0, len(product_ids), self.CHUNK):
+            chunk = product_ids[start:start + self.CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(connection.execute(
+                f"SELECT product_id, quantity FROM products WHERE product_id IN ({placeholders})", chunk))
+        return found
+    
+    def __len__(self) -> int:
+        with self._reader() as connection:
+            return connection.execute("SELECT count(*) FROM products").fetchone()[0]
+    
+    def __iter__(self):
+        """
+        Every product in product_id order
+        
+        The products are read in pages of PAGE ids, taking a connection for
+        each page only, so the loop body may read and write the repository.
+        """
+        last_id = 0
+        while True:
+            with self._reader() as connection:
+                rows = connection.execute(self.SELECT_PAGE, (last_id, self.PAGE)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield ProductInfo(*row)
+            last_id = rows[-1][0]
+    
+    @property
+    def inventory(self) -> list:
+        """Products sorted by product_id (a new list)"""
+        return list(self)
+    
+    @property
+    def deleted_ids(self) -> frozenset:
+        """Ids of deleted products that are waiting to be reused"""
+        with self._reader() as connection:
+            return frozenset(row[0] for row in connection.execute("SELECT product_id FROM free_ids"))
+    
+    def enable_order_log(self, bucket_seconds: int = 60, buckets: int = 60) -> OrderLog:
+        """Keep a history of the placed order lines (see ProductRepository.enable_order_log)"""
+        self.order_log = OrderLog(bucket_seconds, buckets)
+        return self.order_log
+    
+    def find_by(self, attribute: str, value) -> list:
+        """
+        Return the products whose attribute equals value, sorted by product_id
+        
+        Raises:
+            InventoryException: if attribute can not be searched
+        """
+        if attribute not in self.INDEXABLE_ATTRIBUTES:
+            raise InventoryException(f"Can not search by attribute: {attribute!r}")
+        with self._reader() as connection:
+            rows = connection.execute(
+                f"SELECT {self.COLUMNS} FROM products WHERE {attribute} = ? ORDER BY product_id", (value,))
+            return [ProductInfo(*row) for row in rows]
+    
+    def find_by_category(self, category: str) -> list:
+        return self.find_by("category", category)
+    
+    def find_by_supplier(self, supplier: str) -> list:
+        return self.find_by("supplier", supplier)
+    
+    def get_product(self, product_id: int):
+        """
+        Return the product with product_id
+        
+        Args:
+            product_id: Product id (positive integer)
+        
+        Returns:
+            ProductInfo object, or None if the product does not exist
+        """
+        if not isinstance(product_id, int):
+            return None
+        with self._reader() as connection:
+            return self._product(connection.execute(self.SELECT_PRODUCT, (product_id,)).fetchone())
+    
+    def add_product(self, name: str, category: str, quantity: int, price: int, supplier: str) -> str:
+        """
+        Add a new product to the database (the lowest free id is reused first)
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if any parameter is invalid
+            InventoryException         : if the database failed
+        """
+        ProductValidator.validate_new(name, category, quantity, price, supplier)
+        try:
+            with self._transaction() as connection:
+                product_id = self._allocate_ids(connection, 1)[0]
+                connection.execute(self.INSERT_PRODUCT, (product_id, name, category, quantity, price, supplier))
+            return "Product added successfully"
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to add product: {str(e)}")
+    
+    def update_product(self, product_id: int, quantity: int = None, price: int = None, supplier: str = None) -> str:
+        """
+        Update product information in the database
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if any passed parameter is invalid
+            InventoryException         : if the database failed
+        """
+        try:
+            ProductValidator.validate_update(quantity, price, supplier)
+        except InvalidProductDataException:
+            # Like ProductRepository, a missing product is reported before invalid fields
+            if self.get_product(product_id) is None:
+                raise InvalidProductDataException("Product not found.")
+            raise
+        try:
+            with self.write_lock:
+                cursor = self.connection.execute(self.UPDATE_PRODUCT, (quantity, price, supplier, product_id))
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to update product: {str(e)}")
+        if cursor.rowcount == 0:
+            raise InvalidProductDataException("Product not found.")
+        return "Product information updated successfully"
+    
+    def delete_product(self, product_id: int) -> str:
+        """
+        Delete a product from the database
+        
+        Returns:
+            Success message string
+        
+        Raises:
+            InvalidProductDataException: if the product does not exist
+            InventoryException         : if the database failed
+        """
+        try:
+            with self._transaction() as connection:
+                if connection.execute(self.DELETE_PRODUCT, (product_id,)).rowcount == 0:
+                    raise InvalidProductDataException("Product not found.")
+                connection.execute(self.INSERT_FREE_ID, (product_id,))
+            return "Product deleted successfully"
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to delete product: {str(e)}")
+    
+    def add_products(self, rows, atomic: bool = False):
+        """
+        Add many products in one transaction (see ProductRepository.add_products)
+        
+        Returns:
+            BulkResult with the ids of the added products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        valid = []
+        errors = []
+        for row_number, row in enumerate(rows):
+            try:
+                valid.append(ProductValidator.new_product_fields(row))
+            except InvalidProductDataException as e:
+                errors.append((row_number, str(e)))
+        
+        if atomic and errors:
+            raise BulkOperationException(f"{len(errors)} invalid product rows, nothing was added", errors)
+        
+        try:
+            with self._transaction() as connection:
+                product_ids = self._allocate_ids(connection, len(valid))
+                connection.executemany(self.INSERT_PRODUCT, ((product_id,) + fields
+                                                             for product_id, fields in zip(product_ids, valid)))
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to add products: {str(e)}")
+        return BulkResult(product_ids, errors)
+    
+    def update_products(self, rows, atomic: bool = False):
+        """
+        Update many products in one transaction (see ProductRepository.update_products)
+        
+        Returns:
+            BulkResult with the ids of the updated products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any row is invalid
+        """
+        rows = list(rows)
+        try:
+            with self._transaction() as connection:
+                existing = self._existing(connection, (row.get("product_id") for row in rows if isinstance(row, dict)))
+                updates = []
+                errors = []
+                for row_number, row in enumerate(rows):
+                    try:
+                        if not isinstance(row, dict) or not isinstance(row.get("product_id"), int):
+                            raise InvalidProductDataException("Update row must be a dict with an integer product_id")
+                        if row["product_id"] not in existing:
+                            raise InvalidProductDataException("Product not found.")
+                        quantity, price, supplier = row.get("quantity"), row.get("price"), row.get("supplier")
+                        ProductValidator.validate_update(quantity, price, supplier)
+                    except InvalidProductDataException as e:
+                        errors.append((row_number, str(e)))
+                        continue
+                    updates.append((quantity, price, supplier, row["product_id"]))
+                
+                if errors and atomic:
+                    raise BulkOperationException(f"{len(errors)} invalid update rows, nothing was updated", errors)
+                connection.executemany(self.UPDATE_PRODUCT, updates)
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to update products: {str(e)}")
+        return BulkResult([update[3] for update in updates], errors)
+    
+    def delete_products(self, product_ids, atomic: bool = False):
+        """
+        Delete many products in one transaction (see ProductRepository.delete_products)
+        
+        Returns:
+            BulkResult with the ids of the deleted products and the per-row errors
+        
+        Raises:
+            BulkOperationException: if atomic is True and any id is not found
+        """
+        product_ids = list(product_ids)
+        try:
+            with self._transaction() as connection:
+                existing = self._existing(connection, product_ids)
+                doomed = []
+                errors = []
+                for row_number, product_id in enumerate(product_ids):
+                    if isinstance(product_id, int) and product_id in existing:
+                        # A repeated id is only deleted once
+                        del existing[product_id]
+                        doomed.append(product_id)
+                    else:
+                        errors.append((row_number, "Product not found."))
+                
+                if atomic and errors:
+                    raise BulkOperationException(f"{len(errors)} invalid product ids, nothing was deleted", errors)
+                connection.executemany(self.DELETE_PRODUCT, [(product_id,) for product_id in doomed])
+                connection.executemany(self.INSERT_FREE_ID, [(product_id,) for product_id in doomed])
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to delete products: {str(e)}")
+        return BulkResult(doomed, errors)
+    
+    def _reserve(self, connection, product_id, quantity: int, prefix: str = "") -> None:
+        """Conditionally decrement one product, raising why it failed (inside a transaction)"""
+        if connection.execute(self.RESERVE, (quantity, product_id, quantity)).rowcount:
+            return
+        row = connection.execute(self.SELECT_QUANTITY, (product_id,)).fetchone()
+        if row is None:
+            raise InvalidProductDataException(f"{prefix}Product not found.")
+        raise InvalidOrderDataException(f"{prefix}There is no enough quantity of this product to order.\nYou can order up to {row[0]} copies.")
+    
+    def reserve_stock(self, lines: list) -> None:
+        """
+        Take the quantities of (product_id, quantity) lines out of the stock, all or nothing
+        
+        Every product is decremented with one conditional UPDATE; if one of
+        them fails the transaction is rolled back.
+        
+        Raises:
+            InvalidProductDataException: if a product does not exist
+            InvalidOrderDataException  : if a product does not have enough quantity
+        """
+        # Merge repeated products so each one is checked against its total
+        totals = {}
+        for product_id, quantity in lines:
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        try:
+            if len(totals) == 1:
+                # One autocommit statement is already atomic
+                (product_id, quantity), = totals.items()
+                with self.write_lock:
+                    self._reserve(self.connection, product_id, quantity)
+                return
+            with self._transaction() as connection:
+                for product_id in sorted(totals):
+                    self._reserve(connection, product_id, totals[product_id], f"Product {product_id}: ")
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to reserve stock: {str(e)}")
+    
+    def reserve_stock_batch(self, lines: list) -> list:
+        """
+        Take many independent (product_id, quantity) lines out of the stock in one transaction
+        
+        Returns:
+            List with None for every reserved line and the exception of every failed line
+        """
+        results = []
+        try:
+            with self._transaction() as connection:
+                for product_id, quantity in lines:
+                    try:
+                        self._reserve(connection, product_id, quantity)
+                        results.append(None)
+                    except InventoryException as e:
+                        results.append(e)
+        except sqlite3.Error as e:
+            raise InventoryException(f"Failed to reserve stock: {str(e)}")
+        return results
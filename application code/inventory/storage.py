@@ -0,0 +1,538 @@
+"""Containers a repository keeps its products in, and the product id allocator"""
+
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from heapq import heapify, heappop, heappush, merge
+from sys import intern
+
+from .models import ProductInfo, _product_id_key
+
+
+class IdAllocator:
+    """
+    Allocator for product ids that always hands out the lowest free id
+    
+    Deleted ids are kept in a min-heap, so reusing the lowest one does not
+    need a scan over all of them. When there is no deleted id the next
+    fresh id (last id + 1) is used.
+    
+    Time complexity : O(log k) for acquire/release (k = number of deleted ids)
+    Space complexity: O(k)
+    """
+    
+    def __init__(self) -> None:
+        self._free = []
+        self._next_id = 1
+    
+    def acquire(self) -> int:
+        """Return the lowest deleted id, or the next fresh id if none was deleted"""
+        if self._free:
+            return heappop(self._free)
+        product_id = self._next_id
+        self._next_id += 1
+        return product_id
+    
+    def acquire_many(self, count: int) -> list:
+        """Return count ids in ascending order, the lowest deleted ids first"""
+        free = self._free
+        ids = [heappop(free) for _ in range(min(count, len(free)))]
+        missing = count - len(ids)
+        if missing > 0:
+            ids.extend(range(self._next_id, self._next_id + missing))
+            self._next_id += missing
+        return ids
+    
+    def release(self, product_id: int) -> None:
+        """Mark product_id as free so it can be handed out again"""
+        heappush(self._free, product_id)
+    
+    def release_many(self, product_ids: list) -> None:
+        """Mark many ids as free at once"""
+        if len(product_ids) > len(self._free):
+            # Rebuilding the heap is O(n), cheaper than many pushes
+            self._free.extend(product_ids)
+            heapify(self._free)
+        else:
+            for product_id in product_ids:
+                heappush(self._free, product_id)
+    
+    def restore(self, next_id: int, live_ids) -> None:
+        """Rebuild the allocator state: every id below next_id that is not live is free"""
+        live = set(live_ids)
+        self._next_id = next_id
+        self._free = [product_id for product_id in range(1, next_id) if product_id not in live]
+        heapify(self._free)
+    
+    @property
+    def next_id(self) -> int:
+        """The next fresh id (one more than the biggest id ever handed out)"""
+        return self._next_id
+    
+    def is_reused(self) -> bool:
+        """Return True if the next acquire() will reuse a deleted id"""
+        return bool(self._free)
+    
+    def free_ids(self) -> frozenset:
+        """Return the currently free (deleted) ids"""
+        return frozenset(self._free)
+    
+    def __len__(self) -> int:
+        return len(self._free)
+
+
+class IProductStorage(ABC):
+    """
+    Abstract base class defining the container ProductRepository keeps its products in.
+    
+    Implementations must iterate over the products in ascending product_id order.
+    
+    metrics is the InventoryMetrics of the repository (None when disabled);
+    implementations count the slow paths they take into it.
+    """
+    
+    metrics = None
+    
+    @abstractmethod
+    def get(self, product_id: int):
+        """Return the product with product_id, or None if it does not exist"""
+        pass
+    
+    @abstractmethod
+    def insert(self, product) -> None:
+        """Store a product whose product_id is not in the storage yet"""
+        pass
+    
+    @abstractmethod
+    def remove(self, product_id: int):
+        """Remove and return the product with product_id, or None if it does not exist"""
+        pass
+    
+    def get_many(self, product_ids: list) -> list:
+        """Return the products for ascending product_ids (None for missing ids)"""
+        get = self.get
+        return [get(product_id) for product_id in product_ids]
+    
+    def insert_many(self, products: list) -> None:
+        """Store many new products given in ascending product_id order"""
+        for product in products:
+            self.insert(product)
+    
+    def remove_many(self, product_ids: list) -> list:
+        """Remove many existing products, returning them in the order of product_ids"""
+        remove = self.remove
+        return [remove(product_id) for product_id in product_ids]
+    
+    @abstractmethod
+    def as_list(self) -> list:
+        """Return the products as a list sorted by product_id"""
+        pass
+    
+    @abstractmethod
+    def __iter__(self):
+        pass
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class ListProductStorage(IProductStorage):
+    """
+    Storage keeping the products in one list sorted by product_id
+    
+    Time complexity:
+        get   : O(log n) (binary search)
+        insert: O(1) amortized for a new biggest id, O(log n) + one shift otherwise
+        remove: O(log n) + one shift
+    """
+    
+    def __init__(self) -> None:
+        self.items = []
+    
+    def get(self, product_id: int):
+        if self.metrics is None:
+            idx = BinarySearch.id_search(self.items, product_id)
+        else:
+            idx = self._measured_search(product_id)
+        return None if idx is None else self.items[idx]
+    
+    def _measured_search(self, product_id: int) -> int:
+        idx, depth = BinarySearch.id_search_depth(self.items, product_id)
+        self.metrics.observe_value("id_search_depth", depth)
+        return idx
+    
+    def insert(self, product) -> None:
+        items = self.items
+        if not items or items[-1].product_id < product.product_id:
+            # The biggest id so far, appending keeps the order
+            items.append(product)
+        else:
+            # The id belongs somewhere inside the list
+            items.insert(BinarySearch.insert_position(items, product.product_id), product)
+            if self.metrics is not None:
+                self.metrics.flag("list_insert_shift")
+    
+    def get_many(self, product_ids: list) -> list:
+        items = self.items
+        n = len(items)
+        if len(product_ids) * n.bit_length() > n:
+            # So many ids that one linear pass is cheaper than k searches
+            if self.metrics is not None:
+                self.metrics.flag("list_linear_scan")
+            wanted = set(product_ids)
+            found = {p.product_id: p for p in items if p.product_id in wanted}
+            return [found.get(product_id) for product_id in product_ids]
+        
+        # One forward pass: each search starts where the previous one ended
+        result = []
+        lo = 0
+        for product_id in product_ids:
+            lo = bisect_left(items, product_id, lo, n, key=_product_id_key)
+            if lo < n and items[lo].product_id == product_id:
+                result.append(items[lo])
+            else:
+                result.append(None)
+        return result
+    
+    def remove(self, product_id: int):
+        if self.metrics is None:
+            idx = BinarySearch.id_search(self.items, product_id)
+        else:
+            idx = self._measured_search(product_id)
+        if idx is None:
+            return None
+        product = self.items[idx]
+        del self.items[idx]
+        return product
+    
+    def insert_many(self, products: list) -> None:
+        items = self.items
+        if not products:
+            return
+        if not items or items[-1].product_id < products[0].product_id:
+            # The whole run goes after the current products
+            items.extend(products)
+        elif len(products) * len(items).bit_length() < len(items):
+            # Few products (reused ids), inserting them one by one is cheaper
+            # than a full merge
+            for product in products:
+                self.insert(product)
+        else:
+            # One linear merge of the two sorted runs, done in place so
+            # references to the live list stay valid
+            items[:] = merge(items, products, key=_product_id_key)
+            if self.metrics is not None:
+                self.metrics.flag("list_full_merge")
+    
+    def remove_many(self, product_ids: list) -> list:
+        items = self.items
+        if len(product_ids) * len(items).bit_length() < len(items):
+            # Few ids, removing them one by one is cheaper than a full sweep
+            return super().remove_many(product_ids)
+        
+        # Compact the list in one sweep
+        if self.metrics is not None:
+            self.metrics.flag("list_full_sweep")
+        doomed = set(product_ids)
+        removed = {}
+        kept = []
+        for product in items:
+            if product.product_id in doomed:
+                removed[product.product_id] = product
+            else:
+                kept.append(product)
+        items[:] = kept
+        return [removed.get(product_id) for product_id in product_ids]
+    
+    def as_list(self) -> list:
+        # The live list is returned, so old code using repo.inventory keeps working
+        return self.items
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class IndexedProductStorage(IProductStorage):
+    """
+    Storage keeping the products in a dict keyed by product_id
+    
+    An ordered list of ids is kept beside the dict for in-order iteration.
+    Deleting a product only leaves its id behind as a tombstone, so no list
+    is shifted. A reused id finds its tombstone still in the right place, and
+    the tombstones are swept once they outnumber the live products.
+    
+    Time complexity:
+        get   : O(1)
+        insert: O(1) amortized (a new biggest id or a reused id)
+        remove: O(1) amortized
+        iterate: O(n), plus a sort if an id was inserted out of order
+    """
+    
+    def __init__(self) -> None:
+        self._products = {}
+        self._keys = []
+        self._tombstones = set()
+        self._sorted = True
+    
+    def get(self, product_id: int):
+        return self._products.get(product_id)
+    
+    def insert(self, product) -> None:
+        product_id = product.product_id
+        self._products[product_id] = product
+        
+        if product_id in self._tombstones:
+            # The id is still in _keys at its sorted position
+            self._tombstones.discard(product_id)
+        else:
+            keys = self._keys
+            if keys and keys[-1] > product_id:
+                self._sorted = False
+            keys.append(product_id)
+    
+    def remove(self, product_id: int):
+        product = self._products.pop(product_id, None)
+        if product is not None:
+            self._tombstones.add(product_id)
+            if len(self._tombstones) > len(self._products) + 64:
+                self._compact()
+        return product
+    
+    def _compact(self) -> None:
+        """Drop the tombstones and restore the order of the id list"""
+        products = self._products
+        self._keys = [k for k in self._keys if k in products]
+        self._tombstones.clear()
+        if self.metrics is not None:
+            self.metrics.flag("indexed_compaction")
+        if not self._sorted:
+            self._keys.sort()
+            self._sorted = True
+            if self.metrics is not None:
+                self.metrics.flag("indexed_full_resort")
+    
+    def as_list(self) -> list:
+        return list(self)
+    
+    def __iter__(self):
+        if not self._sorted:
+            self._compact()
+        products = self._products
+        for product_id in self._keys:
+            product = products.get(product_id)
+            if product is not None:
+                yield product
+    
+    def __len__(self) -> int:
+        return len(self._products)
+
+
+class ColumnarProductStorage(IProductStorage):
+    """
+    Struct-of-arrays storage keeping every product field in its own column
+    
+    Quantity and price live in typed arrays, category and supplier are
+    dictionary-encoded into small integer codes, and the row of a product is
+    product_id - 1 (ids stay dense because deleted ids are reused first).
+    get() and iteration hand out ProductRow views reading these columns, so
+    no ProductInfo object is kept per product.
+    
+    Time complexity:
+        get, insert, remove: O(1) amortized
+        iterate            : O(number of rows)
+    """
+    
+    def __init__(self) -> None:
+        self._live = bytearray()
+        self._names = []
+        self._category_codes = array("I")
+        self._supplier_codes = array("I")
+        self._quantities = array("q")
+        self._prices = array("q")
+        # Dictionary encoding of the repeated strings
+        self._values = []
+        self._codes = {}
+        self._count = 0
+    
+    def encode(self, value: str) -> int:
+        """Return the code of a category/supplier value, adding it if it is new"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._codes[value] = code
+            self._values.append(intern(value))
+        return code
+    
+    def decode(self, code: int) -> str:
+        """Return the category/supplier value of a code"""
+        return self._values[code]
+    
+    def _has_row(self, product_id: int) -> bool:
+        return 0 < product_id <= len(self._live) and self._live[product_id - 1] == 1
+    
+    def get(self, product_id: int):
+        if not isinstance(product_id, int) or not self._has_row(product_id):
+            return None
+        return ProductRow(self, product_id)
+    
+    def insert(self, product) -> None:
+        row = product.product_id - 1
+        # Grow every column up to the row of the product
+        missing = row + 1 - len(self._live)
+        if missing > 0:
+            self._live.extend(bytes(missing))
+            self._names.extend([None] * missing)
+            self._category_codes.extend([0] * missing)
+            self._supplier_codes.extend([0] * missing)
+            self._quantities.extend([0] * missing)
+            self._prices.extend([0] * missing)
+        
+        self._names[row] = product.name
+        self._category_codes[row] = self.encode(product.category)
+        self._supplier_codes[row] = self.encode(product.supplier)
+        self._quantities[row] = product.quantity
+        self._prices[row] = product.price
+        self._live[row] = 1
+        self._count += 1
+    
+    def remove(self, product_id: int):
+        if not isinstance(product_id, int) or not self._has_row(product_id):
+            return None
+        # Return a detached copy, the row is going to be reused
+        product = ProductRow(self, product_id).to_product()
+        row = product_id - 1
+        self._live[row] = 0
+        self._names[row] = None
+        self._count -= 1
+        return product
+    
+    def as_list(self) -> list:
+        return list(self)
+    
+    def __iter__(self):
+        live = self._live
+        for row in range(len(live)):
+            if live[row]:
+                yield ProductRow(self, row + 1)
+    
+    def __len__(self) -> int:
+        return self._count
+
+
+class ProductRow:
+    """
+    Lightweight view of one product stored in a ColumnarProductStorage
+    
+    It has the same attributes as ProductInfo (product_id, name, category,
+    quantity, price, supplier), reading and writing the storage columns.
+    """
+    
+    __slots__ = ("_storage", "product_id")
+    
+    def __init__(self, storage: ColumnarProductStorage, product_id: int) -> None:
+        self._storage = storage
+        self.product_id = product_id
+    
+    @property
+    def name(self) -> str:
+        return self._storage._names[self.product_id - 1]
+    
+    @name.setter
+    def name(self, value: str) -> None:
+        self._storage._names[self.product_id - 1] = value
+    
+    @property
+    def category(self) -> str:
+        storage = self._storage
+        return storage._values[storage._category_codes[self.product_id - 1]]
+    
+    @category.setter
+    def category(self, value: str) -> None:
+        self._storage._category_codes[self.product_id - 1] = self._storage.encode(value)
+    
+    @property
+    def supplier(self) -> str:
+        storage = self._storage
+        return storage._values[storage._supplier_codes[self.product_id - 1]]
+    
+    @supplier.setter
+    def supplier(self, value: str) -> None:
+        self._storage._supplier_codes[self.product_id - 1] = self._storage.encode(value)
+    
+    @property
+    def quantity(self) -> int:
+        return self._storage._quantities[self.product_id - 1]
+    
+    @quantity.setter
+    def quantity(self, value: int) -> None:
+        self._storage._quantities[self.product_id - 1] = value
+    
+    @property
+    def price(self) -> int:
+        return self._storage._prices[self.product_id - 1]
+    
+    @price.setter
+    def price(self, value: int) -> None:
+        self._storage._prices[self.product_id - 1] = value
+    
+    def to_product(self):
+        """Return a detached ProductInfo copy of the row"""
+        return ProductInfo(self.product_id, self.name, self.category, self.quantity, self.price, self.supplier)
+
+
+class BinarySearch:
+    """
+        Fast searching algorithm
+        
+        Time complexity : O(log n)
+        Space complexity: O(n) due to recusrsion
+    """
+    
+    @staticmethod
+    def id_search(obj: list, val: int, l: int = 0, r: int = None) -> int:
+        """A method to search for product_id in O(log n) time instead of O(n)"""
+        if r is None:
+            r = len(obj) - 1
+        if l > r:
+            return None
+        
+        mid = (l + r) // 2
+        mid_id = obj[mid].product_id
+            
+        if mid_id == val:
+            return mid
+        if mid_id < val:
+            return BinarySearch.id_search(obj, val, mid+1, r)
+        if mid_id > val:
+            return BinarySearch.id_search(obj, val, l, mid-1)
+    
+    @staticmethod
+    def id_search_depth(obj: list, val: int) -> tuple:
+        """
+        Same search as id_search, also returning its recursion depth
+        
+        Returns:
+            (index or None, depth), depth being the number of id_search calls
+        """
+        l, r = 0, len(obj) - 1
+        depth = 1
+        while l <= r:
+            mid = (l + r) // 2
+            mid_id = obj[mid].product_id
+            if mid_id == val:
+                return mid, depth
+            if mid_id < val:
+                l = mid + 1
+            else:
+                r = mid - 1
+            depth += 1
+        return None, depth
+    
+    @staticmethod
+    def insert_position(obj: list, val: int) -> int:
+        """Return the index where product_id val has to be inserted to keep obj sorted"""
+        return bisect_left(obj, val, key=_product_id_key)
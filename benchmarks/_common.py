@@ -0,0 +1,57 @@
+"""Shared helpers for the benchmark scripts"""
+
+import os
+import sys
+import time
+
+
+# Make the application code importable from the benchmark scripts
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "application code")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+def parse_sizes(text: str) -> list:
+    """Parse a comma separated list of sizes like "10k,100k,1M" """
+    sizes = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        factor = 1
+        if part[-1] == "k":
+            factor, part = 1_000, part[:-1]
+        elif part[-1] == "m":
+            factor, part = 1_000_000, part[:-1]
+        sizes.append(int(float(part) * factor))
+    return sizes
+
+
+def fill_repository(repo, n: int) -> None:
+    """Add n products to repo through the public add_product path"""
+    categories = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+    suppliers = ("Supplier A", "Supplier B", "Supplier C", "Supplier D")
+    for i in range(n):
+        repo.add_product(f"Product {i}", categories[i % 5], i % 100, 10 + i % 990, suppliers[i % 4])
+
+
+class Timer:
+    """Context manager measuring wall-clock time with perf_counter"""
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+
+def report(title: str, rows: list, headers: list) -> None:
+    """Print rows as an aligned plain-text table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print(title)
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
+    print()
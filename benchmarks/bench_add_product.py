@@ -0,0 +1,51 @@
+"""
+Benchmark for ProductRepository.add_product under delete/re-add churn
+
+Every round deletes a random product and adds a new one, so each add
+goes through the id-reuse path (lowest free id + ordered insert).
+
+Usage:
+    python benchmarks/bench_add_product.py --sizes 10k,100k,1M --ops 20000
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import ProductRepository
+
+
+def run(size: int, ops: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    repo = ProductRepository()
+    fill_repository(repo, size)
+    
+    # Pre-draw the ids to delete so the timed loop only measures the repository
+    victims = [rng.randint(1, size) for _ in range(ops)]
+    
+    add_time = 0.0
+    for product_id in victims:
+        repo.delete_product(product_id)
+        with Timer() as t:
+            repo.add_product("Churn", "Electronics", 5, 100, "Supplier A")
+        add_time += t.elapsed
+    
+    assert len(repo.inventory) == size
+    return size, ops, f"{add_time:.3f}", f"{ops / add_time:,.0f}", f"{add_time / ops * 1e6:.2f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k,1M", help="inventory sizes (default: 10k,100k,1M)")
+    parser.add_argument("--ops", type=int, default=20000, help="delete/add rounds per size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows = [run(size, args.ops, args.seed) for size in parse_sizes(args.sizes)]
+    report("add_product with id reuse (mixed delete/add load)", rows,
+           ["products", "adds", "seconds", "adds/sec", "us/add"])
+
+
+if __name__ == "__main__":
+    main()
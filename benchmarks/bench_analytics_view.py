@@ -0,0 +1,135 @@
+"""
+Benchmark for the NumPy columnar analytics view
+
+Compares the reports of ColumnarAnalyticsView with the equivalent Python
+loops over the ProductInfo objects (and checks they give the same result):
+    total stock value            sum of quantity * price
+    stock value by category      group by category
+    products by supplier, cheap  group by supplier with a price filter
+    count category + price range filtered count
+    price histogram / median     price distribution
+and measures building the view and its cost per update_product.
+
+NumPy is optional for the application but needed here.
+
+Usage:
+    python benchmarks/bench_analytics_view.py --sizes 100k,1M
+"""
+
+import argparse
+import random
+import statistics
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import ProductRepository, analytics
+
+
+def loop_total(products) -> int:
+    return sum(p.quantity * p.price for p in products)
+
+
+def loop_by_category(products) -> dict:
+    totals = {}
+    for p in products:
+        totals[p.category] = totals.get(p.category, 0) + p.quantity * p.price
+    return totals
+
+
+def loop_cheap_by_supplier(products) -> dict:
+    totals = {}
+    for p in products:
+        if p.price <= 100:
+            totals[p.supplier] = totals.get(p.supplier, 0) + 1
+    return totals
+
+
+def loop_count(products) -> int:
+    return sum(1 for p in products if p.category == "Toys" and 200 <= p.price <= 500)
+
+
+def loop_histogram(products) -> list:
+    prices = [p.price for p in products]
+    low, high = min(prices), max(prices)
+    width = (high - low) / 10
+    counts = [0] * 10
+    for price in prices:
+        counts[min(int((price - low) / width), 9)] += 1
+    return counts
+
+
+def loop_median(products) -> float:
+    return float(statistics.median(p.price for p in products))
+
+
+def timed(function, repeat: int) -> tuple:
+    best = None
+    for _ in range(repeat):
+        with Timer() as t:
+            result = function()
+        best = t.elapsed if best is None else min(best, t.elapsed)
+    return result, best
+
+
+def run(size: int, storage: str, repeat: int, updates: int, seed: int) -> tuple:
+    repo = ProductRepository(storage=storage)
+    fill_repository(repo, size)
+    products = repo.storage
+    with Timer() as build:
+        view = repo.create_analytics_view()
+
+    reports = [
+        ("total stock value", lambda: loop_total(products), view.total),
+        ("stock value by category", lambda: loop_by_category(products), lambda: view.group_by("category")),
+        ("products by supplier, price <= 100", lambda: loop_cheap_by_supplier(products),
+         lambda: view.group_by("supplier", "products", price=(None, 100))),
+        ("count Toys, price 200..500", lambda: loop_count(products),
+         lambda: view.count(category="Toys", price=(200, 500))),
+        ("price histogram (10 bins)", lambda: loop_histogram(products), lambda: view.price_histogram(10)[0]),
+        ("median price", lambda: loop_median(products), lambda: view.price_percentiles((50,))[50]),
+    ]
+    rows = []
+    for name, loop, vectorised in reports:
+        expected, loop_time = timed(loop, 1)
+        result, view_time = timed(vectorised, repeat)
+        assert result == expected, name
+        rows.append((size, storage, name, f"{loop_time * 1e3:.2f}", f"{view_time * 1e3:.2f}",
+                     f"{loop_time / view_time:,.0f}x"))
+
+    rng = random.Random(seed)
+    ids = [rng.randint(1, size) for _ in range(updates)]
+    with Timer() as with_view:
+        for product_id in ids:
+            repo.update_product(product_id, quantity=7, price=300)
+    repo.drop_analytics_view()
+    with Timer() as without_view:
+        for product_id in ids:
+            repo.update_product(product_id, quantity=8, price=301)
+    overhead = (size, storage, f"{build.elapsed:.2f}", f"{without_view.elapsed / updates * 1e6:.2f}",
+                f"{with_view.elapsed / updates * 1e6:.2f}")
+    return rows, overhead
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M", help="inventory sizes (default: 100k,1M)")
+    parser.add_argument("--storages", default="list")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per vectorised report, the best is kept")
+    parser.add_argument("--updates", type=int, default=50000, help="update_product calls per measurement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if analytics.np is None:
+        raise SystemExit("This benchmark needs NumPy (pip install numpy)")
+
+    rows, overhead = [], []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            r, o = run(size, storage, args.repeat, args.updates, args.seed)
+            rows.extend(r)
+            overhead.append(o)
+    report("Reports (ms)", rows, ["products", "storage", "report", "object loop", "view", "speedup"])
+    report("View cost", overhead, ["products", "storage", "build (s)", "update (us)", "update with view (us)"])
+
+
+if __name__ == "__main__":
+    main()
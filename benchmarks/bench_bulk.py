@@ -0,0 +1,80 @@
+"""
+Benchmark comparing the bulk repository methods with looped single calls
+
+Each size starts from an inventory with every other id deleted, so looped
+add_product calls go through the id-reuse path like a real catalogue load.
+
+Usage:
+    python benchmarks/bench_bulk.py --size 100k --rows 100k
+"""
+
+import argparse
+import random
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ProductRepository
+
+
+def prepared_repository(storage: str, size: int):
+    repo = ProductRepository(storage=storage)
+    repo.add_products([(f"Product {i}", "Electronics", 10, 100, "Supplier A") for i in range(size)])
+    # Free every other id so new products reuse ids inside the inventory
+    repo.delete_products(range(1, size + 1, 2))
+    return repo
+
+
+def run(storage: str, size: int, rows: int, seed: int) -> list:
+    rng = random.Random(seed)
+    new_rows = [(f"New {i}", "Grocery", i % 50, 20 + i % 80, "Supplier B") for i in range(rows)]
+    results = []
+    
+    for mode in ("loop", "bulk"):
+        repo = prepared_repository(storage, size)
+        with Timer() as add:
+            if mode == "loop":
+                for row in new_rows:
+                    repo.add_product(*row)
+            else:
+                repo.add_products(new_rows)
+        
+        ids = [p.product_id for p in repo.storage]
+        updates = [{"product_id": rng.choice(ids), "price": rng.randint(1, 1000)} for _ in range(rows)]
+        with Timer() as update:
+            if mode == "loop":
+                for row in updates:
+                    repo.update_product(row["product_id"], price=row["price"])
+            else:
+                repo.update_products(updates)
+        
+        doomed = rng.sample(ids, min(rows, len(ids)))
+        with Timer() as delete:
+            if mode == "loop":
+                for product_id in doomed:
+                    repo.delete_product(product_id)
+            else:
+                repo.delete_products(doomed)
+        
+        results.append((storage, size, rows, mode, f"{add.elapsed:.3f}", f"{update.elapsed:.3f}", f"{delete.elapsed:.3f}"))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="products in the inventory before the load")
+    parser.add_argument("--rows", default="100k", help="rows per bulk call")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    size = parse_sizes(args.size)[0]
+    rows = parse_sizes(args.rows)[0]
+    results = []
+    for storage in args.storages.split(","):
+        results.extend(run(storage, size, rows, args.seed))
+    report("Bulk vs looped repository calls (seconds)", results,
+           ["storage", "products", "rows", "mode", "add", "update", "delete"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Throughput benchmark for the streaming catalogue importer/exporter
+
+Writes a synthetic catalogue file of the requested size (about 1% of the
+rows are invalid), then measures:
+    - validate-only import (dry run) over the whole file
+    - full import into a repository (first --import-size bytes of data)
+    - export of the imported repository
+
+The import keeps the repository in memory, so on small machines keep
+--import-size well below the RAM (the "columnar" storage is the smallest).
+
+Usage:
+    python benchmarks/bench_catalogue_io.py --size 2G --import-size 256M --formats csv,jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from _common import Timer, report
+
+from inventory import CatalogueExporter, CatalogueImporter, ProductRepository
+
+
+CATEGORIES = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+SUPPLIERS = ("Supplier A", "Supplier B", "Supplier C", "Supplier D")
+
+
+def parse_bytes(text: str) -> int:
+    text = text.strip().upper()
+    factor = {"K": 2**10, "M": 2**20, "G": 2**30}.get(text[-1], 1)
+    return int(float(text.rstrip("KMG")) * factor)
+
+
+def write_synthetic(path: str, fmt: str, size: int, seed: int) -> int:
+    """Write rows until the file reaches size bytes, return the number of rows"""
+    rng = random.Random(seed)
+    rows = 0
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            header = "product_id,name,category,quantity,price,supplier\n"
+            f.write(header)
+            written += len(header)
+        lines = []
+        while written < size:
+            rows += 1
+            quantity = rng.randint(0, 500) if rng.random() > 0.01 else -1
+            name, category, supplier = f"Product {rows}", rng.choice(CATEGORIES), rng.choice(SUPPLIERS)
+            price = rng.randint(1, 5000)
+            if fmt == "csv":
+                line = f"{rows},{name},{category},{quantity},{price},{supplier}\n"
+            else:
+                line = json.dumps({"product_id": rows, "name": name, "category": category,
+                                   "quantity": quantity, "price": price, "supplier": supplier}) + "\n"
+            lines.append(line)
+            written += len(line)
+            if len(lines) >= 10000:
+                f.write("".join(lines))
+                lines = []
+        f.write("".join(lines))
+    return rows
+
+
+def run(fmt: str, size: int, import_size: int, storage: str, chunk: int, seed: int, directory: str) -> list:
+    rows = []
+    path = os.path.join(directory, f"catalogue.{fmt}")
+    with Timer() as t:
+        write_synthetic(path, fmt, size, seed)
+    file_mb = os.path.getsize(path) / 2**20
+    
+    with Timer() as t:
+        result = CatalogueImporter(None, chunk_size=chunk, dry_run=True).import_file(path)
+    rows.append((fmt, "validate only", f"{file_mb:,.0f}", result.rows, result.rejected,
+                 f"{t.elapsed:.1f}", f"{file_mb / t.elapsed:.1f}", f"{result.rows / t.elapsed:,.0f}"))
+    
+    path = os.path.join(directory, f"import.{fmt}")
+    write_synthetic(path, fmt, import_size, seed)
+    file_mb = os.path.getsize(path) / 2**20
+    repo = ProductRepository(storage=storage)
+    rejects = os.path.join(directory, "rejects.jsonl")
+    with Timer() as t:
+        result = CatalogueImporter(repo, chunk_size=chunk, rejects_path=rejects).import_file(path)
+    rows.append((fmt, f"import ({storage})", f"{file_mb:,.0f}", result.rows, result.rejected,
+                 f"{t.elapsed:.1f}", f"{file_mb / t.elapsed:.1f}", f"{result.rows / t.elapsed:,.0f}"))
+    
+    out = os.path.join(directory, f"export.{fmt}")
+    with Timer() as t:
+        count = CatalogueExporter(repo).export_file(out)
+    out_mb = os.path.getsize(out) / 2**20
+    rows.append((fmt, "export", f"{out_mb:,.0f}", count, 0,
+                 f"{t.elapsed:.1f}", f"{out_mb / t.elapsed:.1f}", f"{count / t.elapsed:,.0f}"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="2G", help="size of the validate-only file (default 2G)")
+    parser.add_argument("--import-size", default="256M", help="size of the file imported into a repository")
+    parser.add_argument("--formats", default="csv,jsonl")
+    parser.add_argument("--storage", default="columnar")
+    parser.add_argument("--chunk", type=int, default=10000)
+    parser.add_argument("--dir", default=None, help="directory for the temporary files")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="catalogue-bench-", dir=args.dir)
+    try:
+        rows = []
+        for fmt in args.formats.split(","):
+            rows.extend(run(fmt, parse_bytes(args.size), parse_bytes(args.import_size), args.storage,
+                            args.chunk, args.seed, directory))
+    finally:
+        shutil.rmtree(directory)
+    report("Streaming catalogue I/O", rows, ["format", "mode", "MiB", "rows", "rejected", "seconds", "MiB/s", "rows/s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark for the write-path cost of the change stream (ChangeStream)
+
+Runs the same mix of writes (orders, updates, adds and deletes) against a
+repository without a change stream and with one that has 0, 1 and 10
+subscribers. The subscribers are drained in batches by a consumer thread
+while the writes run, as a downstream cache or replica would be, and must
+each receive every event in sequence order. Reported per configuration:
+    us/write   mean time of one write (fastest of --repeat runs), and the
+               overhead over no stream
+    max lag    most events a subscriber was behind when it polled
+    blocked    times a writer waited for a blocking subscriber (backpressure)
+
+Usage:
+    python benchmarks/bench_change_stream.py --products 100k --writes 200k
+"""
+
+import argparse
+import random
+import threading
+
+from _common import Timer, parse_sizes, report
+
+from inventory import InventoryException, Order, ProductRepository
+
+
+def make_writes(count: int, products: int, seed: int) -> list:
+    """60% single-line orders, 25% price updates, 10% adds, 5% deletes"""
+    rng = random.Random(seed)
+    writes = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            writes.append(("order", rng.randint(1, products), rng.randint(1, 3)))
+        elif kind < 0.85:
+            writes.append(("update", rng.randint(1, products), rng.randint(10, 999)))
+        elif kind < 0.95:
+            writes.append(("add", None, None))
+        else:
+            writes.append(("delete", rng.randint(1, products), None))
+    return writes
+
+
+def apply_writes(repo, writes: list) -> None:
+    for order_id, (kind, product_id, value) in enumerate(writes, 1):
+        try:
+            if kind == "order":
+                Order(order_id, []).place_order(product_id, value, repo)
+            elif kind == "update":
+                repo.update_product(product_id, price=value)
+            elif kind == "add":
+                repo.add_product("New product", "Toys", 10**6, 20, "Supplier A")
+            else:
+                repo.delete_product(product_id)
+        except InventoryException:
+            # Deleted product: still a write attempt, in every configuration
+            pass
+
+
+class Consumer(threading.Thread):
+    """Drains subscriptions in batches and checks the sequence numbers"""
+
+    def __init__(self, subscriptions: list) -> None:
+        super().__init__()
+        self.subscriptions = subscriptions
+        self.stop = threading.Event()
+        self.max_lag = 0
+        self.received = {s.name: 0 for s in subscriptions}
+        self.last = {s.name: s.position for s in subscriptions}
+
+    def run(self) -> None:
+        while True:
+            empty = True
+            for subscription in self.subscriptions:
+                self.max_lag = max(self.max_lag, subscription.lag)
+                batch = subscription.poll()
+                if batch:
+                    empty = False
+                    assert batch[0][0] == self.last[subscription.name] + 1, "events skipped"
+                    assert batch[-1][0] - batch[0][0] == len(batch) - 1, "events out of order"
+                    self.last[subscription.name] = batch[-1][0]
+                    self.received[subscription.name] += len(batch)
+            if empty:
+                if self.stop.is_set():
+                    return
+                self.stop.wait(0.005)
+
+
+def run(args, writes: list, subscribers: int, stream: bool, block: bool = False) -> tuple:
+    repo = ProductRepository()
+    # Enough stock for every order, so the orders all change a product
+    repo.add_products([(f"Product {i}", "Electronics", 10**6, 10 + i % 990, "Supplier A") for i in range(args.products)])
+    change_stream = repo.enable_change_stream(retention=args.retention) if stream else None
+    subscriptions = [change_stream.subscribe(f"s{i}", batch_size=args.batch, max_pending=args.max_pending, block=block)
+                     for i in range(subscribers)]
+    consumer = Consumer(subscriptions) if subscriptions else None
+    if consumer:
+        consumer.start()
+    with Timer() as t:
+        apply_writes(repo, writes)
+    if consumer:
+        consumer.stop.set()
+        consumer.join()
+        published = change_stream.sequence
+        assert set(consumer.received.values()) == {published}, "a subscriber missed events"
+    stats = change_stream.stats() if stream else None
+    return (t.elapsed / len(writes), consumer.max_lag if consumer else 0,
+            stats["blocked"] if stats else 0, stats["sequence"] if stats else 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", default="100k", help="products in the repository (default: 100k)")
+    parser.add_argument("--writes", default="200k", help="writes per configuration (default: 200k)")
+    parser.add_argument("--batch", type=int, default=1000, help="events per poll (default: 1000)")
+    parser.add_argument("--retention", type=int, default=100000, help="events kept by the stream")
+    parser.add_argument("--max-pending", type=int, default=10000, help="buffer of a blocking subscriber")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per configuration, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.products = parse_sizes(args.products)[0]
+
+    writes = make_writes(parse_sizes(args.writes)[0], args.products, args.seed)
+    configurations = (
+        ("no change stream", 0, False, False),
+        ("stream, 0 subscribers", 0, True, False),
+        ("stream, 1 subscriber", 1, True, False),
+        ("stream, 10 subscribers", 10, True, False),
+        ("stream, 10 blocking subscribers", 10, True, True),
+    )
+    # The configurations take turns, so a slower period of the machine does not hit only one of them
+    results = [[] for _ in configurations]
+    for _ in range(args.repeat):
+        for result, (_, subscribers, stream, block) in zip(results, configurations):
+            result.append(run(args, writes, subscribers, stream, block))
+    rows = []
+    baseline = None
+    for (label, *_), result in zip(configurations, results):
+        seconds, max_lag, blocked, events = min(result)
+        if baseline is None:
+            baseline = seconds
+        rows.append((label, f"{seconds * 1e6:.2f}", f"{(seconds - baseline) * 1e6:+.2f}",
+                     f"{events:,}", f"{max_lag:,}", f"{blocked:,}"))
+    report(f"{len(writes):,} writes, {args.products:,} products", rows,
+           ["", "us/write", "overhead", "events", "max lag", "blocked"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark for the cold start of the inventory package and the batch CLI
+
+Cold start: every statement runs in a fresh interpreter (--repeat times,
+the median is kept) and is reported as
+    wall    milliseconds for the whole process
+    import  milliseconds python -X importtime attributes to the
+            inventory/main modules and everything they import
+"every submodule" imports all of the package, which is what importing the
+old single-module main.py cost.
+
+Batch throughput: a generated command file (a block of adds, then mixed
+add/update/delete/order commands) is run with "python -m inventory run"
+against a snapshot + journal directory and a SQLite database. Both must
+end with the same inventory.
+
+The modules are byte-compiled first, so the numbers do not include
+compiling them (PYTHONDONTWRITEBYTECODE would otherwise make every run
+compile the sources again).
+
+Usage:
+    python benchmarks/bench_cli.py --repeat 10 --commands 100k
+"""
+
+import argparse
+import compileall
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from _common import APP_DIR, Timer, parse_sizes, report
+
+
+SUBMODULES = ("exceptions", "models", "storage", "listeners", "repository", "orders", "sorting", "search",
+              "snapshots", "metrics", "analytics", "sharding", "sqlite", "persistence", "catalogue",
+              "ingestion", "changes", "cli")
+
+STATEMENTS = (
+    ("interpreter only", "pass"),
+    ("import inventory", "import inventory"),
+    ("ProductRepository + Order", "from inventory import ProductRepository, Order"),
+    ("import main", "import main"),
+    ("every submodule", "; ".join(f"import inventory.{module}" for module in SUBMODULES)),
+)
+
+
+def environment() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = APP_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_ms(stderr: str) -> float:
+    """Cumulative import time of the top-level inventory/main imports in -X importtime output"""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only the outermost imports, the nested ones are in their cumulative time
+        if not name.startswith("  ") and name.strip().split(".")[0] in ("inventory", "main"):
+            total += int(cumulative)
+    return total / 1000
+
+
+def cold_start(arguments: list, repeat: int) -> tuple:
+    """Median (wall ms, import ms) of running python with arguments"""
+    walls, imports = [], []
+    for _ in range(repeat):
+        with Timer() as t:
+            result = subprocess.run([sys.executable, "-X", "importtime"] + arguments, env=environment(),
+                                    capture_output=True, text=True, check=True)
+        walls.append(t.elapsed * 1000)
+        imports.append(import_ms(result.stderr))
+    return statistics.median(walls), statistics.median(imports)
+
+
+def write_batch(path: str, commands: int, seed: int) -> None:
+    """Half adds, then updates, deletes and orders (single and 3-line) mixed with more adds"""
+    rng = random.Random(seed)
+    categories = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+    adds = commands // 2
+    products = adds
+    with open(path, "w") as f:
+        for i in range(adds):
+            f.write(f'add "Product {i}" {categories[i % 5]} 1000 {10 + i % 990} "Supplier {i % 4}"\n')
+        for i in range(commands - adds):
+            kind = rng.random()
+            product_id = rng.randint(1, products)
+            if kind < 0.3:
+                f.write(f"update {product_id} quantity={rng.randint(100, 1000)} price={rng.randint(10, 999)}\n")
+            elif kind < 0.4:
+                f.write(f"delete {product_id}\n")
+            elif kind < 0.5:
+                products += 1
+                f.write(f'add "Product {products}" Toys 500 20 "Supplier 1"\n')
+            elif kind < 0.85:
+                f.write(f"order {product_id}:{rng.randint(1, 3)} customer=C{i % 100}\n")
+            else:
+                lines = " ".join(f"{rng.randint(1, products)}:1" for _ in range(3))
+                f.write(f"order {lines}\n")
+
+
+def cli(arguments: list) -> tuple:
+    """(seconds, stdout) of python -m inventory with arguments"""
+    with Timer() as t:
+        result = subprocess.run([sys.executable, "-m", "inventory"] + arguments, env=environment(),
+                                capture_output=True, text=True)
+    if result.returncode == 2:
+        raise SystemExit(result.stderr)
+    return t.elapsed, result.stdout
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per cold start statement (default: 10)")
+    parser.add_argument("--commands", default="100k", help="commands in the batch file (default: 100k)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    compileall.compile_dir(APP_DIR, quiet=1)
+    rows = []
+    for label, statement in STATEMENTS:
+        wall, imports = cold_start(["-c", statement], args.repeat)
+        rows.append((label, f"{wall:.1f}", f"{imports:.1f}"))
+    wall, imports = cold_start(["-m", "inventory", "--help"], args.repeat)
+    rows.append(("python -m inventory --help", f"{wall:.1f}", f"{imports:.1f}"))
+    report(f"Cold start (median of {args.repeat} runs, ms)", rows, ["", "wall", "import"])
+
+    commands = parse_sizes(args.commands)[0]
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        batch = os.path.join(directory, "commands.txt")
+        write_batch(batch, commands, args.seed)
+        listings = []
+        for label, target in (("--data", ["--data", os.path.join(directory, "data")]),
+                              ("--sqlite", ["--sqlite", os.path.join(directory, "inventory.db")])):
+            seconds, output = cli(target + ["run", batch])
+            reported = output.split("(")[-1].split()[0]
+            reopen, listing = cli(target + ["list"])
+            listings.append(listing)
+            rows.append((label, f"{commands:,}", f"{seconds:.2f}", f"{commands / seconds:,.0f}", reported,
+                         f"{len(listing.splitlines()):,}", f"{reopen:.2f}"))
+        assert listings[0] == listings[1], "--data and --sqlite inventories differ"
+    report("Batch file (python -m inventory run)", rows,
+           ["backend", "commands", "run (s)", "commands/s", "commands/s (no start)", "products", "reopen + list (s)"])
+
+
+if __name__ == "__main__":
+    main()
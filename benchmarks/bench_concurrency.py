@@ -0,0 +1,108 @@
+"""
+Stress test and scaling benchmark for ConcurrentProductRepository
+
+The stress phase has many threads ordering a few hot products with a
+limited stock while other threads add and delete products, then asserts
+that nothing was oversold. The scaling phase measures order throughput
+from 1 to 32 threads.
+
+Usage:
+    python benchmarks/bench_concurrency.py --threads 1,2,4,8,16,32 --orders 20000
+"""
+
+import argparse
+import random
+import threading
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ConcurrentProductRepository, InventoryException, Order
+
+
+def stress(threads: int, hot_products: int, stock: int, attempts: int, seed: int) -> tuple:
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.create_index("category")
+    repo.add_products([(f"Hot {i}", "Hot", stock, 100, "Supplier A") for i in range(hot_products)])
+    sold = [0] * threads
+    # The buyers, the churner and this thread start together
+    start = threading.Barrier(threads + 2)
+    
+    def buyer(worker: int) -> None:
+        rng = random.Random(seed + worker)
+        start.wait()
+        for n in range(attempts):
+            lines = [(rng.randint(1, hot_products), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+            try:
+                Order(n + 1, []).place_multi_line_order(lines, repo)
+                sold[worker] += sum(quantity for _, quantity in lines)
+            except InventoryException:
+                pass
+    
+    def churner() -> None:
+        start.wait()
+        for _ in range(attempts):
+            repo.add_product("Churn", "Cold", 1, 1, "Supplier B")
+            repo.delete_product(hot_products + 1)
+    
+    workers = [threading.Thread(target=buyer, args=(w,)) for w in range(threads)]
+    workers.append(threading.Thread(target=churner))
+    for w in workers:
+        w.start()
+    start.wait()
+    for w in workers:
+        w.join()
+    
+    remaining = sum(repo.get_product(i).quantity for i in range(1, hot_products + 1))
+    # No product may go negative and every copy sold must come out of the stock
+    assert all(repo.get_product(i).quantity >= 0 for i in range(1, hot_products + 1)), "negative stock"
+    assert remaining + sum(sold) == hot_products * stock, "oversold"
+    assert repo.check_indexes() == []
+    return threads, sum(sold), remaining
+
+
+def scaling(threads: int, size: int, orders: int, seed: int) -> tuple:
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.add_products([(f"Product {i}", "Electronics", 10**9, 100, "Supplier A") for i in range(size)])
+    per_thread = orders // threads
+    start = threading.Barrier(threads + 1)
+    
+    def buyer(worker: int) -> None:
+        rng = random.Random(seed + worker)
+        ids = [rng.randint(1, size) for _ in range(per_thread)]
+        order = Order(1, [])
+        start.wait()
+        for product_id in ids:
+            order.order.products.clear()
+            order.place_order(product_id, 1, repo)
+    
+    workers = [threading.Thread(target=buyer, args=(w,)) for w in range(threads)]
+    for w in workers:
+        w.start()
+    with Timer() as t:
+        start.wait()
+        for w in workers:
+            w.join()
+    return threads, per_thread * threads, f"{t.elapsed:.3f}", f"{per_thread * threads / t.elapsed:,.0f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2,4,8,16,32")
+    parser.add_argument("--size", default="100k", help="products for the scaling phase")
+    parser.add_argument("--orders", type=int, default=20000, help="orders per scaling measurement")
+    parser.add_argument("--hot", type=int, default=5, help="hot products in the stress phase")
+    parser.add_argument("--stock", type=int, default=2000, help="initial stock of each hot product")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    thread_counts = parse_sizes(args.threads)
+    rows = [stress(threads, args.hot, args.stock, 500, args.seed) for threads in thread_counts]
+    report("Stress test: no oversell (assertions passed)", rows, ["threads", "units sold", "units left"])
+    
+    size = parse_sizes(args.size)[0]
+    rows = [scaling(threads, size, args.orders, args.seed) for threads in thread_counts]
+    report("place_order scaling", rows, ["threads", "orders", "seconds", "orders/sec"])
+
+
+if __name__ == "__main__":
+    main()
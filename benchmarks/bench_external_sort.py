@@ -0,0 +1,118 @@
+"""
+Benchmark and check for the external merge sort
+
+Sorts a generated stream of products with a memory budget far below the
+size of the dataset, checks that the output is complete and in order
+(including the stable order of equal keys), and reports the throughput,
+the number of spilled runs and merge passes, and the peak traced memory.
+
+Usage:
+    python benchmarks/bench_external_sort.py --sizes 100k,1M --budget 4M
+"""
+
+from array import array
+import argparse
+import random
+import tracemalloc
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ExternalSort, ProductInfo
+
+
+CATEGORIES = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+
+
+def generate(size: int, seed: int):
+    """Yield size products in random id order without keeping them in memory"""
+    rng = random.Random(seed)
+    # A random permutation of 1..size from a full-period LCG (size <= 2**32)
+    modulus = 1
+    while modulus < size:
+        modulus *= 2
+    value = rng.randrange(modulus)
+    produced = 0
+    while produced < size:
+        value = (value * 1103515245 + 12345) % modulus
+        if value < size:
+            produced += 1
+            product_id = value + 1
+            yield ProductInfo(product_id, f"Product {product_id}", CATEGORIES[product_id % 5],
+                              product_id % 100, rng.randint(1, 1000), "Supplier A")
+
+
+def parse_bytes(text: str) -> int:
+    """Parse a byte count like "512k" or "4M" """
+    units = {"k": 2**10, "m": 2**20, "g": 2**30}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def input_positions(size: int, seed: int) -> array:
+    """Position of every product id in the generated stream"""
+    positions = array("I", bytes(4 * (size + 1)))
+    for position, product in enumerate(generate(size, seed)):
+        positions[product.product_id] = position
+    return positions
+
+
+def check(products, size: int, key, positions: array) -> int:
+    """Check the order of a sorted stream; equal keys must keep their input order"""
+    count = 0
+    previous = None
+    seen = bytearray(size + 1)
+    for product in products:
+        current = (key(product), positions[product.product_id])
+        if previous is not None:
+            assert previous <= current, f"out of order: {previous} before {current}"
+        previous = current
+        assert not seen[product.product_id], f"product {product.product_id} returned twice"
+        seen[product.product_id] = 1
+        count += 1
+    assert count == size, f"{count} products returned instead of {size}"
+    return count
+
+
+def run(size: int, budget: int, seed: int, trace: bool) -> list:
+    positions = input_positions(size, seed)
+    rows = []
+    cases = [
+        ("product_id", None, lambda p: p.product_id),
+        ("price", "price", lambda p: p.price),
+        ("category,-price", ["category", "-price"], lambda p: (p.category, -p.price)),
+    ]
+    for name, key, check_key in cases:
+        sorter = ExternalSort(key, memory_budget=budget)
+        stream = sorter.sort(generate(size, seed))
+        if trace:
+            tracemalloc.start()
+        with Timer() as t:
+            check(stream, size, check_key, positions)
+        peak = f"{tracemalloc.get_traced_memory()[1] / 2**20:.1f}" if trace else "-"
+        if trace:
+            tracemalloc.stop()
+        rows.append((size, name, f"{budget / 2**20:.1f}", sorter.runs, sorter.passes,
+                     f"{sorter.spilled / 2**20:.1f}", peak, f"{size / t.elapsed:,.0f}", f"{t.elapsed:.2f}"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M", help="number of products (default: 100k,1M)")
+    parser.add_argument("--budget", default="4M", help="memory budget in bytes, k/M suffixes allowed (default: 4M)")
+    parser.add_argument("--trace-memory", action="store_true", help="report the peak traced memory (slower)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    budget = parse_bytes(args.budget)
+    rows = []
+    for size in parse_sizes(args.sizes):
+        rows.extend(run(size, budget, args.seed, args.trace_memory))
+    report("ExternalSort", rows, ["products", "key", "budget MiB", "runs", "passes", "spilled MiB",
+                                  "peak MiB", "products/sec", "seconds"])
+
+
+if __name__ == "__main__":
+    main()
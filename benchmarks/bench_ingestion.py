@@ -0,0 +1,103 @@
+"""
+Load test for the asyncio OrderIngestionService
+
+A synthetic load generator runs many concurrent clients, each submitting
+orders for random products and awaiting the result. It reports the
+orders/sec and the p50/p99 latency (submit to result), and compares them
+with calling Order.place_order directly once per order.
+
+Usage:
+    python benchmarks/bench_ingestion.py --size 100k --orders 100000 --clients 1000 --batches 1,64,256
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from _common import Timer, parse_sizes, report
+
+from inventory import InventoryException, Order, OrderIngestionService, ProductRepository
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def new_repository(storage: str, size: int):
+    repo = ProductRepository(storage=storage)
+    repo.add_products([(f"Product {i}", "Electronics", 10**9, 100, "Supplier A") for i in range(size)])
+    return repo
+
+
+async def load(service, size: int, orders: int, clients: int, seed: int) -> list:
+    latencies = []
+    per_client = orders // clients
+    
+    async def client(worker: int) -> None:
+        rng = random.Random(seed + worker)
+        for _ in range(per_client):
+            start = time.perf_counter()
+            try:
+                await service.submit(rng.randint(1, size), 1)
+            except InventoryException:
+                pass
+            latencies.append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(client(w) for w in range(clients)))
+    return latencies
+
+
+def run_service(storage: str, size: int, orders: int, clients: int, batch: int, window: float, seed: int) -> tuple:
+    repo = new_repository(storage, size)
+    
+    async def main():
+        async with OrderIngestionService(repo, max_queue=4 * clients, batch_size=batch, batch_window=window) as service:
+            with Timer() as t:
+                latencies = await load(service, size, orders, clients, seed)
+        return latencies, t.elapsed, service.batches
+    
+    latencies, elapsed, batches = asyncio.run(main())
+    latencies.sort()
+    return (storage, f"service batch={batch}", len(latencies), f"{len(latencies) / elapsed:,.0f}",
+            f"{percentile(latencies, 0.5) * 1e3:.2f}", f"{percentile(latencies, 0.99) * 1e3:.2f}",
+            f"{len(latencies) / max(batches, 1):.1f}")
+
+
+def run_direct(storage: str, size: int, orders: int, seed: int) -> tuple:
+    repo = new_repository(storage, size)
+    rng = random.Random(seed)
+    ids = [rng.randint(1, size) for _ in range(orders)]
+    latencies = []
+    with Timer() as t:
+        for n, product_id in enumerate(ids):
+            start = time.perf_counter()
+            Order(n + 1, []).place_order(product_id, 1, repo)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return (storage, "direct place_order", orders, f"{orders / t.elapsed:,.0f}",
+            f"{percentile(latencies, 0.5) * 1e3:.3f}", f"{percentile(latencies, 0.99) * 1e3:.3f}", "-")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="products in the inventory")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=1000, help="concurrent clients")
+    parser.add_argument("--batches", default="1,64,256", help="batch sizes to try")
+    parser.add_argument("--window", type=float, default=0.002, help="batch window in seconds")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    size = parse_sizes(args.size)[0]
+    rows = []
+    for storage in args.storages.split(","):
+        rows.append(run_direct(storage, size, args.orders, args.seed))
+        for batch in parse_sizes(args.batches):
+            rows.append(run_service(storage, size, args.orders, args.clients, batch, args.window, args.seed))
+    report("Order ingestion", rows, ["storage", "mode", "orders", "orders/sec", "p50 ms", "p99 ms", "orders/batch"])
+
+
+if __name__ == "__main__":
+    main()
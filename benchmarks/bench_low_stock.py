@@ -0,0 +1,101 @@
+"""
+Benchmark for the LowStockMonitor
+
+Compares "top-k lowest stock" and "everything below threshold" queries
+with full scans of the inventory, and measures the extra cost per placed
+order of keeping the monitor up to date (random orders of random size).
+
+Usage:
+    python benchmarks/bench_low_stock.py --sizes 100k,1M --orders 50000
+"""
+
+import argparse
+from heapq import nsmallest
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import InventoryException, Order, ProductRepository
+
+
+def place_orders(repo, orders: list) -> float:
+    order = Order(order_id=1, products=[])
+    with Timer() as t:
+        for product_id, quantity in orders:
+            order.order.products.clear()
+            try:
+                order.place_order(product_id, quantity, repo)
+            except InventoryException:
+                pass
+    return t.elapsed
+
+
+def run(size: int, storage: str, orders: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    repo = ProductRepository(storage=storage)
+    fill_repository(repo, size)
+    queries, overhead = [], []
+    
+    # Per-order overhead: the same orders on two identical repositories
+    batch = [(rng.randint(1, size), rng.randint(0, 3)) for _ in range(orders)]
+    plain = ProductRepository(storage=storage)
+    fill_repository(plain, size)
+    without = place_orders(plain, batch)
+    monitor = repo.create_low_stock_monitor(default_threshold=5)
+    fired = []
+    monitor.add_callback(lambda product, threshold: fired.append(product.product_id))
+    with_monitor = place_orders(repo, batch)
+    overhead.append((size, storage, f"{without / orders * 1e6:.2f}", f"{with_monitor / orders * 1e6:.2f}",
+                     f"{(with_monitor - without) / orders * 1e6:.2f}", len(fired)))
+    assert monitor.check(repo.storage) == []
+    
+    for k in (10, 100, 1000):
+        with Timer() as scan:
+            expected = nsmallest(k, ((p.quantity, p.product_id) for p in repo.storage))
+        with Timer() as t:
+            for _ in range(100):
+                result = monitor.lowest(k)
+        assert result == [(product_id, quantity) for quantity, product_id in expected]
+        queries.append((size, storage, f"lowest({k})", f"{scan.elapsed * 1e3:.3f}", f"{t.elapsed / 100 * 1e3:.4f}"))
+    
+    with Timer() as scan:
+        expected = sorted(p.product_id for p in repo.storage if p.quantity < 5)
+    with Timer() as t:
+        for _ in range(10):
+            result = monitor.below_threshold()
+    assert sorted(row[0] for row in result) == expected
+    queries.append((size, storage, f"below_threshold ({len(result)})", f"{scan.elapsed * 1e3:.3f}",
+                    f"{t.elapsed / 10 * 1e3:.4f}"))
+    
+    with Timer() as scan:
+        expected = nsmallest(100, ((p.quantity - 5, p.product_id) for p in repo.storage if p.quantity < 5))
+    with Timer() as t:
+        for _ in range(10):
+            result = monitor.below_threshold(limit=100)
+    assert [row[0] for row in result] == [product_id for _, product_id in expected]
+    queries.append((size, storage, "below_threshold(limit=100)", f"{scan.elapsed * 1e3:.3f}",
+                    f"{t.elapsed / 10 * 1e3:.4f}"))
+    return queries, overhead
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M", help="inventory sizes (default: 100k,1M)")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--orders", type=int, default=50000, help="orders placed per measurement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    queries, overhead = [], []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            q, o = run(size, storage, args.orders, args.seed)
+            queries.extend(q)
+            overhead.extend(o)
+    report("Low-stock queries (ms)", queries, ["products", "storage", "query", "full scan", "monitor"])
+    report("Per-order cost of the monitor (us)", overhead,
+           ["products", "storage", "without", "with", "overhead", "callbacks fired"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Memory benchmark (tracemalloc) for the product representations
+
+Compares a plain __dict__ product object (the old ProductInfo layout) with
+the __slots__ ProductInfo in the "list" and "indexed" storages and with the
+struct-of-arrays "columnar" storage. Category and supplier strings are
+built per row, like values parsed from a file, so interning shows up.
+
+Usage:
+    python benchmarks/bench_memory.py --sizes 1M,10M
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ProductRepository
+
+
+CATEGORIES = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+SUPPLIERS = ("Supplier A", "Supplier B", "Supplier C", "Supplier D")
+
+
+class DictProductInfo:
+    """The ProductInfo layout before __slots__ (one __dict__ per product)"""
+    
+    def __init__(self, product_id, name, category, quantity, price, supplier):
+        self.product_id = product_id
+        self.name = name
+        self.category = category
+        self.quantity = quantity
+        self.price = price
+        self.supplier = supplier
+
+
+def rows(n: int):
+    for i in range(n):
+        # "".join makes a new string object per row, like a parser would
+        yield (f"Product {i}", "".join(CATEGORIES[i % 5]), i % 100, 10 + i % 990, "".join(SUPPLIERS[i % 4]))
+
+
+def build_dict_objects(n: int):
+    return [DictProductInfo(i + 1, *row) for i, row in enumerate(rows(n))]
+
+
+def build_repository(storage: str):
+    def build(n: int):
+        repo = ProductRepository(storage=storage)
+        add = repo.add_product
+        for row in rows(n):
+            add(*row)
+        return repo
+    return build
+
+
+def measure(name: str, build, n: int) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    with Timer() as t:
+        keep = build(n)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    gc.collect()
+    return name, n, f"{current / 2**20:,.1f}", f"{peak / 2**20:,.1f}", f"{current / n:.1f}", f"{t.elapsed:.1f}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1M,10M", help="number of products (default: 1M,10M)")
+    parser.add_argument("--layouts", default="dict,list,indexed,columnar")
+    args = parser.parse_args()
+    
+    builders = {
+        "dict": build_dict_objects,
+        "list": build_repository("list"),
+        "indexed": build_repository("indexed"),
+        "columnar": build_repository("columnar"),
+    }
+    
+    results = []
+    for n in parse_sizes(args.sizes):
+        for layout in args.layouts.split(","):
+            results.append(measure(layout, builders[layout], n))
+    report("Memory per product (tracemalloc)", results,
+           ["layout", "products", "MiB", "peak MiB", "bytes/product", "build s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark of the cost of InventoryMetrics
+
+Runs the same operations on a repository without metrics (the default),
+and with metrics enabled, and reports the overhead per operation. Finally
+it writes the collected metrics in the Prometheus text format.
+
+Usage:
+    python benchmarks/bench_metrics.py --size 100k --ops 50000 --prometheus metrics.prom
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import InventoryMetrics, Order, PrometheusTextFileSink, ProductRepository
+
+
+def workload(repo, ids: list) -> float:
+    order = Order(order_id=1, products=[])
+    with Timer() as t:
+        for product_id in ids:
+            repo.get_product(product_id)
+            repo.update_product(product_id, price=500)
+            order.order.products.clear()
+            order.place_order(product_id, 0, repo)
+    return t.elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="inventory size (default: 100k)")
+    parser.add_argument("--ops", type=int, default=50000, help="rounds of get + update + order")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--prometheus", help="write the collected metrics to this file")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    size = parse_sizes(args.size)[0]
+    ids = [random.Random(args.seed).randint(1, size) for _ in range(args.ops)]
+    metrics = InventoryMetrics()
+    rows = []
+    for storage in args.storages.split(","):
+        repo = ProductRepository(storage=storage)
+        fill_repository(repo, size)
+        disabled = min(workload(repo, ids) for _ in range(3))
+        repo.enable_metrics(metrics)
+        enabled = min(workload(repo, ids) for _ in range(3))
+        repo.disable_metrics()
+        operations = args.ops * 3
+        rows.append((storage, size, f"{disabled / operations * 1e6:.2f}", f"{enabled / operations * 1e6:.2f}",
+                     f"{(enabled - disabled) / operations * 1e6:.2f}", f"{enabled / disabled - 1:+.1%}"))
+    report("InventoryMetrics overhead (per repository/order operation)", rows,
+           ["storage", "products", "us/op off", "us/op on", "overhead us", "overhead"])
+    
+    if args.prometheus:
+        metrics.add_sink(PrometheusTextFileSink(args.prometheus))
+        metrics.export()
+        print(f"Metrics written to {args.prometheus}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for multi-line orders (Order.place_multi_line_order)
+
+Places baskets of 1, 10 and 100 random lines, both as one multi-line
+order and as one single-line Order per line (the only option before).
+
+Usage:
+    python benchmarks/bench_multi_line_order.py --size 100k --baskets 1,10,100 --lines 100000
+"""
+
+import argparse
+import random
+
+from _common import Timer, parse_sizes, report
+
+from inventory import Order, ProductRepository
+
+
+def run(storage: str, size: int, basket: int, total_lines: int, seed: int) -> list:
+    rng = random.Random(seed)
+    orders = total_lines // basket
+    baskets = [[(rng.randint(1, size), 1) for _ in range(basket)] for _ in range(orders)]
+    rows = []
+    
+    for mode in ("single-line orders", "multi-line order"):
+        repo = ProductRepository(storage=storage)
+        repo.add_products([(f"Product {i}", "Electronics", 10**9, 100, "Supplier A") for i in range(size)])
+        order_id = 0
+        with Timer() as t:
+            for lines in baskets:
+                if mode == "multi-line order":
+                    order_id += 1
+                    Order(order_id, []).place_multi_line_order(lines, repo)
+                else:
+                    for product_id, quantity in lines:
+                        order_id += 1
+                        Order(order_id, []).place_order(product_id, quantity, repo)
+        rows.append((storage, size, basket, mode, f"{orders / t.elapsed:,.0f}", f"{orders * basket / t.elapsed:,.0f}"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="products in the inventory")
+    parser.add_argument("--baskets", default="1,10,100", help="lines per basket")
+    parser.add_argument("--lines", type=int, default=100000, help="total order lines per measurement")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    size = parse_sizes(args.size)[0]
+    rows = []
+    for storage in args.storages.split(","):
+        for basket in parse_sizes(args.baskets):
+            rows.extend(run(storage, size, basket, args.lines, args.seed))
+    report("Order throughput by basket size", rows,
+           ["storage", "products", "lines", "mode", "baskets/sec", "lines/sec"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark for the product name search index
+
+Fills an inventory with generated names ("Acme Wireless Mouse X120"),
+then measures:
+    build       create_name_index on the filled inventory
+    prefix      search_names for prefixes of 1 to 5 characters (autocomplete)
+    two words   search_names for "<word> <prefix>" queries
+    fuzzy       search_names(fuzzy=True) for words with one typo
+    add/delete  the extra cost per add_product/delete_product of the index
+Latencies are reported as percentiles. Prefix results are checked against
+a full scan of the inventory.
+
+Usage:
+    python benchmarks/bench_name_search.py --sizes 100k,1M
+"""
+
+import argparse
+import random
+import string
+
+from _common import Timer, parse_sizes, report
+
+from inventory import NameSearchIndex, ProductRepository
+
+
+BRANDS = ("Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Wonka", "Hooli", "Vandelay", "Tyrell")
+ADJECTIVES = ("Wireless", "Portable", "Organic", "Classic", "Deluxe", "Compact", "Smart", "Premium",
+              "Ergonomic", "Waterproof", "Vintage", "Digital")
+NOUNS = ("Mouse", "Keyboard", "Laptop", "Monitor", "Headphones", "Speaker", "Camera", "Blender",
+         "Toaster", "Backpack", "Jacket", "Sneakers", "Notebook", "Puzzle", "Lamp", "Kettle",
+         "Charger", "Router", "Printer", "Tablet")
+
+
+def product_name(rng: random.Random) -> str:
+    model = rng.choice(string.ascii_uppercase) + str(rng.randint(100, 9999))
+    return f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {model}"
+
+
+def with_typo(rng: random.Random, word: str) -> str:
+    """word with one character replaced, dropped or swapped with the next"""
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if kind == 1:
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def percentiles(samples: list) -> tuple:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+    return f"{pick(0.5):.1f}", f"{pick(0.95):.1f}", f"{pick(0.99):.1f}", f"{samples[-1] * 1e6:.1f}"
+
+
+def latencies(function, queries: list) -> list:
+    samples = []
+    for query in queries:
+        with Timer() as t:
+            function(query)
+        samples.append(t.elapsed)
+    return samples
+
+
+def scan(repo, query: str, limit: int) -> set:
+    words = NameSearchIndex.words_of(query)
+    ids = [p.product_id for p in repo.storage
+           if all(any(w.startswith(q) for w in NameSearchIndex.words_of(p.name)) for q in words)]
+    return set(ids), len(ids)
+
+
+def run(size: int, storage: str, queries: int, limit: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    repo = ProductRepository(storage=storage)
+    repo.add_products([(product_name(rng), "Electronics", 5, 100, "Supplier A") for _ in range(size)])
+    with Timer() as build:
+        repo.create_name_index(fuzzy=True)
+
+    vocabulary = [w.lower() for w in BRANDS + ADJECTIVES + NOUNS]
+    rows = []
+    for length in range(1, 6):
+        prefixes = [rng.choice(vocabulary)[:length] for _ in range(queries)]
+        rows.append((size, storage, f"prefix {length} chars")
+                    + percentiles(latencies(lambda q: repo.search_names(q, limit), prefixes)))
+    pairs = [f"{rng.choice(NOUNS)} {rng.choice(BRANDS)[:2]}" for _ in range(queries)]
+    rows.append((size, storage, "two words") + percentiles(latencies(lambda q: repo.search_names(q, limit), pairs)))
+    typos = [with_typo(rng, rng.choice(vocabulary)) for _ in range(queries)]
+    rows.append((size, storage, "fuzzy (1 typo)")
+                + percentiles(latencies(lambda q: repo.search_names(q, limit, fuzzy=True), typos)))
+
+    # Results must match a full scan (any limit products out of the matches)
+    for query in ("a", "wire", "mouse ac", "x12", typos[0].split()[0][:3]):
+        expected, matches = scan(repo, query, limit)
+        result = [p.product_id for p in repo.search_names(query, limit)]
+        assert len(result) == min(limit, matches) and set(result) <= expected, query
+    for query in typos[:50]:
+        # One edit in a longer word keeps enough trigrams for it to be found
+        if len(query) >= 6:
+            assert repo.search_names(query, limit, fuzzy=True), query
+
+    ops = min(size, 20000)
+    # No product was deleted, so the new products get the ids after size
+    ids = range(size + 1, size + ops + 1)
+    names = [product_name(rng) for _ in range(ops)]
+    with Timer() as indexed_add:
+        for name in names:
+            repo.add_product(name, "Electronics", 5, 100, "Supplier A")
+    with Timer() as indexed_delete:
+        for product_id in ids:
+            repo.delete_product(product_id)
+    repo.drop_name_index()
+    with Timer() as plain_add:
+        for name in names:
+            repo.add_product(name, "Electronics", 5, 100, "Supplier A")
+    with Timer() as plain_delete:
+        for product_id in ids:
+            repo.delete_product(product_id)
+    overhead = (size, storage, f"{build.elapsed:.2f}",
+                f"{plain_add.elapsed / ops * 1e6:.2f}", f"{indexed_add.elapsed / ops * 1e6:.2f}",
+                f"{plain_delete.elapsed / ops * 1e6:.2f}", f"{indexed_delete.elapsed / ops * 1e6:.2f}")
+    return rows, overhead
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M", help="inventory sizes (default: 100k,1M)")
+    parser.add_argument("--storages", default="list")
+    parser.add_argument("--queries", type=int, default=2000, help="queries per measurement")
+    parser.add_argument("--limit", type=int, default=10, help="results per query (top N)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows, overhead = [], []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            r, o = run(size, storage, args.queries, args.limit, args.seed)
+            rows.extend(r)
+            overhead.append(o)
+    report(f"search_names latency, top {args.limit} (us)", rows,
+           ["products", "storage", "query", "p50", "p95", "p99", "max"])
+    report("Index cost", overhead, ["products", "storage", "build (s)", "add (us)", "add indexed (us)",
+                                    "delete (us)", "delete indexed (us)"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark harness for the ProductRepository and Order hot paths
+
+Measures every operation of the complexity table at each size:
+    add_fresh     add_product with a new id (no free ids)
+    add_reuse     add_product taking the lowest free id after deletes
+    update        update_product
+    delete        delete_product
+    get           get_product
+    id_search     BinarySearch.id_search on the inventory list
+    sort_999      Sort.sort of 999 shuffled products
+    sort_1000     Sort.sort of 1000 shuffled products (the old insertion/merge threshold)
+    place_order   Order.place_order
+and the throughput of workload mixes, which run a random sequence of
+operations in the given proportions (e.g. "get=80,update=15,delete_add=5").
+
+Results can be written as JSON and compared with a stored baseline; the
+script exits with status 1 when an operation got slower than the baseline
+by more than the threshold.
+
+Usage:
+    python benchmarks/bench_operations.py --sizes 1k,10k,100k,1M --output results.json
+    python benchmarks/bench_operations.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_operations.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import BinarySearch, Order, ProductRepository, Sort
+
+
+OPERATIONS = ("add_fresh", "add_reuse", "update", "delete", "get", "id_search",
+              "sort_999", "sort_1000", "place_order")
+
+# Operations a workload mix can be made of
+MIX_OPERATIONS = ("get", "update", "delete_add", "place_order", "id_search")
+
+MIXES = {
+    "read-heavy": "get=80,place_order=10,update=10",
+    "order-heavy": "place_order=80,get=20",
+    "write-heavy": "update=40,delete_add=30,place_order=30",
+    "churn": "delete_add=100",
+}
+
+
+def parse_mix(text: str) -> dict:
+    """Parse a mix like "get=80,update=20" (or the name of a predefined mix)"""
+    text = MIXES.get(text, text)
+    weights = {}
+    for part in text.split(","):
+        operation, _, weight = part.partition("=")
+        operation = operation.strip()
+        if operation not in MIX_OPERATIONS:
+            raise SystemExit(f"Unknown mix operation {operation!r}, expected one of {', '.join(MIX_OPERATIONS)}")
+        weights[operation] = float(weight or 1)
+    return weights
+
+
+def distinct_ids(rng: random.Random, size: int, count: int) -> list:
+    return rng.sample(range(1, size + 1), min(count, size))
+
+
+# Every measurement returns (operations, seconds) and leaves the repository
+# with the same products it started with.
+
+def measure_add_fresh(repo, size, ops, rng):
+    with Timer() as t:
+        for _ in range(ops):
+            repo.add_product("Fresh", "Electronics", 5, 100, "Supplier A")
+    repo.delete_products(list(range(size + 1, size + ops + 1)))
+    # Forget the ids freed above so later adds take the fresh path again
+    repo.id_allocator.restore(size + 1, range(1, size + 1))
+    return ops, t.elapsed
+
+
+def measure_add_reuse(repo, size, ops, rng):
+    victims = distinct_ids(rng, size, ops)
+    for product_id in victims:
+        repo.delete_product(product_id)
+    with Timer() as t:
+        for _ in victims:
+            repo.add_product("Reuse", "Electronics", 5, 100, "Supplier A")
+    return len(victims), t.elapsed
+
+
+def measure_update(repo, size, ops, rng):
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    with Timer() as t:
+        for product_id in ids:
+            repo.update_product(product_id, price=500)
+    return ops, t.elapsed
+
+
+def measure_delete(repo, size, ops, rng):
+    victims = distinct_ids(rng, size, ops)
+    with Timer() as t:
+        for product_id in victims:
+            repo.delete_product(product_id)
+    for _ in victims:
+        repo.add_product("Reuse", "Electronics", 5, 100, "Supplier A")
+    return len(victims), t.elapsed
+
+
+def measure_get(repo, size, ops, rng):
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    with Timer() as t:
+        for product_id in ids:
+            repo.get_product(product_id)
+    return ops, t.elapsed
+
+
+def measure_id_search(repo, size, ops, rng):
+    inventory = repo.inventory
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    with Timer() as t:
+        for product_id in ids:
+            BinarySearch.id_search(inventory, product_id)
+    return ops, t.elapsed
+
+
+def measure_sort(length):
+    def measure(repo, size, ops, rng):
+        products = repo.inventory[:length]
+        # One sort per 1000 operations of the other benchmarks, at least 10
+        rounds = max(10, ops // 1000)
+        arrays = []
+        for _ in range(rounds):
+            shuffled = list(products)
+            rng.shuffle(shuffled)
+            arrays.append(shuffled)
+        with Timer() as t:
+            for array in arrays:
+                Sort.sort(array)
+        return rounds, t.elapsed
+    return measure
+
+
+def measure_place_order(repo, size, ops, rng):
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    order = Order(order_id=1, products=[])
+    with Timer() as t:
+        for product_id in ids:
+            order.order.products.clear()
+            order.place_order(product_id, 0, repo)
+    return ops, t.elapsed
+
+
+MEASUREMENTS = {
+    "add_fresh": measure_add_fresh,
+    "add_reuse": measure_add_reuse,
+    "update": measure_update,
+    "delete": measure_delete,
+    "get": measure_get,
+    "id_search": measure_id_search,
+    "sort_999": measure_sort(999),
+    "sort_1000": measure_sort(1000),
+    "place_order": measure_place_order,
+}
+
+
+def measure_mix(weights: dict):
+    def measure(repo, size, ops, rng):
+        operations = rng.choices(list(weights), weights=list(weights.values()), k=ops)
+        ids = [rng.randint(1, size) for _ in range(ops)]
+        inventory = repo.inventory if "id_search" in weights else None
+        order = Order(order_id=1, products=[])
+        with Timer() as t:
+            for operation, product_id in zip(operations, ids):
+                if operation == "get":
+                    repo.get_product(product_id)
+                elif operation == "update":
+                    repo.update_product(product_id, price=500)
+                elif operation == "delete_add":
+                    repo.delete_product(product_id)
+                    repo.add_product("Churn", "Electronics", 5, 100, "Supplier A")
+                elif operation == "place_order":
+                    order.order.products.clear()
+                    order.place_order(product_id, 0, repo)
+                else:
+                    BinarySearch.id_search(inventory, product_id)
+        return ops, t.elapsed
+    return measure
+
+
+def run(size: int, storage: str, names: list, mixes: dict, ops: int, repeat: int, seed: int) -> list:
+    repo = ProductRepository(storage=storage)
+    fill_repository(repo, size)
+    measurements = [(name, MEASUREMENTS[name]) for name in names]
+    measurements += [(f"mix:{name}", measure_mix(weights)) for name, weights in mixes.items()]
+
+    results = []
+    for name, measure in measurements:
+        # Use the best of the repeats: noise only ever makes a run slower
+        best = None
+        for attempt in range(repeat):
+            count, seconds = measure(repo, size, ops, random.Random(seed + attempt))
+            if best is None or seconds / count < best[1] / best[0]:
+                best = (count, seconds)
+        count, seconds = best
+        results.append({"name": name, "size": size, "storage": storage, "ops": count,
+                        "seconds": round(seconds, 6), "ops_per_sec": round(count / seconds, 1),
+                        "us_per_op": round(seconds / count * 1e6, 3)})
+        assert len(repo.storage) == size, f"{name} changed the number of products"
+    return results
+
+
+def compare(results: list, baseline: dict, threshold: float) -> tuple:
+    """Compare results with a baseline; returns (table rows, number of regressions)"""
+    previous = {(r["name"], r["size"], r["storage"]): r for r in baseline["results"]}
+    rows = []
+    regressions = 0
+    for result in results:
+        old = previous.get((result["name"], result["size"], result["storage"]))
+        if old is None:
+            rows.append((result["name"], result["size"], result["storage"], "-",
+                         f"{result['ops_per_sec']:,.0f}", "-", "new"))
+            continue
+        change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+        status = "ok"
+        if change < -threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif change > threshold:
+            status = "faster"
+        rows.append((result["name"], result["size"], result["storage"], f"{old['ops_per_sec']:,.0f}",
+                     f"{result['ops_per_sec']:,.0f}", f"{change:+.1%}", status))
+    return rows, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1k,10k,100k,1M", help="inventory sizes (default: 1k,10k,100k,1M)")
+    parser.add_argument("--storages", default="list", help="comma separated storage backends (default: list)")
+    parser.add_argument("--operations", default=",".join(OPERATIONS),
+                        help="comma separated operations (default: all)")
+    parser.add_argument("--mix", action="append", default=None,
+                        help=f"workload mix, a name ({', '.join(MIXES)}) or weights like "
+                             f"get=80,update=20; can be repeated (default: every named mix)")
+    parser.add_argument("--ops", type=int, default=10000, help="operations per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="repeats per measurement, the best is kept")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--save-baseline", help="write the results as the baseline to this file")
+    parser.add_argument("--baseline", help="compare with the results stored in this file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown reported as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.operations.split(",") if name.strip()]
+    unknown = [name for name in names if name not in MEASUREMENTS]
+    if unknown:
+        raise SystemExit(f"Unknown operations: {', '.join(unknown)}")
+    mixes = {text: parse_mix(text) for text in (args.mix if args.mix is not None else MIXES)}
+
+    results = []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            results.extend(run(size, storage, names, mixes, args.ops, args.repeat, args.seed))
+
+    report("ProductRepository / Order operations",
+           [(r["name"], r["size"], r["storage"], r["ops"], f"{r['ops_per_sec']:,.0f}", f"{r['us_per_op']:.2f}")
+            for r in results],
+           ["operation", "products", "storage", "ops", "ops/sec", "us/op"])
+
+    document = {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ops": args.ops,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        report(f"Compared with {args.baseline} (threshold {args.threshold:.0%})", rows,
+               ["operation", "products", "storage", "baseline ops/sec", "ops/sec", "change", "status"])
+        if regressions:
+            print(f"{regressions} regression(s) found")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark for the array-backed order history (OrderLog)
+
+Appends synthetic order lines spread over a time span (10M over 24 hours
+by default) and reports:
+    ingest     appends per second straight into the log
+    memory     bytes of the log columns, per order line
+    queries    latency of time-range lookups (binary search), exact
+               per-product sales over a range, and the rolling "units sold
+               in the last hour" / top sellers aggregates
+and the cost OrderLog adds to Order.place_order.
+
+Usage:
+    python benchmarks/bench_order_log.py --orders 10M --hours 24
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import Order, OrderLog, ProductRepository
+
+
+class FakeClock:
+    """Clock the benchmark moves forward by hand"""
+
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def timed(function, arguments: list) -> float:
+    """Mean seconds per call"""
+    with Timer() as t:
+        for args in arguments:
+            function(*args)
+    return t.elapsed / len(arguments)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", default="10M", help="order lines to append (default: 10M)")
+    parser.add_argument("--hours", type=float, default=24, help="time span of the orders (default: 24)")
+    parser.add_argument("--products", type=int, default=100000, help="distinct product ids")
+    parser.add_argument("--queries", type=int, default=1000, help="queries per measurement")
+    parser.add_argument("--place-orders", type=int, default=100000, help="place_order calls for the overhead")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    count = parse_sizes(args.orders)[0]
+    rng = random.Random(args.seed)
+    start = 1_700_000_000.0
+    step = args.hours * 3600 / count
+    clock = FakeClock(start)
+    log = OrderLog(clock=clock)
+
+    # Generate in chunks so the random numbers are not timed
+    append = log.append
+    ingest = 0.0
+    chunk = 100_000
+    for first in range(0, count, chunk):
+        rows = [(first + i + 1, rng.randint(1, args.products), rng.randint(1, 5),
+                 start + (first + i) * step) for i in range(min(chunk, count - first))]
+        with Timer() as t:
+            for order_id, product_id, quantity, timestamp in rows:
+                append(order_id, product_id, quantity, None, timestamp)
+        ingest += t.elapsed
+    clock.now = start + count * step
+    end = clock.now
+
+    memory = log.memory_bytes()
+    report(f"Ingest ({count:,} order lines over {args.hours:g} hours)",
+           [(f"{count:,}", f"{count / ingest:,.0f}", f"{memory / 2**20:,.1f}", f"{memory / count:.1f}")],
+           ["orders", "appends/sec", "columns (MiB)", "bytes/order"])
+
+    # Answers are checked against a plain scan for a few queries first
+    sample_start = end - 600
+    first, last = log.rows(sample_start, end)
+    expected = {}
+    for _, _, product_id, quantity, _ in log.orders(sample_start, end):
+        expected[product_id] = expected.get(product_id, 0) + quantity
+    assert log.sales_between(sample_start, end) == expected
+    assert last - first == len(list(log.orders(sample_start, end)))
+    # The rolling totals count whole buckets: from the start of the oldest one
+    window_start = (int(end) // 60 - 59) * 60
+    for product_id in list(expected)[:20]:
+        assert log.sales_between(sample_start, end, product_id) == expected[product_id]
+        assert log.units_sold(product_id) == log.sales_between(window_start, None, product_id)
+
+    span = end - start
+    ranges = [(start + rng.random() * span,) for _ in range(args.queries)]
+    rows = []
+    seconds = timed(lambda a: log.rows(a, a + 60), ranges)
+    rows.append(("rows() of a 1-minute range", f"{seconds * 1e6:.2f}"))
+    seconds = timed(lambda a: log.sales_between(a, a + 60), ranges)
+    rows.append(("sales_between, 1 minute, all products", f"{seconds * 1e6:.2f}"))
+    products = [(end - 3600, rng.randint(1, args.products)) for _ in range(args.queries // 10)]
+    seconds = timed(lambda a, product_id: log.sales_between(a, end, product_id), products)
+    rows.append(("sales_between, last hour, one product", f"{seconds * 1e6:.2f}"))
+    seconds = timed(lambda product_id: log.units_sold(product_id), [(p,) for _, p in products])
+    rows.append(("units_sold, last hour (running totals)", f"{seconds * 1e6:.2f}"))
+    seconds = timed(lambda product_id: log.units_sold(product_id, 600), [(p,) for _, p in products])
+    rows.append(("units_sold, last 10 minutes (buckets)", f"{seconds * 1e6:.2f}"))
+    seconds = timed(lambda: log.top_products(10), [()] * 10)
+    rows.append(("top_products(10), last hour", f"{seconds * 1e6:.2f}"))
+    seconds = timed(lambda: log.top_products(10, 600), [()] * 10)
+    rows.append(("top_products(10), last 10 minutes", f"{seconds * 1e6:.2f}"))
+    report(f"Queries over {count:,} order lines (us)", rows, ["query", "us"])
+
+    # Overhead on Order.place_order (without the big log around, after a warm-up pass).
+    # Rebinding frees the log; a del would leave the query lambdas above with an undefined name
+    log = append = None
+    repo = ProductRepository()
+    fill_repository(repo, 100_000)
+    for product in repo.storage:
+        product.quantity = 10 ** 9
+    ids = [rng.randint(1, 100_000) for _ in range(args.place_orders)]
+    for order_id, product_id in enumerate(ids, 1):
+        Order(order_id, []).place_order(product_id, 1, repo)
+    overhead = []
+    for label in ("no order log", "order log"):
+        if label == "order log":
+            repo.enable_order_log()
+        with Timer() as t:
+            for order_id, product_id in enumerate(ids, 1):
+                Order(order_id, []).place_order(product_id, 1, repo)
+        overhead.append((label, f"{args.place_orders / t.elapsed:,.0f}", f"{t.elapsed / args.place_orders * 1e6:.2f}"))
+    assert len(repo.order_log) == args.place_orders
+    report("Order.place_order", overhead, ["", "orders/sec", "us/order"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for the journal + snapshot persistence
+
+Part 1 measures the write overhead per operation (add, update, order,
+delete) without a journal and with different group commit sizes.
+Part 2 measures recovery time: snapshot of N products plus a journal
+tail of T records.
+
+Usage:
+    python benchmarks/bench_persistence.py --ops 20000 --group-commits 1,64,1024 --recover 1M --tail 100k
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from _common import Timer, parse_sizes, report
+
+from inventory import InventoryPersistence, Order, ProductRepository
+
+
+def workload(repo, ops: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    timings = {}
+    with Timer() as t:
+        for i in range(ops):
+            repo.add_product(f"Product {i}", "Electronics", 10**6, 100, "Supplier A")
+    timings["add"] = t.elapsed
+    ids = [rng.randint(1, ops) for _ in range(ops)]
+    with Timer() as t:
+        for product_id in ids:
+            repo.update_product(product_id, price=rng.randint(1, 1000))
+    timings["update"] = t.elapsed
+    order = Order(1, [])
+    with Timer() as t:
+        for product_id in ids:
+            order.order.products.clear()
+            order.place_order(product_id, 1, repo)
+    timings["order"] = t.elapsed
+    with Timer() as t:
+        for product_id in rng.sample(range(1, ops + 1), ops // 2):
+            repo.delete_product(product_id)
+    timings["delete"] = t.elapsed / (ops // 2) * ops
+    return timings
+
+
+def write_overhead(ops: int, group_commits: list, seed: int) -> list:
+    rows = []
+    base = workload(ProductRepository(), ops, seed)
+    rows.append(("no journal", *(f"{base[op] / ops * 1e6:.2f}" for op in ("add", "update", "order", "delete"))))
+    for group in group_commits:
+        directory = tempfile.mkdtemp(prefix="inventory-bench-")
+        try:
+            persistence = InventoryPersistence(directory, group_commit=group)
+            repo = persistence.open()
+            timings = workload(repo, ops, seed)
+            persistence.close()
+        finally:
+            shutil.rmtree(directory)
+        rows.append((f"group commit {group}", *(f"{timings[op] / ops * 1e6:.2f}"
+                                                for op in ("add", "update", "order", "delete"))))
+    return rows
+
+
+def recovery(size: int, tail: int, storages: list, seed: int) -> list:
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix="inventory-bench-")
+    rows = []
+    try:
+        persistence = InventoryPersistence(directory, group_commit=4096)
+        repo = persistence.open()
+        repo.add_products([(f"Product {i}", "Electronics", 100, 10 + i % 990, "Supplier A") for i in range(size)])
+        with Timer() as snap:
+            persistence.snapshot()
+        for _ in range(tail):
+            repo.update_product(rng.randint(1, size), quantity=rng.randint(0, 100))
+        persistence.close()
+        snapshot_mb = os.path.getsize(os.path.join(directory, "snapshot.bin")) / 2**20
+        journal_mb = os.path.getsize(os.path.join(directory, "journal.log")) / 2**20
+        
+        for storage in storages:
+            with Timer() as t:
+                recovered = InventoryPersistence(directory)
+                repo = recovered.open(storage)
+            assert len(repo.storage) == size
+            recovered.close()
+            rows.append((storage, size, tail, f"{snapshot_mb:.1f}", f"{journal_mb:.1f}",
+                         f"{snap.elapsed:.2f}", f"{t.elapsed:.2f}"))
+    finally:
+        shutil.rmtree(directory)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20000, help="operations per kind for the write overhead")
+    parser.add_argument("--group-commits", default="1,64,1024")
+    parser.add_argument("--recover", default="1M", help="products in the snapshot")
+    parser.add_argument("--tail", default="100k", help="journal records after the snapshot")
+    parser.add_argument("--storages", default="list,indexed,columnar")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows = write_overhead(args.ops, parse_sizes(args.group_commits), args.seed)
+    report("Write cost per operation (us)", rows, ["mode", "add", "update", "order", "delete"])
+    
+    rows = recovery(parse_sizes(args.recover)[0], parse_sizes(args.tail)[0], args.storages.split(","), args.seed)
+    report("Recovery", rows, ["storage", "products", "tail", "snapshot MiB", "journal MiB", "snapshot s", "recover s"])
+
+
+if __name__ == "__main__":
+    main()
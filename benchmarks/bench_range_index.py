@@ -0,0 +1,100 @@
+"""
+Benchmark for the price/quantity range indexes
+
+Compares range queries, counts and sums through RangeIndex with full
+scans of the inventory, and measures the extra cost per update_product
+of keeping the indexes up to date.
+
+Usage:
+    python benchmarks/bench_range_index.py --sizes 100k,1M
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import ProductRepository
+
+
+def scan(repo, attribute, low, high, **equals) -> list:
+    return sorted((p for p in repo.storage
+                   if low <= getattr(p, attribute) <= high
+                   and all(getattr(p, name) == value for name, value in equals.items())),
+                  key=lambda p: (getattr(p, attribute), p.product_id))
+
+
+def timed(function, rounds: int) -> tuple:
+    with Timer() as t:
+        for _ in range(rounds):
+            result = function()
+    return result, t.elapsed / rounds
+
+
+def run(size: int, storage: str, updates: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    repo = ProductRepository(storage=storage)
+    fill_repository(repo, size)
+    
+    ids = [rng.randint(1, size) for _ in range(updates)]
+    prices = [rng.randint(10, 1000) for _ in range(updates)]
+    with Timer() as plain:
+        for product_id, price in zip(ids, prices):
+            repo.update_product(product_id, price=price)
+    repo.create_index("category")
+    repo.create_range_index("price")
+    repo.create_range_index("quantity")
+    with Timer() as indexed:
+        for product_id, price in zip(ids, prices):
+            repo.update_product(product_id, price=price + 1)
+    assert repo.check_indexes() == []
+    
+    queries = [
+        ("find_range price 500..510",
+         lambda: repo.find_range("price", 500, 510), lambda: scan(repo, "price", 500, 510)),
+        ("find_range quantity <10, Toys",
+         lambda: repo.find_range("quantity", high=9, category="Toys"),
+         lambda: scan(repo, "quantity", 0, 9, category="Toys")),
+        ("count_range price 500..1000",
+         lambda: repo.count_range("price", 500, 1000),
+         lambda: sum(1 for p in repo.storage if 500 <= p.price <= 1000)),
+        ("sum_range quantity 0..49",
+         lambda: repo.sum_range("quantity", 0, 49),
+         lambda: sum(p.quantity for p in repo.storage if p.quantity <= 49)),
+    ]
+    rows = []
+    for name, indexed_query, scan_query in queries:
+        expected, scan_time = timed(scan_query, 1)
+        result, index_time = timed(indexed_query, 20)
+        if isinstance(expected, list):
+            assert [p.product_id for p in result] == [p.product_id for p in expected], name
+            matches = len(result)
+        else:
+            assert result == expected, name
+            matches = result if name.startswith("count") else "-"
+        rows.append((size, storage, name, matches, f"{scan_time * 1e3:.3f}", f"{index_time * 1e3:.3f}",
+                     f"{scan_time / index_time:,.0f}x"))
+    overhead = (size, storage, f"{plain.elapsed / updates * 1e6:.2f}", f"{indexed.elapsed / updates * 1e6:.2f}")
+    return rows, overhead
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100k,1M", help="inventory sizes (default: 100k,1M)")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--updates", type=int, default=50000, help="update_product calls per measurement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows, overhead = [], []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            r, o = run(size, storage, args.updates, args.seed)
+            rows.extend(r)
+            overhead.append(o)
+    report("Range queries (ms)", rows, ["products", "storage", "query", "matches", "scan", "index", "speedup"])
+    report("update_product cost (us)", overhead, ["products", "storage", "no range index", "price+quantity indexes"])
+
+
+if __name__ == "__main__":
+    main()
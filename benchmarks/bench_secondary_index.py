@@ -0,0 +1,76 @@
+"""
+Benchmark for the secondary indexes on category and supplier
+
+Compares find_by_category/find_by_supplier with and without an index,
+and measures what the index maintenance adds to add/update/delete.
+
+Usage:
+    python benchmarks/bench_secondary_index.py --sizes 10k,100k,1M --queries 200
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import ProductRepository
+
+
+CATEGORIES = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+SUPPLIERS = ("Supplier A", "Supplier B", "Supplier C", "Supplier D")
+
+
+def time_queries(repo, queries: int, rng) -> float:
+    with Timer() as t:
+        for _ in range(queries):
+            repo.find_by_category(rng.choice(CATEGORIES))
+            repo.find_by_supplier(rng.choice(SUPPLIERS))
+    return t.elapsed / (2 * queries)
+
+
+def time_writes(repo, size: int, ops: int, rng) -> float:
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    with Timer() as t:
+        for product_id in ids:
+            repo.update_product(product_id, supplier=rng.choice(SUPPLIERS))
+            repo.delete_product(product_id)
+            repo.add_product("Churn", rng.choice(CATEGORIES), 1, 1, rng.choice(SUPPLIERS))
+    return t.elapsed / (3 * ops)
+
+
+def run(storage: str, size: int, queries: int, ops: int, seed: int) -> list:
+    rows = []
+    for indexed in (False, True):
+        rng = random.Random(seed)
+        repo = ProductRepository(storage=storage)
+        fill_repository(repo, size)
+        if indexed:
+            repo.create_index("category")
+            repo.create_index("supplier")
+        query = time_queries(repo, queries, rng)
+        write = time_writes(repo, size, ops, rng)
+        assert repo.check_indexes() == []
+        rows.append((storage, size, "index" if indexed else "scan",
+                     f"{query * 1e3:.3f}", f"{write * 1e6:.2f}"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k,1M", help="inventory sizes (default: 10k,100k,1M)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per attribute")
+    parser.add_argument("--ops", type=int, default=20000, help="update/delete/add rounds")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows = []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            rows.extend(run(storage, size, args.queries, args.ops, args.seed))
+    report("Secondary index lookups vs scans", rows,
+           ["storage", "products", "mode", "ms/query", "us/write"])
+
+
+if __name__ == "__main__":
+    main()
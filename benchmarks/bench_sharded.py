@@ -0,0 +1,119 @@
+"""
+Scaling benchmark for ShardedProductRepository and ParallelAnalytics
+
+Fills a sharded repository, then for 1 to N worker processes measures:
+    start     making the ParallelAnalytics (forking the workers)
+    category  stock value by category over every shard
+    supplier  supplier totals over every shard
+and reports the speedup over one process. The results are checked against
+a plain loop over the products. The per-call cost of the routed
+add/get/place_order paths is compared with a single ProductRepository.
+
+Usage:
+    python benchmarks/bench_sharded.py --sizes 1M --shards 8 --processes 1,2,4,8
+"""
+
+import argparse
+import os
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import Order, ParallelAnalytics, ProductRepository, ShardedProductRepository
+
+
+def expected_totals(repo, group_by: str) -> dict:
+    totals = {}
+    for product in repo:
+        entry = totals.setdefault(getattr(product, group_by), {"products": 0, "quantity": 0, "stock_value": 0})
+        entry["products"] += 1
+        entry["quantity"] += product.quantity
+        entry["stock_value"] += product.quantity * product.price
+    return totals
+
+
+def best_of(function, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        with Timer() as t:
+            function()
+        best = t.elapsed if best is None else min(best, t.elapsed)
+    return best
+
+
+def run_scaling(repo, size: int, processes: list, repeat: int) -> list:
+    expected = {group: expected_totals(repo, group) for group in ParallelAnalytics.GROUPS}
+    rows = []
+    baseline = None
+    for count in processes:
+        with Timer() as start:
+            analytics = ParallelAnalytics(repo, count)
+        with analytics:
+            assert analytics.group_totals("category") == expected["category"]
+            assert analytics.supplier_totals() == expected["supplier"]
+            category = best_of(analytics.stock_value_by_category, repeat)
+            supplier = best_of(analytics.supplier_totals, repeat)
+        if baseline is None:
+            baseline = category
+        rows.append((size, len(repo.shards), count, f"{start.elapsed * 1e3:.1f}", f"{category * 1e3:.1f}",
+                     f"{supplier * 1e3:.1f}", f"{baseline / category:.2f}x"))
+    return rows
+
+
+def run_routing(size: int, shards: int, ops: int, seed: int) -> list:
+    rows = []
+    for label, repo in (("single", ProductRepository()), (f"{shards} shards", ShardedProductRepository(shards))):
+        fill_repository(repo, size)
+        rng = random.Random(seed)
+        ids = [rng.randint(1, size) for _ in range(ops)]
+        with Timer() as get:
+            for product_id in ids:
+                repo.get_product(product_id)
+        order = Order(order_id=1, products=[])
+        with Timer() as place:
+            for product_id in ids:
+                order.order.products.clear()
+                order.place_order(product_id, 0, repo)
+        with Timer() as add:
+            for _ in range(ops):
+                repo.add_product("Fresh", "Electronics", 5, 100, "Supplier A")
+        rows.append((size, label, f"{get.elapsed / ops * 1e6:.2f}", f"{place.elapsed / ops * 1e6:.2f}",
+                     f"{add.elapsed / ops * 1e6:.2f}"))
+    return rows
+
+
+def main() -> None:
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1M", help="inventory sizes (default: 1M)")
+    parser.add_argument("--shards", type=int, default=max(cores, 4), help="number of shards (default: cores, at least 4)")
+    parser.add_argument("--partition", default="hash", choices=ShardedProductRepository.PARTITIONS)
+    parser.add_argument("--processes", help="comma separated process counts (default: 1, 2, 4, ... up to the shards)")
+    parser.add_argument("--repeat", type=int, default=3, help="repeats per query, the best is kept")
+    parser.add_argument("--ops", type=int, default=50000, help="operations per routing measurement")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.processes:
+        processes = [int(p) for p in args.processes.split(",")]
+    else:
+        processes = [1]
+        while processes[-1] * 2 <= args.shards:
+            processes.append(processes[-1] * 2)
+        if processes[-1] != args.shards:
+            processes.append(args.shards)
+
+    scaling, routing = [], []
+    for size in parse_sizes(args.sizes):
+        repo = ShardedProductRepository(args.shards, args.partition, shard_size=max(1, size // args.shards))
+        fill_repository(repo, size)
+        scaling.extend(run_scaling(repo, size, processes, args.repeat))
+        routing.extend(run_routing(size, args.shards, args.ops, args.seed))
+
+    report(f"Parallel aggregation ({cores} cores, ms)", scaling,
+           ["products", "shards", "processes", "start", "by category", "by supplier", "speedup"])
+    report("Routed operations (us)", routing, ["products", "repository", "get", "place_order", "add"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark for the copy-on-write read snapshots
+
+Writer threads change a ConcurrentProductRepository while reader threads
+take snapshots and read the whole inventory through them. Reported for
+0, 1, 2 and 4 readers:
+    writer ops/sec and p99 latency   (writers never wait for the readers)
+    snapshots/sec                    full reads through a snapshot
+    open (us)                        cost of taking a snapshot
+    before-images                    most before-images kept at once
+
+Every snapshot is checked for consistency: each writer raises the
+quantity of its own products one after the other (round robin), so at any
+point in time its products read as [c + 1, ..., c + 1, c, ..., c]; a
+snapshot mixing two points in time breaks that pattern. A churn thread
+deletes and re-adds products (same ids), so the snapshots must always see
+either all of its products or all but one.
+
+Usage:
+    python benchmarks/bench_snapshots.py --size 100k --seconds 3 --readers 0,1,2,4
+"""
+
+import argparse
+import threading
+import time
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ConcurrentProductRepository
+
+
+def writer(repo, first: int, count: int, stop: threading.Event, latencies: list, ops: list) -> None:
+    done = 0
+    samples = []
+    value = 1
+    while not stop.is_set():
+        for product_id in range(first, first + count):
+            start = time.perf_counter()
+            repo.update_product(product_id, quantity=value)
+            if done % 64 == 0:
+                samples.append(time.perf_counter() - start)
+            done += 1
+        value += 1
+    latencies.extend(samples)
+    ops.append(done)
+
+
+def churner(repo, first: int, count: int, stop: threading.Event, ops: list) -> None:
+    done = 0
+    while not stop.is_set():
+        for product_id in range(first, first + count):
+            repo.delete_product(product_id)
+            # The lowest free id is the one just deleted
+            repo.add_product("Churn", "Toys", 1, 1, "Supplier C")
+            done += 1
+    ops.append(done)
+
+
+def reader(repo, ranges: list, churn: range, stop: threading.Event, results: dict) -> None:
+    while not stop.is_set():
+        with Timer() as t:
+            snapshot = repo.snapshot()
+        results["open"].append(t.elapsed)
+        with snapshot:
+            quantities = {}
+            churned = 0
+            for product in snapshot:
+                if product.product_id in churn:
+                    churned += 1
+                else:
+                    quantities[product.product_id] = product.quantity
+            results["history"] = max(results["history"], repo.snapshots.history_size())
+        for first, count in ranges:
+            values = [quantities[product_id] for product_id in range(first, first + count)]
+            drops = [i for i in range(1, count) if values[i] != values[i - 1]]
+            if values[0] - values[-1] not in (0, 1) or len(drops) > 1:
+                results["errors"] += 1
+        if churned not in (len(churn), len(churn) - 1):
+            results["errors"] += 1
+        results["snapshots"] += 1
+
+
+def run(size: int, writers: int, readers: int, seconds: float) -> tuple:
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.add_products([(f"Product {i}", "Toys", 0, 10, "Supplier A") for i in range(size)])
+    churn_count = 100
+    per_writer = (size - churn_count) // writers
+    ranges = [(1 + i * per_writer, per_writer) for i in range(writers)]
+    churn = range(size - churn_count + 1, size + 1)
+
+    stop = threading.Event()
+    latencies, writer_ops, churn_ops = [], [], []
+    results = {"open": [], "history": 0, "errors": 0, "snapshots": 0}
+    threads = [threading.Thread(target=writer, args=(repo, first, count, stop, latencies, writer_ops))
+               for first, count in ranges]
+    threads.append(threading.Thread(target=churner, args=(repo, churn.start, churn_count, stop, churn_ops)))
+    threads += [threading.Thread(target=reader, args=(repo, ranges, churn, stop, results)) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6 if latencies else 0
+    opened = sorted(results["open"])
+    open_us = f"{opened[len(opened) // 2] * 1e6:.1f}" if opened else "-"
+    return (size, readers, f"{sum(writer_ops) / seconds:,.0f}", f"{p99:.1f}", f"{sum(churn_ops) / seconds:,.0f}",
+            f"{results['snapshots'] / seconds:.2f}", open_us, results["history"], results["errors"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help="inventory size (default: 100k)")
+    parser.add_argument("--writers", type=int, default=2, help="writer threads (default: 2)")
+    parser.add_argument("--readers", default="0,1,2,4", help="comma separated reader thread counts")
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of every run")
+    args = parser.parse_args()
+
+    size = parse_sizes(args.size)[0]
+    rows = [run(size, args.writers, int(readers), args.seconds) for readers in args.readers.split(",")]
+    report(f"Writers ({args.writers} threads) with snapshot readers", rows,
+           ["products", "readers", "writer ops/s", "p99 (us)", "churn ops/s", "snapshots/s",
+            "open (us)", "before-images", "inconsistent"])
+    if any(row[-1] for row in rows):
+        raise SystemExit("Inconsistent snapshots found")
+
+
+if __name__ == "__main__":
+    main()
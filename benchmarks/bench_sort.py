@@ -0,0 +1,114 @@
+"""
+Benchmark for the Sort engine
+
+Compares the Sort strategies against the previous merge sort (fresh
+temporary lists on every merge, product_id only) and the built-in
+list.sort on random, sorted, reversed and nearly sorted inputs, and
+checks every result against sorted(). A multi-key order (category,
+then price descending) is measured as well.
+
+Usage:
+    python benchmarks/bench_sort.py --sizes 10k,100k,1M
+"""
+
+import argparse
+import random
+
+from _common import Timer, parse_sizes, report
+
+from inventory import ProductInfo, Sort, SortKey
+
+
+def legacy_merge(arr, l, m, r):
+    """The merge from before the key-aware engine, kept as the baseline"""
+    L = arr[l:m + 1]
+    R = arr[m + 1:r + 1]
+    i = j = 0
+    k = l
+    while i < len(L) and j < len(R):
+        if L[i].product_id <= R[j].product_id:
+            arr[k] = L[i]
+            i += 1
+        else:
+            arr[k] = R[j]
+            j += 1
+        k += 1
+    while i < len(L):
+        arr[k] = L[i]
+        i += 1
+        k += 1
+    while j < len(R):
+        arr[k] = R[j]
+        j += 1
+        k += 1
+
+
+def legacy_merge_sort(arr, l, r):
+    if l < r:
+        m = l + (r - l) // 2
+        legacy_merge_sort(arr, l, m)
+        legacy_merge_sort(arr, m + 1, r)
+        legacy_merge(arr, l, m, r)
+
+
+def make_products(size: int, shape: str, rng: random.Random) -> list:
+    ids = list(range(1, size + 1))
+    if shape == "random":
+        rng.shuffle(ids)
+    elif shape == "reversed":
+        ids.reverse()
+    elif shape == "nearly sorted":
+        for _ in range(size // 100):
+            i, j = rng.randrange(size), rng.randrange(size)
+            ids[i], ids[j] = ids[j], ids[i]
+    categories = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+    return [ProductInfo(product_id, f"Product {product_id}", categories[product_id % 5],
+                        rng.randint(1, 1000), 10, "Supplier A") for product_id in ids]
+
+
+def expected_order(products: list, key) -> list:
+    expected = list(products)
+    for key_function, descending in reversed(SortKey.parse(key)):
+        expected.sort(key=key_function, reverse=descending)
+    return expected
+
+
+def run(size: int, seed: int, legacy_limit: int) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for shape in ("random", "sorted", "reversed", "nearly sorted"):
+        products = make_products(size, shape, rng)
+        cases = [("list.sort", None, lambda A: A.sort(key=lambda p: p.product_id))]
+        if size <= legacy_limit:
+            cases.append(("legacy merge", None, lambda A: legacy_merge_sort(A, 0, len(A) - 1)))
+        cases += [
+            ("merge", None, lambda A: Sort.sort(A, strategy="merge")),
+            ("natural", None, lambda A: Sort.sort(A)),
+            ("natural category,-price", ["category", "-price"],
+             lambda A: Sort.sort(A, ["category", "-price"])),
+        ]
+        for name, key, function in cases:
+            A = list(products)
+            with Timer() as t:
+                function(A)
+            assert A == expected_order(products, key), f"{name} gave a wrong order on {shape} input"
+            rows.append((size, shape, name, f"{t.elapsed:.4f}"))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k,1M", help="array sizes (default: 10k,100k,1M)")
+    parser.add_argument("--legacy-limit", type=parse_sizes, default=[100_000],
+                        help="largest size the legacy merge sort is run on (default: 100k)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows = []
+    for size in parse_sizes(args.sizes):
+        rows.extend(run(size, args.seed, args.legacy_limit[0]))
+    report("Sort strategies", rows, ["size", "input", "algorithm", "seconds"])
+
+
+if __name__ == "__main__":
+    main()
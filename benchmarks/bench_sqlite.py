@@ -0,0 +1,112 @@
+"""
+Benchmark comparing SQLiteProductRepository with the in-memory repository
+
+For every size, both repositories are filled with add_products and then
+run the same operations (the final inventories are checked to be equal):
+    bulk add     add_products rows per second (one transaction for SQLite)
+    get/add/update/delete+add (id reuse)
+    place_order  one line (conditional decrement)
+    multi-line   3-line place_multi_line_order (one transaction)
+    find_by      products of one category (indexed column)
+Reads from several threads show what the reader pool gives (the sqlite3
+module releases the GIL while a statement runs).
+
+Usage:
+    python benchmarks/bench_sqlite.py --sizes 10k,100k --synchronous NORMAL
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+
+from _common import Timer, parse_sizes, report
+
+from inventory import Order, ProductRepository, SQLiteProductRepository
+
+
+CATEGORIES = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+
+
+def rows_for(count: int, first: int = 0) -> list:
+    return [(f"Product {i}", CATEGORIES[i % 5], 10 ** 6, 10 + i % 990, f"Supplier {i % 4}")
+            for i in range(first, first + count)]
+
+
+def per_op(function, arguments: list) -> float:
+    """Mean microseconds per call"""
+    with Timer() as t:
+        for args in arguments:
+            function(*args)
+    return t.elapsed / len(arguments) * 1e6
+
+
+def threaded_reads(repo, ids: list, threads: int) -> float:
+    """get_product calls per second, ids split over the threads"""
+    share = len(ids) // threads
+    workers = [threading.Thread(target=lambda part: [repo.get_product(i) for i in part],
+                                args=(ids[n * share:(n + 1) * share],)) for n in range(threads)]
+    with Timer() as t:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return share * threads / t.elapsed
+
+
+def run(label: str, repo, size: int, ops: int, seed: int, threads: list) -> tuple:
+    rng = random.Random(seed)
+    with Timer() as bulk:
+        repo.add_products(rows_for(size))
+    ids = [(rng.randint(1, size),) for _ in range(ops)]
+
+    row = [size, label, f"{size / bulk.elapsed:,.0f}"]
+    row.append(f"{per_op(repo.get_product, ids):.2f}")
+    fresh = rows_for(ops, size)
+    row.append(f"{per_op(repo.add_product, fresh):.2f}")
+    row.append(f"{per_op(lambda i: repo.update_product(i, price=99), ids):.2f}")
+    row.append(f"{per_op(lambda i: (repo.delete_product(i), repo.add_product('Again', 'Toys', 10 ** 6, 5, 'Supplier 0')), ids):.2f}")
+    row.append(f"{per_op(lambda n, i: Order(n, []).place_order(i, 1, repo), [(n, i) for n, (i,) in enumerate(ids, 1)]):.2f}")
+    baskets = [(n, [(i,), (rng.randint(1, size),), (rng.randint(1, size),)]) for n, (i,) in enumerate(ids, 1)]
+    row.append(f"{per_op(lambda n, basket: Order(n, []).place_multi_line_order([(i, 1) for (i,) in basket], repo), baskets):.2f}")
+    row.append(f"{per_op(repo.find_by, [('category', 'Toys')] * 5) / 1e3:.2f}")
+
+    reads = [f"{threaded_reads(repo, [i for (i,) in ids], count):,.0f}" for count in threads]
+    return row, [size, label] + reads, [(p.product_id, p.name, p.category, p.quantity, p.price, p.supplier)
+                                        for p in repo.inventory]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k", help="inventory sizes (default: 10k,100k)")
+    parser.add_argument("--ops", type=int, default=10000, help="operations per measurement")
+    parser.add_argument("--synchronous", default="NORMAL", choices=("OFF", "NORMAL", "FULL"))
+    parser.add_argument("--readers", type=int, default=4, help="SQLite reader connections")
+    parser.add_argument("--threads", default="1,4", help="comma separated reader thread counts")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    threads = [int(count) for count in args.threads.split(",")]
+
+    rows, reads = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in parse_sizes(args.sizes):
+            memory_row, memory_reads, expected = run("in-memory", ProductRepository("indexed"), size,
+                                                     args.ops, args.seed, threads)
+            path = os.path.join(directory, f"inventory-{size}.db")
+            with SQLiteProductRepository(path, args.readers, args.synchronous) as repo:
+                sqlite_row, sqlite_reads, result = run(f"sqlite ({args.synchronous})", repo, size,
+                                                       args.ops, args.seed, threads)
+            assert result == expected, "SQLite and in-memory inventories differ"
+            rows += [memory_row, sqlite_row]
+            reads += [memory_reads, sqlite_reads]
+
+    report("Operations (us per call, bulk add in rows/sec, find_by in ms)", rows,
+           ["products", "repository", "bulk add", "get", "add", "update", "delete+add", "place_order",
+            "multi-line", "find_by"])
+    report("get_product from several threads (calls/sec)", reads,
+           ["products", "repository"] + [f"{count} threads" for count in threads])
+
+
+if __name__ == "__main__":
+    main()
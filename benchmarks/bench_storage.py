@@ -0,0 +1,75 @@
+"""
+Benchmark comparing the ProductRepository storage backends
+
+For each backend and size it measures get_product, update_product,
+delete_product + add_product churn, Order.place_order and a full
+in-order iteration.
+
+Usage:
+    python benchmarks/bench_storage.py --sizes 10k,100k,1M --ops 50000
+"""
+
+import argparse
+import random
+
+from _common import Timer, fill_repository, parse_sizes, report
+
+from inventory import Order, ProductRepository
+
+
+def run(storage: str, size: int, ops: int, seed: int) -> list:
+    rng = random.Random(seed)
+    repo = ProductRepository(storage=storage)
+    fill_repository(repo, size)
+    ids = [rng.randint(1, size) for _ in range(ops)]
+    results = []
+    
+    with Timer() as t:
+        for product_id in ids:
+            repo.get_product(product_id)
+    results.append(("get_product", t.elapsed))
+    
+    with Timer() as t:
+        for product_id in ids:
+            repo.update_product(product_id, price=500)
+    results.append(("update_product", t.elapsed))
+    
+    with Timer() as t:
+        for product_id in ids:
+            repo.delete_product(product_id)
+            repo.add_product("Churn", "Electronics", 1000, 100, "Supplier A")
+    results.append(("delete+add", t.elapsed))
+    
+    order = Order(order_id=1, products=[])
+    with Timer() as t:
+        for product_id in ids:
+            order.order.products.clear()
+            order.place_order(product_id, 0, repo)
+    results.append(("place_order", t.elapsed))
+    
+    with Timer() as t:
+        for _ in repo.storage:
+            pass
+    results.append(("iterate (1 pass)", t.elapsed))
+    
+    return [(storage, size, op, f"{ops / elapsed:,.0f}" if op != "iterate (1 pass)" else "-",
+             f"{elapsed:.4f}") for op, elapsed in results]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k,1M", help="inventory sizes (default: 10k,100k,1M)")
+    parser.add_argument("--ops", type=int, default=50000, help="operations per measurement")
+    parser.add_argument("--storages", default="list,indexed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rows = []
+    for size in parse_sizes(args.sizes):
+        for storage in args.storages.split(","):
+            rows.extend(run(storage, size, args.ops, args.seed))
+    report("ProductRepository storage backends", rows, ["storage", "products", "operation", "ops/sec", "seconds"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""Make the inventory package importable from the tests"""
+
+import os
+import sys
+
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "application code")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
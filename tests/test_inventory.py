@@ -0,0 +1,310 @@
+"""
+Checks of the inventory package
+
+The benchmarks measure the same code at larger sizes; these runs are small
+enough for every test session.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from inventory import (CatalogueExporter, ConcurrentProductRepository, ExternalSort, IndexedProductStorage,
+                       InventoryException, InventoryJournal, InventoryPersistence, Order, OrderIngestionService,
+                       ParallelAnalytics, ProductInfo, ProductRepository, ShardedProductRepository,
+                       SQLiteProductRepository)
+
+
+def test_concurrent_orders_never_oversell():
+    """Threads buying a few hot products while others add and delete products"""
+    threads, hot_products, stock, attempts = 8, 5, 300, 300
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.create_index("category")
+    repo.add_products([(f"Hot {i}", "Hot", stock, 100, "Supplier A") for i in range(hot_products)])
+    sold = [0] * threads
+    # The buyers, the churner and this thread start together
+    start = threading.Barrier(threads + 2)
+    
+    def buyer(worker: int) -> None:
+        rng = random.Random(worker)
+        start.wait()
+        for n in range(attempts):
+            lines = [(rng.randint(1, hot_products), rng.randint(1, 3)) for _ in range(rng.randint(1, 3))]
+            try:
+                Order(n + 1, []).place_multi_line_order(lines, repo)
+                sold[worker] += sum(quantity for _, quantity in lines)
+            except InventoryException:
+                pass
+    
+    def churner() -> None:
+        start.wait()
+        for _ in range(attempts):
+            repo.add_product("Churn", "Cold", 1, 1, "Supplier B")
+            repo.delete_product(hot_products + 1)
+    
+    workers = [threading.Thread(target=buyer, args=(w,)) for w in range(threads)]
+    workers.append(threading.Thread(target=churner))
+    for w in workers:
+        w.start()
+    start.wait()
+    for w in workers:
+        w.join()
+    
+    quantities = [repo.get_product(i).quantity for i in range(1, hot_products + 1)]
+    assert min(quantities) >= 0
+    # Every copy sold came out of the stock, and the stock did run out
+    assert sum(quantities) + sum(sold) == hot_products * stock
+    assert sum(sold) > hot_products * stock // 2
+    assert repo.check_indexes() == []
+
+
+def _products(size: int, seed: int):
+    """Yield size products in a scrambled id order, without keeping them"""
+    rng = random.Random(seed)
+    categories = ("Electronics", "Grocery", "Clothing", "Toys", "Books")
+    # 7919 is a prime, so i * 7919 % size visits every id once (size not a multiple of it)
+    for i in range(size):
+        product_id = i * 7919 % size + 1
+        yield ProductInfo(product_id, f"Product {product_id}", categories[product_id % 5],
+                          product_id % 100, rng.randint(1, 1000), "Supplier A")
+
+
+def test_external_sort_stays_within_a_small_memory_budget():
+    """A budget far below the dataset: complete, stable output and a bounded peak"""
+    size, budget = 50000, ExternalSort.MIN_BUDGET
+    input_order = {product.product_id: position for position, product in enumerate(_products(size, 1))}
+    sorter = ExternalSort(["category", "-price"], memory_budget=budget)
+    
+    tracemalloc.start()
+    try:
+        previous = None
+        count = total = 0
+        for product in sorter.sort(_products(size, 1)):
+            # Equal keys keep their input order
+            current = (product.category, -product.price, input_order[product.product_id])
+            assert previous is None or previous <= current
+            previous = current
+            count += 1
+            total += product.product_id
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    # input_order was built before tracing, so the peak is the sort's own
+    assert count == size and total == size * (size + 1) // 2
+    # The data did not fit: it was spilled in many runs and merged in several passes
+    assert sorter.spilled > 10 * budget
+    assert sorter.runs > 10 and sorter.passes >= 1
+    assert peak < 2 * budget
+
+
+def test_prefilled_storage_continues_its_ids():
+    """A repository over a storage that already holds products fills its gaps, then goes on after the last id"""
+    storage = IndexedProductStorage()
+    for product_id in (1, 2, 4):
+        storage.insert(ProductInfo(product_id, f"Product {product_id}", "Toys", 1, 1, "Supplier A"))
+    repo = ProductRepository(storage)
+    repo.add_product("New", "Toys", 1, 1, "Supplier A")
+    repo.add_product("New", "Toys", 1, 1, "Supplier A")
+    assert [product.product_id for product in repo.inventory] == [1, 2, 3, 4, 5]
+
+
+def test_category_and_supplier_are_interned_when_assigned():
+    """A plain assignment shares the string like the constructor does"""
+    product = ProductInfo(1, "Product", "Toys", 1, 1, "Supplier A")
+    product.supplier = "".join(["Supplier ", "B"])
+    product.category = "".join(["Bo", "oks"])
+    assert product.supplier is ProductInfo(2, "Other", "Toys", 1, 1, "Supplier B").supplier
+    assert product.category is ProductInfo(3, "Other", "Books", 1, 1, "Supplier A").category
+
+
+def test_single_product_order_is_a_one_line_basket():
+    """place_order takes the stock like a basket of one line and can not be placed twice"""
+    repo = ProductRepository()
+    repo.add_product("Product", "Toys", 5, 1, "Supplier A")
+    order = Order(1, [])
+    order.place_order(1, 2, repo)
+    assert order.order.products == [(1, 2)]
+    assert repo.get_product(1).quantity == 3
+    with pytest.raises(InventoryException):
+        order.place_order(1, 1, repo)
+    with pytest.raises(InventoryException):
+        Order(2, []).place_order(1, 4, repo)
+    assert repo.get_product(1).quantity == 3
+
+
+def test_ingestion_numbers_orders_after_the_order_log():
+    """The ingestion service does not hand out an order id already in the order log"""
+    repo = ProductRepository()
+    repo.add_product("Product", "Toys", 10, 1, "Supplier A")
+    order_log = repo.enable_order_log()
+    Order(7, []).place_order(1, 1, repo)
+    
+    async def submit():
+        async with OrderIngestionService(repo) as service:
+            return await service.submit(1, 1)
+    
+    assert asyncio.run(submit()) == "Order placed successfully. Order ID: 8"
+    assert list(order_log.order_ids) == [7, 8]
+
+
+def test_journal_commit_does_not_lose_concurrent_records(tmp_path):
+    """Records appended by writer threads while another thread commits all reach the file, in order"""
+    persistence = InventoryPersistence(str(tmp_path), group_commit=1000)
+    repo = persistence.open(storage="indexed", repository_class=ConcurrentProductRepository)
+    repo.add_products([("Product", "Toys", 10**6, 1, "Supplier A") for _ in range(8)])
+    done = threading.Event()
+    
+    def writer(product_id: int) -> None:
+        for price in range(2000):
+            repo.update_product(product_id, price=price + 1)
+    
+    def committer() -> None:
+        while not done.is_set():
+            persistence.commit()
+    
+    writers = [threading.Thread(target=writer, args=(product_id,)) for product_id in range(1, 9)]
+    committing = threading.Thread(target=committer)
+    committing.start()
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    done.set()
+    committing.join()
+    persistence.close()
+    
+    records, _ = InventoryJournal.read(str(tmp_path / InventoryPersistence.JOURNAL_FILE))
+    assert [seq for _, seq, _, _ in records] == list(range(1, 8 + 8 * 2000 + 1))
+    reopened = InventoryPersistence(str(tmp_path)).open()
+    assert all(product.price == 2000 for product in reopened.inventory)
+
+
+@pytest.mark.parametrize("make_repo", [ProductRepository, ShardedProductRepository,
+                                       lambda: SQLiteProductRepository(":memory:")])
+def test_exporter_streams_every_repository(make_repo, tmp_path):
+    """The exporter writes the products of every backend in product_id order"""
+    repo = make_repo()
+    for i in range(10):
+        repo.add_product(f"Product {i}", "Toys", i, 10 + i, "Supplier A")
+    repo.delete_product(4)
+    path = str(tmp_path / "catalogue.csv")
+    assert CatalogueExporter(repo).export_file(path) == 9
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == ",".join(CatalogueExporter.COLUMNS)
+    assert [int(line.split(",")[0]) for line in lines[1:]] == [1, 2, 3, 5, 6, 7, 8, 9, 10]
+
+
+def test_low_stock_monitor_under_concurrent_changes():
+    """lowest_stock only names live products while others churn, and check_indexes covers the monitor"""
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.add_products([(f"Product {i}", "Toys", 100 + i, 1, "Supplier A") for i in range(20)])
+    repo.create_low_stock_monitor(default_threshold=50)
+    done = threading.Event()
+    missing = []
+    
+    def churner() -> None:
+        for n in range(2000):
+            repo.add_product("Churn", "Toys", n % 10, 1, "Supplier B")
+            repo.delete_product(21)
+        done.set()
+    
+    def reader() -> None:
+        while not done.is_set():
+            missing.extend(product for product in repo.lowest_stock(3) if product is None)
+    
+    workers = [threading.Thread(target=churner), threading.Thread(target=reader)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert missing == []
+    assert repo.check_indexes() == []
+    
+    # A monitor that missed a change is reported
+    repo.storage.get(1).quantity = 0
+    assert any(problem.startswith("Low-stock monitor") for problem in repo.check_indexes())
+
+
+@pytest.mark.parametrize("low, high", [(50.5, 300), (None, 299.9), (0.2, None), (100, 100.0), (-1.5, 20.5),
+                                       (float("-inf"), float("inf")), (300.5, 300.7), (float("nan"), 10)])
+def test_range_index_matches_the_scan_for_float_bounds(low, high):
+    """An indexed range query with float bounds returns what the scan returns"""
+    rng = random.Random(3)
+    rows = [(f"Product {i}", "Toys", i % 7, rng.randint(0, 500), "Supplier A") for i in range(300)]
+    scan, indexed = ProductRepository(), ProductRepository()
+    for repo in (scan, indexed):
+        repo.add_products(rows)
+    indexed.create_range_index("price")
+    ids = [product.product_id for product in indexed.find_range("price", low, high)]
+    assert ids == [product.product_id for product in scan.find_range("price", low, high)]
+    assert indexed.count_range("price", low, high) == scan.count_range("price", low, high)
+    assert indexed.sum_range("price", low, high) == scan.sum_range("price", low, high)
+
+
+def test_range_query_rejects_bounds_that_are_not_numbers():
+    repo = ProductRepository()
+    repo.add_product("Product", "Toys", 1, 1, "Supplier A")
+    with pytest.raises(InventoryException):
+        repo.find_range("price", "50", 300)
+    repo.create_range_index("price")
+    with pytest.raises(InventoryException):
+        repo.count_range("price", None, "300")
+
+
+def test_parallel_analytics_stays_correct_after_changes():
+    """Stale forked workers are not used, and refresh() brings them back"""
+    repo = ShardedProductRepository(shards=4)
+    repo.add_products([(f"Product {i}", "Toys" if i % 2 else "Books", 1 + i, 10, "Supplier A") for i in range(40)])
+    
+    def expected() -> dict:
+        totals = {}
+        for product in repo:
+            totals[product.category] = totals.get(product.category, 0) + product.quantity * product.price
+        return totals
+    
+    with ParallelAnalytics(repo, processes=2) as analytics:
+        assert analytics.stock_value_by_category() == expected()
+        repo.update_product(2, quantity=1000)
+        repo.delete_product(3)
+        assert analytics.stale == analytics.forked
+        assert analytics.stock_value_by_category() == expected()
+        analytics.refresh()
+        assert not analytics.stale
+        assert analytics.stock_value_by_category() == expected()
+
+
+def test_stalled_blocking_subscriber_does_not_block_readers():
+    """A writer waiting for a blocking subscriber holds no repository lock"""
+    repo = ConcurrentProductRepository(storage="indexed")
+    repo.add_product("Product", "Toys", 1, 1, "Supplier A")
+    repo.create_index("category")
+    stream = repo.enable_change_stream(retention=100, block_timeout=30)
+    subscription = stream.subscribe("replica", max_pending=10, block=True)
+    
+    writer = threading.Thread(target=lambda: [repo.add_product("New", "Toys", 1, 1, "Supplier A") for _ in range(20)])
+    writer.start()
+    # The subscriber does not poll: the writer stops once its buffer is full
+    deadline = time.monotonic() + 10
+    while stream.stats()["blocked"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.is_alive() and stream.stats()["blocked"] == 1
+    
+    # Readers still get the locks
+    start = time.monotonic()
+    for _ in range(100):
+        assert repo.get_product(1) is not None
+        assert len(repo.find_by("category", "Toys")) >= 2
+    assert time.monotonic() - start < 5
+    
+    received = []
+    while writer.is_alive() or subscription.lag:
+        received.extend(subscription.poll(timeout=0.1))
+    writer.join()
+    assert [event[0] for event in received] == list(range(1, 21))
+    assert stream.stats()["cut_off"] == 0